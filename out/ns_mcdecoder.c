@@ -0,0 +1,216 @@
+#include "ns_mcdecoder.h"
+
+#include <stdbool.h>
+
+/* types */
+
+typedef struct {
+    ns_uint16 *code;
+    ns_OpDecodedCodeType *decoded_code;
+    ns_OperationCodeType *optype;
+    ns_uint16 code16x1;
+    ns_uint32 code16x2;
+    ns_uint32 code32x1;
+} OpDecodeContext;
+
+/* op constants */
+
+    /* add_1 */
+    #define OP_FB_MASK_add_1 (0x0fe00000l) /* fixed bits mask */
+    #define OP_FB_add_1 (0x02800000l) /* fixed bits */
+    
+        
+            /* 0th subfield of the field 'cond' */
+            #define OP_SF_MASK_add_1_cond_0 (0xf0000000l) /* subfield mask */
+            #define OP_SF_EBII_add_1_cond_0 (28) /* subfield end bit position in instruction */
+            #define OP_SF_EBIF_add_1_cond_0 (0) /* subfield end bit position in field */
+        
+    
+        
+            /* 0th subfield of the field 'S' */
+            #define OP_SF_MASK_add_1_S_0 (0x00100000l) /* subfield mask */
+            #define OP_SF_EBII_add_1_S_0 (20) /* subfield end bit position in instruction */
+            #define OP_SF_EBIF_add_1_S_0 (0) /* subfield end bit position in field */
+        
+    
+
+    /* push_1 */
+    #define OP_FB_MASK_push_1 (0x0fe00000l) /* fixed bits mask */
+    #define OP_FB_push_1 (0x02800000l) /* fixed bits */
+    
+        
+            /* 0th subfield of the field 'cond' */
+            #define OP_SF_MASK_push_1_cond_0 (0xf0000000l) /* subfield mask */
+            #define OP_SF_EBII_push_1_cond_0 (28) /* subfield end bit position in instruction */
+            #define OP_SF_EBIF_push_1_cond_0 (0) /* subfield end bit position in field */
+        
+    
+        
+            /* 0th subfield of the field 'register_list' */
+            #define OP_SF_MASK_push_1_register_list_0 (0x0000ffffl) /* subfield mask */
+            #define OP_SF_EBII_push_1_register_list_0 (0) /* subfield end bit position in instruction */
+            #define OP_SF_EBIF_push_1_register_list_0 (0) /* subfield end bit position in field */
+        
+    
+
+    /* push_2 */
+    #define OP_FB_MASK_push_2 (0x0fe00000l) /* fixed bits mask */
+    #define OP_FB_push_2 (0x02800000l) /* fixed bits */
+    
+        
+            /* 0th subfield of the field 'cond' */
+            #define OP_SF_MASK_push_2_cond_0 (0xf0000000l) /* subfield mask */
+            #define OP_SF_EBII_push_2_cond_0 (28) /* subfield end bit position in instruction */
+            #define OP_SF_EBIF_push_2_cond_0 (0) /* subfield end bit position in field */
+        
+    
+        
+            /* 0th subfield of the field 'register_list' */
+            #define OP_SF_MASK_push_2_register_list_0 (0x0000ffffl) /* subfield mask */
+            #define OP_SF_EBII_push_2_register_list_0 (0) /* subfield end bit position in instruction */
+            #define OP_SF_EBIF_push_2_register_list_0 (0) /* subfield end bit position in field */
+        
+    
+
+
+/* macros */
+#define BIT_ELEMENT(value, element_index) (((value) & (1 << (element_index))) >> element_index)
+
+/* function declarations */
+static ns_uint32 setbit_count(ns_uint32 value);
+
+        static int decision_node_code32x1_0(OpDecodeContext *context, ns_uint32 code);
+
+    static int op_parse_add_1(OpDecodeContext *context);
+    static int op_parse_push_1(OpDecodeContext *context);
+    static int op_parse_push_2(OpDecodeContext *context);
+
+/* functions for conditions */
+static ns_uint32 setbit_count(ns_uint32 value) {
+    ns_uint32 count = 0;
+    while (value) {
+        count += value & 1;
+        value >>= 1;
+    }
+    return count;
+}
+
+/* individual op parse functions */
+
+    /* add_1 */
+    static int op_parse_add_1(OpDecodeContext *context) {
+        if ((context->code32x1 & OP_FB_MASK_add_1) != OP_FB_add_1) {
+            return 1;
+        }
+
+        context->optype->code_id = ns_OpCodeId_add_1;
+        context->optype->format_id = ns_OP_CODE_FORMAT_add_1;
+        context->decoded_code->type_id = ns_OP_CODE_FORMAT_add_1;
+        
+            context->decoded_code->code.add_1.cond =
+            
+                (((context->code32x1 & OP_SF_MASK_add_1_cond_0) >> OP_SF_EBII_add_1_cond_0) << OP_SF_EBIF_add_1_cond_0);
+            
+        
+            context->decoded_code->code.add_1.S =
+            
+                (((context->code32x1 & OP_SF_MASK_add_1_S_0) >> OP_SF_EBII_add_1_S_0) << OP_SF_EBIF_add_1_S_0);
+            
+        
+        
+            if (!(
+                context->decoded_code->code.add_1.cond != 15
+            )) {
+                return 1;
+            }
+        
+        
+        return 0;
+    }
+
+    /* push_1 */
+    static int op_parse_push_1(OpDecodeContext *context) {
+        if ((context->code32x1 & OP_FB_MASK_push_1) != OP_FB_push_1) {
+            return 1;
+        }
+
+        context->optype->code_id = ns_OpCodeId_push_1;
+        context->optype->format_id = ns_OP_CODE_FORMAT_push_1;
+        context->decoded_code->type_id = ns_OP_CODE_FORMAT_push_1;
+        
+            context->decoded_code->code.push_1.cond =
+            
+                (((context->code32x1 & OP_SF_MASK_push_1_cond_0) >> OP_SF_EBII_push_1_cond_0) << OP_SF_EBIF_push_1_cond_0);
+            
+        
+            context->decoded_code->code.push_1.register_list =
+            
+                (((context->code32x1 & OP_SF_MASK_push_1_register_list_0) >> OP_SF_EBII_push_1_register_list_0) << OP_SF_EBIF_push_1_register_list_0);
+            
+        
+        
+            if (!(
+                (context->decoded_code->code.push_1.register_list > 1)
+         && (context->decoded_code->code.push_1.cond >= 2 && context->decoded_code->code.push_1.cond <= 4)
+        
+            )) {
+                return 1;
+            }
+        
+        
+        return 0;
+    }
+
+    /* push_2 */
+    static int op_parse_push_2(OpDecodeContext *context) {
+        if ((context->code32x1 & OP_FB_MASK_push_2) != OP_FB_push_2) {
+            return 1;
+        }
+
+        context->optype->code_id = ns_OpCodeId_push_2;
+        context->optype->format_id = ns_OP_CODE_FORMAT_push_2;
+        context->decoded_code->type_id = ns_OP_CODE_FORMAT_push_2;
+        
+            context->decoded_code->code.push_2.cond =
+            
+                (((context->code32x1 & OP_SF_MASK_push_2_cond_0) >> OP_SF_EBII_push_2_cond_0) << OP_SF_EBIF_push_2_cond_0);
+            
+        
+            context->decoded_code->code.push_2.register_list =
+            
+                (((context->code32x1 & OP_SF_MASK_push_2_register_list_0) >> OP_SF_EBII_push_2_register_list_0) << OP_SF_EBIF_push_2_register_list_0);
+            
+        
+        
+        
+        return 0;
+    }
+
+
+/* decision node functions */
+
+        static int decision_node_code32x1_0(OpDecodeContext *context, ns_uint32 code) {
+            
+            
+            return 1;
+        }
+
+/* op parse function */
+int ns_op_parse(ns_uint16 code[ns_OP_DECODE_MAX], ns_OpDecodedCodeType *decoded_code, ns_OperationCodeType *optype) {
+    
+
+    OpDecodeContext context;
+    context.code = &code[0];
+    context.decoded_code = decoded_code;
+    context.optype = optype;
+    
+        context.code16x1 = code[0];
+        context.code16x2 = (((ns_uint32) code[0]) << 16) | ((ns_uint32) code[1]);
+        context.code32x1 = *((ns_uint32 *) &code[0]);
+    
+    if (decision_node_code32x1_0(&context, context.code32x1) == 0) {
+            return 0;
+        }
+    
+    return 1;
+}
\ No newline at end of file
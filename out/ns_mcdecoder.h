@@ -0,0 +1,84 @@
+#ifndef _ns_MC_DECODER_H_
+#define _ns_MC_DECODER_H_
+
+#include <stdint.h>
+
+typedef uint8_t ns_uint8;
+typedef uint16_t ns_uint16;
+typedef uint32_t ns_uint32;
+
+#define ns_OP_CODE_FORMAT_NUM	ns_OP_CODE_FORMAT_UNKNOWN
+
+typedef enum {
+	
+		ns_OP_CODE_FORMAT_add_1,
+	
+		ns_OP_CODE_FORMAT_push_1,
+	
+		ns_OP_CODE_FORMAT_push_2,
+	
+	ns_OP_CODE_FORMAT_UNKNOWN,
+} ns_OpCodeFormatId;
+
+typedef enum {
+	
+		ns_OpCodeId_add_1,
+	
+		ns_OpCodeId_push_1,
+	
+		ns_OpCodeId_push_2,
+	
+	ns_OpCodeId_Num,
+} ns_OpCodeId;
+
+typedef struct {
+	ns_OpCodeFormatId	format_id;
+	ns_OpCodeId		code_id;
+} ns_OperationCodeType;
+
+
+
+typedef struct {
+	
+		ns_uint8 cond;	/* 31-28 */
+	
+		ns_uint8 S;	/* 20-20 */
+	
+} ns_OpCodeFormatType_add_1;
+
+typedef struct {
+	
+		ns_uint8 cond;	/* 31-28 */
+	
+		ns_uint16 register_list;	/* 15-0 */
+	
+} ns_OpCodeFormatType_push_1;
+
+typedef struct {
+	
+		ns_uint8 cond;	/* 31-28 */
+	
+		ns_uint16 register_list;	/* 15-0 */
+	
+} ns_OpCodeFormatType_push_2;
+
+
+typedef struct {
+	ns_OpCodeFormatId type_id;
+    union {
+		
+        	ns_OpCodeFormatType_add_1 add_1;
+		
+        	ns_OpCodeFormatType_push_1 push_1;
+		
+        	ns_OpCodeFormatType_push_2 push_2;
+		
+    } code;
+} ns_OpDecodedCodeType;
+
+#define ns_OP_DECODE_MAX	(3)
+
+extern int ns_op_parse(ns_uint16 code[ns_OP_DECODE_MAX], ns_OpDecodedCodeType *decoded_code, ns_OperationCodeType *optype);
+
+
+#endif /* !_ns_MC_DECODER_H_ */
\ No newline at end of file
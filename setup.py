@@ -13,7 +13,7 @@ setup(
     version="0.1.1",
     packages=find_packages("src", exclude=["test", "test.*", "*.test", "*.test.*"]),
     package_dir={"": "src"},
-    package_data={"": ["*.json", "*.lark"], "mcdecoder": ["templates/*/*"]},
+    package_data={"": ["*.json", "*.lark", "*.tables"], "mcdecoder": ["templates/*/*"]},
     entry_points={"console_scripts": ["mcdecoder = mcdecoder.__main__:main"]},
     python_requires=">=3.10",
     install_requires=[
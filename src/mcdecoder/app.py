@@ -3,7 +3,7 @@ from dataclasses import dataclass
 import textwrap
 from typing import List, Literal, Optional, cast
 
-from . import __version__, checker, emulator, exporter, generator
+from . import __version__
 
 # region External functions
 
@@ -24,25 +24,42 @@ def run_app(argv: List[str]) -> int:
     try:
         args = cast(_Arguments, parser.parse_args(
             argv[1:], namespace=_Arguments()))
+        _validate_arguments(parser, args)
     except SystemExit as se:
         return se.code
 
+    # Clear the on-disk model cache
+    if args.clear_cache:
+        from . import core
+        core.clear_model_cache()
+
     # Run an individual command
+    # NOTE Sub-command modules are imported on demand not to import heavy third-party modules on start-up
     if args.command == 'generate':
+        from . import generator
         return generator.generate(cast(str, args.mcfile), type=args.generator_type, template_directory=args.template_directory,
-                                  output_directory=cast(str, args.output_directory))
+                                  output_directory=cast(str, args.output_directory), use_cache=args.use_cache,
+                                  trusted=args.trusted)
 
     elif args.command == 'export':
-        return exporter.export(cast(str, args.mcfile), cast(str, args.output_file))
+        from . import exporter
+        return exporter.export(cast(str, args.mcfile), cast(str, args.output_file), trusted=args.trusted)
 
     elif args.command == 'emulate':
+        from . import emulator
         assert args.base is not None
         assert args.byteorder is not None
-        return emulator.emulate(cast(str, args.mcfile), cast(str, args.bit_pattern), base=args.base, byteorder=args.byteorder)
+        return emulator.emulate(cast(str, args.mcfile), cast(str, args.bit_pattern), base=args.base, byteorder=args.byteorder,
+                                use_cache=args.use_cache, trusted=args.trusted, engine=args.engine,
+                                first_match=args.first_match)
 
     elif args.command == 'check':  # pragma: no branch
+        from . import checker
         assert args.base is not None
-        return checker.check(cast(str, args.mcfile), cast(str, args.bit_pattern), base=args.base)
+        return checker.check(cast(str, args.mcfile), cast(str, args.bit_pattern), base=args.base, use_cache=args.use_cache,
+                             trusted=args.trusted, engine=args.engine, jobs=args.jobs, symbolic=args.symbolic,
+                             checkpoint_file=args.checkpoint_file, resume=args.resume,
+                             progress_callback=checker.output_progress if args.progress else None)
 
     return 0  # pragma: no cover
 
@@ -63,6 +80,16 @@ class _Arguments:
     bit_pattern: Optional[str]
     base: Optional[Literal[2, 16]]
     byteorder: Optional[Literal['big', 'little']]
+    use_cache: bool
+    clear_cache: bool
+    trusted: bool
+    engine: Literal['linear', 'tree', 'lut', 'table']
+    first_match: bool
+    jobs: int
+    symbolic: bool
+    checkpoint_file: Optional[str]
+    resume: bool
+    progress: bool
 
     def __init__(self) -> None:
         pass
@@ -80,6 +107,7 @@ def _create_parser() -> argparse.ArgumentParser:
         dest='command', metavar='command', required=True)
     parser.add_argument('--version', action='version',
                         version=f'mcdecoder {__version__.__version__}')
+    parser.set_defaults(use_cache=False, clear_cache=False, trusted=False, engine='linear')
 
     # Create a subparser for the command 'generate'
     generate_parser = subparsers.add_parser(
@@ -109,6 +137,8 @@ def _create_parser() -> argparse.ArgumentParser:
         help='A path to a directoy including user-defined template files')
     generate_parser.add_argument(
         '--output', metavar='outdir', dest='output_directory', default='.', help='A path to an output directory (default: .)')
+    _add_model_cache_arguments(generate_parser)
+    _add_trusted_argument(generate_parser)
     generate_parser.add_argument(
         'mcfile', help='A path to a machine code description file')
 
@@ -122,6 +152,7 @@ def _create_parser() -> argparse.ArgumentParser:
             '''))  # noqa: W293
     export_parser.add_argument(
         '--output', metavar='outfile', dest='output_file', required=True, help='A path to an output file')
+    _add_trusted_argument(export_parser)
     export_parser.add_argument(
         'mcfile', help='A path to a machine code description file')
 
@@ -138,6 +169,9 @@ def _create_parser() -> argparse.ArgumentParser:
 
               # Emulate a decoder when inputting e92d4800 as little endian
               mcdecoder emulate --byteorder little --input 00482de9 mc.yaml
+
+              # Emulate a decoder choosing only the first matched instruction as a generated decoder does
+              mcdecoder emulate --first-match --input e92d4800 mc.yaml
             '''))  # noqa: W293
     emulate_parser.add_argument(
         '--input', '--pattern', metavar='indata', dest='bit_pattern', required=True,
@@ -148,6 +182,12 @@ def _create_parser() -> argparse.ArgumentParser:
         '--base', choices=[2, 16], default=16, type=int, help='The base of a binary/hex string (default: 16)')
     emulate_parser.add_argument(
         '--byteorder', choices=['big', 'little'], default='big', help='The byte order of a binary/hex string (default: big)')
+    emulate_parser.add_argument(
+        '--first-match', dest='first_match', action='store_true',
+        help='Output only the first matched instruction in priority order as a generated decoder does')
+    _add_engine_argument(emulate_parser)
+    _add_model_cache_arguments(emulate_parser)
+    _add_trusted_argument(emulate_parser)
     emulate_parser.add_argument(
         'mcfile', help='A path to a machine code description file')
 
@@ -171,6 +211,18 @@ def _create_parser() -> argparse.ArgumentParser:
 
               # Check by inputting the range from 002d4800 to ff2d4800 to a decoder
               mcdecoder check --input xx2d4800 mc.yaml
+
+              # Check by inputting the range from 00000000 to ffffffff to a decoder in 8 processes
+              mcdecoder check --jobs 8 --input xxxxxxxx mc.yaml
+
+              # Check by the algebra of fixed bits without inputting all the binary data to a decoder
+              mcdecoder check --symbolic --input xxxxxxxx mc.yaml
+
+              # Check by saving the progress to check.ckpt and resume checking from it if it exists
+              mcdecoder check --checkpoint check.ckpt --resume --input xxxxxxxx mc.yaml
+
+              # Check by outputting the progress, the speed, ETA and memory usage periodically
+              mcdecoder check --progress --input xxxxxxxx mc.yaml
             '''))  # noqa: E501, W293
     emulate_parser.add_argument(
         '--input', '--pattern', metavar='indata', dest='bit_pattern', required=True, help=textwrap.dedent('''\
@@ -179,10 +231,83 @@ def _create_parser() -> argparse.ArgumentParser:
             --pattern is deprecated and will be removed in version 1.0'''))
     emulate_parser.add_argument(
         '--base', choices=[2, 16], default=16, type=int, help='The base of a binary/hex string (default: 16)')
+    emulate_parser.add_argument(
+        '--jobs', default=1, type=_positive_int, help=textwrap.dedent('''\
+            The count of processes to check in parallel. It must be 1 or more (default: 1).
+            The check result is the same as checking in one process. It is not used with --symbolic'''))
+    emulate_parser.add_argument(
+        '--symbolic', action='store_true', help=textwrap.dedent('''\
+            Check by the algebra of fixed bits of instructions instead of inputting all the binary data.
+            Conditions are tested only for the binary data of their fields.
+            The check result is the same as inputting all the binary data'''))
+    emulate_parser.add_argument(
+        '--checkpoint', metavar='checkpoint_file', dest='checkpoint_file', help=textwrap.dedent('''\
+            A path to a file to save the progress of checking periodically.
+            The file is removed when checking is done. It is not used with --symbolic'''))
+    emulate_parser.add_argument(
+        '--resume', action='store_true', help=textwrap.dedent('''\
+            Resume checking from the file specified by --checkpoint if it exists. It requires --checkpoint.
+            Checking is refused to resume if the MC description or the input binary data has been changed'''))
+    emulate_parser.add_argument(
+        '--progress', action='store_true', help=textwrap.dedent('''\
+            Output the count of checked binary data, the speed, ETA and memory usage every 5 seconds.
+            It is not used with --symbolic'''))
+    _add_engine_argument(emulate_parser)
+    _add_model_cache_arguments(emulate_parser)
+    _add_trusted_argument(emulate_parser)
     emulate_parser.add_argument(
         'mcfile', help='A path to a machine code description file')
 
     return parser
 
 
+def _validate_arguments(parser: argparse.ArgumentParser, args: _Arguments) -> None:
+    """Validate the combination of arguments argparse cannot validate. Exit with an error if it is invalid"""
+    if args.command == 'check' and args.resume and args.checkpoint_file is None:
+        parser.error('argument --resume: requires --checkpoint')
+
+
+def _add_engine_argument(parser: argparse.ArgumentParser) -> None:
+    """Add the argument to select an engine to find matched instructions"""
+    parser.add_argument(
+        '--engine', choices=['linear', 'tree', 'lut', 'table'], default='linear', help=textwrap.dedent('''\
+            The engine to find instructions matched with input binary data (default: linear).
+            Possible engines are:
+
+            * linear: Testing all the instructions
+            * tree: Testing only the instructions narrowed down by decision trees
+            * lut: Looking up a table precomputed for 16-bit instructions and using decision trees for the others
+            * table: Testing only the candidate instructions looked up in two-level tables'''))
+
+
+def _add_model_cache_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the arguments to control the on-disk model cache"""
+    parser.add_argument(
+        '--no-cache', dest='use_cache', action='store_false',
+        help='Create a decoder model from an MC description without the on-disk model cache')
+    parser.add_argument(
+        '--clear-cache', dest='clear_cache', action='store_true',
+        help='Remove all the decoder models stored in the on-disk model cache before running')
+
+
+def _add_trusted_argument(parser: argparse.ArgumentParser) -> None:
+    """Add the argument to skip the schema validation of an MC description already validated"""
+    parser.add_argument(
+        '--trusted', dest='trusted', action='store_true',
+        help='Skip the schema validation of an MC description if the same content has been validated before')
+
+
+def _positive_int(value: str) -> int:
+    """Convert an argument to a positive integer"""
+    try:
+        int_value = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid int value: {value!r}')
+
+    if int_value < 1:
+        raise argparse.ArgumentTypeError(f'must be 1 or more: {int_value}')
+
+    return int_value
+
+
 # endregion
@@ -1,17 +1,63 @@
-from dataclasses import dataclass
+import concurrent.futures
+from dataclasses import dataclass, field
+import datetime
+import hashlib
 import itertools
+import os
+import pickle
 import re
+import tempfile
 import textwrap
-from typing import Callable, FrozenSet, List, Literal, Optional, Set
+import time
+from typing import Callable, Dict, FrozenSet, Iterator, List, Literal, Optional, Set, Tuple, Union, cast
 
 import numpy as np
 
-from . import common, core
+from . import __version__, common, core
+
+# region Exceptions
+
+
+class CheckpointError(Exception):
+    """Raised when checking cannot resume from a checkpoint"""
+    message: str
+    """explanation of the error"""
+
+    def __init__(self, message) -> None:
+        self.message = message
+
+# endregion Exceptions
+
+# region External classes
+
+
+@dataclass
+class CheckProgress:
+    """Progress of checking reported periodically while checking"""
+    checked_count: int
+    """Count of bit patterns checked. It includes the ones checked before resuming from a checkpoint"""
+    total_count: int
+    """Count of all the bit patterns to be checked"""
+    elapsed_time: float
+    """Elapsed time in seconds since checking started"""
+    speed: float
+    """Count of bit patterns checked per second"""
+    remaining_time: Optional[float]
+    """Estimated time in seconds to check the rest of bit patterns. None if it cannot be estimated yet"""
+    memory_usage: Optional[int]
+    """Current resident memory size in bytes of the checking process. None if it is unknown on the platform"""
+
+
+# endregion
 
 # region External functions
 
 
-def check(mcfile: str, bit_pattern: str, base: Literal[2, 16] = 16) -> int:
+def check(mcfile: str, bit_pattern: str, base: Literal[2, 16] = 16, use_cache: bool = False,
+          trusted: bool = False, engine: Literal['linear', 'tree', 'lut', 'table'] = 'linear', jobs: int = 1,
+          symbolic: bool = False, checkpoint_file: Optional[str] = None, resume: bool = False,
+          progress_callback: Optional[Callable[[CheckProgress], None]] = None,
+          progress_interval: Optional[float] = None) -> int:
     """
     Implementation of the sub-command 'check'.
 
@@ -24,12 +70,32 @@ def check(mcfile: str, bit_pattern: str, base: Literal[2, 16] = 16) -> int:
     :param mcfile: Path to an MC description file
     :param bit_pattern: Binary data to be input
     :param base: Base of integer that specifies the expression of binary data
+    :param use_cache: True to use the on-disk model cache
+    :param trusted: True to skip the schema validation of an MC description already validated
+    :param engine: Engine to find instructions. See core.find_matched_instructions for possible engines
+    :param jobs: Count of processes to check in parallel. It must be 1 or more.
+            The result is the same as checking in one process. It is not used with symbolic
+    :param symbolic: True to check by the algebra of fixed bits instead of testing all the bit patterns.
+            The result is the same as testing all the bit patterns
+    :param checkpoint_file: Path to a file to save the progress of checking periodically. None not to save it.
+            The file is removed when checking is done
+    :param resume: True to resume checking from checkpoint_file if it exists. checkpoint_file must be specified.
+            Errors reported before the checkpoint are not output again
+    :param progress_callback: Function called with the progress of checking periodically
+            and once when all the bit patterns are checked. None not to report it. It is not called with symbolic.
+            output_progress can be used to output it
+    :param progress_interval: Min interval in seconds to call progress_callback. None to use the default interval
     :return: Exit code of mcdecoder
     """
     # Check and output progress
     print('-' * 80)
     print('Checking instructions...')
-    result = _check(mcfile, bit_pattern, base, _VEC_SIZE, _output_error)
+    try:
+        result = _check(mcfile, bit_pattern, base, _VEC_SIZE, _output_error, use_cache, trusted, engine, jobs, symbolic,
+                        checkpoint_file, resume, progress_callback, progress_interval)
+    except CheckpointError as e:
+        print(f'Cannot resume checking: {e.message}')
+        return 1
     print('Done.')
 
     # Output check results
@@ -59,6 +125,20 @@ def check(mcfile: str, bit_pattern: str, base: Literal[2, 16] = 16) -> int:
     return 0
 
 
+def output_progress(progress: CheckProgress) -> None:
+    """
+    Output the progress of checking as a line.
+
+    :param progress: Progress of checking
+    """
+    percentage = progress.checked_count / progress.total_count * 100
+    remaining_time = '--:--:--' if progress.remaining_time is None else \
+        str(datetime.timedelta(seconds=round(progress.remaining_time)))
+    memory_usage = 'unknown' if progress.memory_usage is None else f'{progress.memory_usage / (1 << 20):,.1f} MiB'
+    print(f'Progress: {percentage:.1f}% ({progress.checked_count:,} / {progress.total_count:,}), '
+          f'{progress.speed:,.0f} bit patterns/s, ETA {remaining_time}, memory {memory_usage}')
+
+
 # endregion
 
 # region Internal classes
@@ -86,14 +166,8 @@ class _CheckContext:
     """Bit pattern to be checked"""
     decode_context: core.DecodeContextVectorized
     """Context information while decoding"""
-    duplicate_instruction_mat: np.ndarray
-    """
-    N x M matrix of duplicate detections and instructions.
-    Each row expresses a detection instance.
-    Each element holds a bool test result whether an instruction is matched for a code
-
-    NOTE The first row is a dummy to keep a dimension of a matrix.
-    """
+    duplicate_instruction_sets: Set[Tuple[int, ...]] = field(default_factory=set)
+    """Set of detected duplicate instructions. Each entry holds the index numbers of instructions matched for a code"""
     undefined_count: int = 0
     """Detected count of undefined instructions"""
     duplicate_count: int = 0
@@ -105,6 +179,99 @@ class _CheckContext:
     """
     ongoing_duplicate_range_vec: Optional[np.ndarray] = None
     """Ongoing detection range of a duplicate instruction. This is 4-vector of step start, bits start, step end and bits end"""
+    step_fixed_bit_mask_vec: Optional[np.ndarray] = None
+    """
+    Vector of masks of fixed bit positions of instructions which can match with the bit pattern.
+    Bits are ones of steps. None to regard all the instructions as reachable in any chunks
+    """
+    step_fixed_bits_vec: Optional[np.ndarray] = None
+    """Vector of fixed bits of instructions which can match with the bit pattern. Bits are ones of steps"""
+
+
+@dataclass
+class _ChunkResult:
+    """Result of matching a chunk of codes before reporting errors"""
+    step_end: int
+    """Step number of the last code in a chunk"""
+    undefined_range_mat: np.ndarray
+    """N x 4 matrix of undefined ranges x (step start, bits start, step end and bits end)"""
+    duplicate_range_mat: np.ndarray
+    """N x 4 matrix of duplicate ranges x (step start, bits start, step end and bits end)"""
+    duplicate_instruction_sets: Set[Tuple[int, ...]]
+    """Set of duplicate instructions detected in a chunk. See _CheckContext.duplicate_instruction_sets"""
+
+
+@dataclass
+class _SymbolicInstruction:
+    """Instruction projected onto the variable bits of a bit pattern. Bits are ones of steps"""
+    index: int
+    """Index number of an instruction in McDecoder.instructions"""
+    fixed_bit_mask: int
+    """Mask of fixed bit positions of an instruction in the variable bits"""
+    fixed_bits: int
+    """Fixed bits of an instruction in the variable bits"""
+    dependency_mask: int
+    """Mask of bit positions whether an instruction matches depends on, that is, fixed bits and fields of conditions"""
+    has_condition: bool
+    """True if an instruction has a match/unmatch condition"""
+
+
+@dataclass
+class _SymbolicSplitNode:
+    """Node of steps split by a variable bit into the steps with the bit 0 and ones with the bit 1"""
+    zero_node: '_SymbolicNode'
+    """Node of the first half of steps"""
+    one_node: '_SymbolicNode'
+    """Node of the second half of steps"""
+
+
+_SymbolicNode = Union[Tuple[int, ...], _SymbolicSplitNode]
+"""
+Node of steps in symbolic checking.
+A tuple of index numbers of instructions matched with all the steps or _SymbolicSplitNode
+"""
+
+
+@dataclass
+class _SymbolicCheckContext:
+    """Context information while checking symbolically"""
+    check_context: _CheckContext
+    """Context information while checking"""
+    instructions: List[_SymbolicInstruction]
+    """Instructions which can match with the bit pattern"""
+    engine: Literal['linear', 'tree', 'lut', 'table']
+    """Engine to find instructions to test conditions"""
+    instruction_indexes: Dict[int, int]
+    """Dictionary of the id of an InstructionDecoder and its index number in McDecoder.instructions"""
+    nodes: Dict[Tuple[int, Tuple[Tuple[int, int], ...], Tuple[int, ...]], _SymbolicNode] = field(default_factory=dict)
+    """
+    Dictionary of created nodes to share identical ones.
+    The key is a tuple of a depth, pairs of unresolved instructions and variable bits their conditions depend on
+    and resolved instructions
+    """
+
+
+@dataclass
+class _Checkpoint:
+    """Progress of checking saved to resume it"""
+    version: str
+    """Version of a checkpoint file format"""
+    model_digest: str
+    """Content hash of a decoder model. See _create_model_digest"""
+    bit_pattern: _BitPattern
+    """Bit pattern being checked"""
+    step: int
+    """Step number of the first code not checked yet"""
+    undefined_count: int
+    """Detected count of undefined instructions"""
+    duplicate_count: int
+    """Detected count of duplicate instructions"""
+    ongoing_undefined_range_vec: Optional[np.ndarray]
+    """Ongoing detection range of an undefined instruction. See _CheckContext.ongoing_undefined_range_vec"""
+    ongoing_duplicate_range_vec: Optional[np.ndarray]
+    """Ongoing detection range of a duplicate instruction. See _CheckContext.ongoing_duplicate_range_vec"""
+    duplicate_instruction_sets: Set[Tuple[int, ...]]
+    """Set of detected duplicate instructions. See _CheckContext.duplicate_instruction_sets"""
 
 
 @dataclass
@@ -132,6 +299,21 @@ class _Error:
 _VEC_SIZE = 1 << 16
 """Max size of vectors and rows of matrices used for checking"""
 
+_SHARDS_PER_JOB = 4
+"""Count of shards of the variable bit space per process to balance the loads of processes"""
+
+_CHECKPOINT_INTERVAL = 60.0
+"""Interval in seconds to save a checkpoint"""
+
+_PROGRESS_INTERVAL = 5.0
+"""Default min interval in seconds to report the progress of checking"""
+
+_CHECKPOINT_VERSION: str = f'{__version__.__version__}-1'
+"""Version of a checkpoint file format. Checkpoints of other versions cannot be resumed"""
+
+_shard_context: Optional[_CheckContext] = None
+"""Context information of a process checking shards"""
+
 
 # endregion
 
@@ -148,11 +330,20 @@ def _output_error(errors: List[_Error]) -> None:
                 f'{error.bits_start:#010x} - {error.bits_end:#010x}: Duplicate (has duplicate instructions)')
 
 
-def _check(mcfile: str, bit_pattern: str, base: Literal[2, 16], vec_size: int, callback: Callable[[List[_Error]], None]) \
-        -> _CheckResult:
+def _check(mcfile: str, bit_pattern: str, base: Literal[2, 16], vec_size: int, callback: Callable[[List[_Error]], None],
+           use_cache: bool = False, trusted: bool = False,
+           engine: Literal['linear', 'tree', 'lut', 'table'] = 'linear', jobs: int = 1,
+           symbolic: bool = False, checkpoint_file: Optional[str] = None, resume: bool = False,
+           progress_callback: Optional[Callable[[CheckProgress], None]] = None,
+           progress_interval: Optional[float] = None) -> _CheckResult:
     """Testable implementation of check sub-command"""
+    if jobs < 1:
+        raise ValueError(f'jobs must be 1 or more: {jobs}')
+    if resume and checkpoint_file is None:
+        raise ValueError('checkpoint_file must be specified to resume checking')
+
     # Create MC decoder model
-    mcdecoder = core.create_mcdecoder_model(mcfile)
+    mcdecoder = core.create_mcdecoder_model(mcfile, use_cache=use_cache, trusted=trusted)
 
     # Trim whitespaces
     trimmed_bit_pattern = common.trim_whitespace(bit_pattern)
@@ -169,84 +360,518 @@ def _check(mcfile: str, bit_pattern: str, base: Literal[2, 16], vec_size: int, c
     parsed_bit_pattern = _create_bit_pattern(converted_bit_pattern, base)
 
     # Check instructions
-    return _check_instructions_vectorized(mcdecoder, parsed_bit_pattern, vec_size, callback)
+    if symbolic:
+        return _check_instructions_symbolically(mcdecoder, parsed_bit_pattern, vec_size, callback, engine)
+
+    return _check_instructions_vectorized(mcdecoder, parsed_bit_pattern, vec_size, callback, engine, jobs, checkpoint_file,
+                                          resume, progress_callback, progress_interval)
 
 
 def _check_instructions_vectorized(mcdecoder: core.McDecoder, bit_pattern: _BitPattern, vec_size: int,
-                                   callback: Callable[[List[_Error]], None]) -> _CheckResult:
+                                   callback: Callable[[List[_Error]], None],
+                                   engine: Literal['linear', 'tree', 'lut', 'table'] = 'linear',
+                                   jobs: int = 1, checkpoint_file: Optional[str] = None,
+                                   resume: bool = False,
+                                   progress_callback: Optional[Callable[[CheckProgress], None]] = None,
+                                   progress_interval: Optional[float] = None) -> _CheckResult:
     """
     Check instructions if they have any errors.
     Errors are reported through callback while checking.
+
+    If jobs >= 2, chunks are matched in processes and reported in the order of chunks,
+    so that errors and a result are the same as checking in one process.
+
+    If checkpoint_file is specified, the progress is saved to it every _CHECKPOINT_INTERVAL seconds.
+    If resume is True, checking restarts from the step saved in it.
+
+    If progress_callback is specified, the progress is reported to it at most every progress_interval seconds
+    (_PROGRESS_INTERVAL if it is None) and once after the last chunk.
     """
     total_count = 1 << bit_pattern.variable_bit_size
+    context = _create_check_context(mcdecoder, bit_pattern)
 
-    # Create check context
-    decode_context = core.DecodeContextVectorized(
-        mcdecoder=mcdecoder, code16x1_vec=np.empty(()), code16x2_vec=np.empty(()), code32x1_vec=np.empty(()))
-
-    # N x M matrix of detected duplicates and instructions holding boolean whether an instruction is matched
-    duplicate_instruction_mat = np.full(
-        (1, len(mcdecoder.instructions)), False)
+    # Resume from a checkpoint
+    model_digest = _create_model_digest(mcdecoder)
+    step_start = 0
+    if checkpoint_file is not None and resume and os.path.exists(checkpoint_file):
+        step_start = _restore_checkpoint(context, checkpoint_file, model_digest)
 
-    context = _CheckContext(bit_pattern=bit_pattern, decode_context=decode_context,
-                            duplicate_instruction_mat=duplicate_instruction_mat)
+    if progress_interval is None:
+        progress_interval = _PROGRESS_INTERVAL
 
     # Iterate over variable bits and emulate decoder
-    for step_start in range(0, total_count, vec_size):
-        step_end = min(step_start + vec_size, total_count) - 1
+    start_time = checkpoint_time = progress_time = time.monotonic()
+    progress_step: Optional[int] = None
+    for chunk_result in _match_chunks(context, range(step_start, total_count, vec_size), total_count, vec_size, engine,
+                                      jobs):
+        _report_chunk(context, chunk_result, callback)
+
+        # Save a checkpoint periodically
+        if checkpoint_file is not None and time.monotonic() - checkpoint_time >= _CHECKPOINT_INTERVAL:
+            _store_checkpoint(context, checkpoint_file, model_digest, chunk_result.step_end + 1)
+            checkpoint_time = time.monotonic()
+
+        # Report the progress periodically
+        if progress_callback is not None and time.monotonic() - progress_time >= progress_interval:
+            progress_time = time.monotonic()
+            progress_step = chunk_result.step_end + 1
+            progress_callback(_create_progress(progress_step, total_count, step_start, progress_time - start_time))
+
+    # Report the progress of checking done
+    if progress_callback is not None and progress_step != total_count:
+        progress_callback(_create_progress(total_count, total_count, step_start, time.monotonic() - start_time))
 
-        # Make bits to test
-        step_vec = np.arange(step_start, step_end + 1)
-        bits_vec = _make_bits(context, step_vec)
+    # Handle left errors
+    errors = _create_left_errors(context)
 
-        context.decode_context.code32x1_vec = bits_vec
-        context.decode_context.code16x1_vec = bits_vec >> 16
-        context.decode_context.code16x2_vec = bits_vec
+    # Report errors
+    if len(errors) > 0:
+        errors = sorted(errors, key=lambda error: error.bits_start)
+        callback(errors)
 
-        # Emulate decode matching
-        test_mat = core.find_matched_instructions_vectorized(
-            context.decode_context)
-        matched_instruction_count_vec = np.sum(test_mat, axis=1)
+    # Find duplicate instruction pairs
+    duplicate_instruction_pairs = _detect_duplicate_instruction_pairs(context)
 
-        # Combine step, bits and test result
-        # N x 2 matrix of codes x (step, bits)
-        header_mat = np.hstack(
-            (step_vec.reshape(-1, 1), bits_vec.reshape(-1, 1)))
+    # Remove a checkpoint of checking done
+    if checkpoint_file is not None and os.path.exists(checkpoint_file):
+        os.remove(checkpoint_file)
 
-        # Collect errors
-        errors: List[_Error] = []
+    # Create result
+    no_error_count = total_count - context.undefined_count - context.duplicate_count
 
-        # Find undefined
-        undefined_errors = _detect_undefined_errors(
-            context, header_mat, matched_instruction_count_vec, step_end)
-        errors.extend(undefined_errors)
+    return _CheckResult(no_error_count=no_error_count, undefined_error_count=context.undefined_count,
+                        duplicate_error_count=context.duplicate_count, duplicate_instruction_pairs=duplicate_instruction_pairs)
 
-        # Find duplicates
-        duplicate_errors = _detect_duplicate_errors(
-            context, header_mat, test_mat, matched_instruction_count_vec, step_end)
-        errors.extend(duplicate_errors)
 
-        # Report errors
-        if len(errors) > 0:
-            errors = sorted(errors, key=lambda error: error.bits_start)
-            callback(errors)
+def _match_chunks(context: _CheckContext, step_starts: range, total_count: int, vec_size: int,
+                  engine: Literal['linear', 'tree', 'lut', 'table'], jobs: int) -> Iterator[_ChunkResult]:
+    """
+    Match chunks of codes in order of steps
+
+    :param step_starts: Step numbers of the first codes of chunks
+    :param jobs: Count of processes to match chunks in parallel
+    :return: Iterator of the results of chunks
+    """
+    if jobs <= 1 or len(step_starts) == 0:
+        for step_start in step_starts:
+            yield _match_chunk(context, step_start, min(step_start + vec_size, total_count) - 1, engine)
+        return
+
+    # Partition chunks into contiguous shards
+    shard_count = min(jobs * _SHARDS_PER_JOB, len(step_starts))
+    shard_offsets = [len(step_starts) * shard // shard_count for shard in range(shard_count + 1)]
+    shards = [(step_starts[start], min(step_starts[end - 1] + vec_size, total_count) - 1)
+              for start, end in zip(shard_offsets[:-1], shard_offsets[1:])]
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=_initialize_shard_process,
+                                                initargs=(context.decode_context.mcdecoder, context.bit_pattern)) as executor:
+        for chunk_results in executor.map(_match_shard, shards, itertools.repeat(vec_size), itertools.repeat(engine)):
+            yield from chunk_results
+
+
+def _create_progress(step: int, total_count: int, step_start: int, elapsed_time: float) -> CheckProgress:
+    """
+    Create the progress of checking.
+    The speed is measured from step_start, the first step checked after resuming, to exclude the steps in a checkpoint.
+    """
+    speed = (step - step_start) / elapsed_time if elapsed_time > 0 else 0.0
+    remaining_time = (total_count - step) / speed if speed > 0 else None
+
+    return CheckProgress(checked_count=step, total_count=total_count, elapsed_time=elapsed_time, speed=speed,
+                         remaining_time=remaining_time, memory_usage=_get_memory_usage())
+
+
+def _get_memory_usage() -> Optional[int]:
+    """
+    Get the current resident memory size in bytes of this process.
+    It is read from /proc and None on the platforms without it.
+    Processes of jobs are not included.
+    """
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def _create_model_digest(mcdecoder: core.McDecoder) -> str:
+    """Content hash of the parts of a decoder model which affect the result of checking"""
+    digest = hashlib.sha256()
+    for instruction in mcdecoder.instructions:
+        digest.update(repr((instruction.name, instruction.encoding_element_bit_length,
+                            instruction.length_of_encoding_elements, instruction.fixed_bit_mask, instruction.fixed_bits,
+                            instruction.match_condition, instruction.unmatch_condition,
+                            [(field_decoder.name, field_decoder.subfields) for field_decoder in instruction.fields]))
+                      .encode())
+
+    return digest.hexdigest()
+
+
+def _store_checkpoint(context: _CheckContext, checkpoint_file: str, model_digest: str, step: int) -> None:
+    """Save the progress of checking before a step to a checkpoint file"""
+    checkpoint = _Checkpoint(
+        version=_CHECKPOINT_VERSION, model_digest=model_digest, bit_pattern=context.bit_pattern, step=step,
+        undefined_count=context.undefined_count, duplicate_count=context.duplicate_count,
+        ongoing_undefined_range_vec=context.ongoing_undefined_range_vec,
+        ongoing_duplicate_range_vec=context.ongoing_duplicate_range_vec,
+        duplicate_instruction_sets=context.duplicate_instruction_sets)
+
+    # Write the checkpoint file atomically not to break it by preemption
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(os.path.abspath(checkpoint_file)), suffix='.tmp',
+                                     delete=False) as file:
+        pickle.dump(checkpoint, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    os.replace(file.name, checkpoint_file)
 
-    # Handle left errors
-    errors = _create_left_errors(context)
+
+def _restore_checkpoint(context: _CheckContext, checkpoint_file: str, model_digest: str) -> int:
+    """
+    Restore the progress of checking from a checkpoint file
+
+    :return: Step number to resume checking from
+    """
+    try:
+        with open(checkpoint_file, 'rb') as file:
+            checkpoint = cast(_Checkpoint, pickle.load(file))
+    except Exception:
+        raise CheckpointError(f'The checkpoint file is broken: {checkpoint_file}')
+
+    if not isinstance(checkpoint, _Checkpoint) or checkpoint.version != _CHECKPOINT_VERSION:
+        raise CheckpointError(f'The checkpoint file is of another version of mcdecoder: {checkpoint_file}')
+
+    if checkpoint.model_digest != model_digest:
+        raise CheckpointError(f'The MC description has been changed since the checkpoint: {checkpoint_file}')
+
+    if checkpoint.bit_pattern != context.bit_pattern:
+        raise CheckpointError(f'The bit pattern is different from the one of the checkpoint: {checkpoint_file}')
+
+    context.undefined_count = checkpoint.undefined_count
+    context.duplicate_count = checkpoint.duplicate_count
+    context.ongoing_undefined_range_vec = checkpoint.ongoing_undefined_range_vec
+    context.ongoing_duplicate_range_vec = checkpoint.ongoing_duplicate_range_vec
+    context.duplicate_instruction_sets = checkpoint.duplicate_instruction_sets
+    return checkpoint.step
+
+
+def _check_instructions_symbolically(mcdecoder: core.McDecoder, bit_pattern: _BitPattern, vec_size: int,
+                                     callback: Callable[[List[_Error]], None],
+                                     engine: Literal['linear', 'tree', 'lut', 'table'] = 'linear') -> _CheckResult:
+    """
+    Check instructions if they have any errors by the algebra of fixed bits.
+    Errors are reported through callback while checking.
+
+    The variable bits are split from the MSB until all the instructions which can match are resolved,
+    that is, their fixed bits and the fields of their conditions are determined.
+    Conditions are tested only once for each combination of the bits of their fields.
+    Identical nodes are shared, so that the steps are not enumerated.
+    Errors and a result are the same as _check_instructions_vectorized except for the batches of errors reported.
+    """
+    total_count = 1 << bit_pattern.variable_bit_size
+    context = _SymbolicCheckContext(check_context=_create_check_context(mcdecoder, bit_pattern),
+                                    instructions=_create_symbolic_instructions(mcdecoder, bit_pattern), engine=engine,
+                                    instruction_indexes={id(instruction): i
+                                                         for i, instruction in enumerate(mcdecoder.instructions)})
+
+    # Split the variable bits
+    root_node = _create_symbolic_node(context, 0, 0, tuple(range(len(context.instructions))), ())
+
+    # Make errors from the runs of steps with the same count of matched instructions
+    check_context = context.check_context
+    errors: List[_Error] = []
+    range_type: Optional[Literal['undefined', 'duplicate']] = None
+    range_start = 0
+    step = 0
+    # NOTE An empty run with no errors is appended to end the last range
+    for step_count, matched_instruction_indexes in itertools.chain(_iterate_symbolic_runs(root_node, total_count),
+                                                                   [(0, (0,))]):
+        run_type: Optional[Literal['undefined', 'duplicate']] = None
+        if len(matched_instruction_indexes) == 0:
+            run_type = 'undefined'
+        elif len(matched_instruction_indexes) >= 2:
+            run_type = 'duplicate'
+            check_context.duplicate_instruction_sets.add(matched_instruction_indexes)
+
+        if run_type != range_type:
+            # Create an error of the range ended
+            if range_type is not None:
+                bits_start, bits_end = _make_bits(check_context, np.array([range_start, step - 1])).tolist()
+                if range_type == 'undefined':
+                    check_context.undefined_count += step - range_start
+                else:
+                    check_context.duplicate_count += step - range_start
+                errors.append(_Error(type=range_type, bits_start=bits_start, bits_end=bits_end))
+
+                # Report errors
+                if len(errors) >= vec_size:
+                    callback(errors)
+                    errors = []
+
+            range_type = run_type
+            range_start = step
+
+        step += step_count
 
     # Report errors
     if len(errors) > 0:
-        errors = sorted(errors, key=lambda error: error.bits_start)
         callback(errors)
 
     # Find duplicate instruction pairs
-    duplicate_instruction_pairs = _detect_duplicate_instruction_pairs(context)
+    duplicate_instruction_pairs = _detect_duplicate_instruction_pairs(check_context)
 
     # Create result
-    no_error_count = total_count - context.undefined_count - context.duplicate_count
+    no_error_count = total_count - check_context.undefined_count - check_context.duplicate_count
+
+    return _CheckResult(no_error_count=no_error_count, undefined_error_count=check_context.undefined_count,
+                        duplicate_error_count=check_context.duplicate_count,
+                        duplicate_instruction_pairs=duplicate_instruction_pairs)
+
+
+def _create_symbolic_instructions(mcdecoder: core.McDecoder, bit_pattern: _BitPattern) -> List[_SymbolicInstruction]:
+    """Project instructions onto the variable bits. Instructions never matching with the bit pattern are excluded"""
+    variable_bit_mask = _project_to_bits(bit_pattern, common.make_mask(bit_pattern.variable_bit_size))
+
+    symbolic_instructions: List[_SymbolicInstruction] = []
+    for i, instruction in enumerate(mcdecoder.instructions):
+        # Make masks of bits. Codes of 16-bit instructions are the upper 16 bits
+        shift = 16 if instruction.length_of_encoding_elements * instruction.encoding_element_bit_length == 16 else 0
+        fixed_bit_mask = instruction.fixed_bit_mask << shift
+        fixed_bits = instruction.fixed_bits << shift
+        condition = instruction.match_condition if instruction.match_condition is not None \
+            else instruction.unmatch_condition
+        condition_field_names = set(_condition_field_names(condition)) if condition is not None else set()
+        condition_field_mask = 0
+        for field_decoder in instruction.fields:
+            if field_decoder.name in condition_field_names:
+                for subfield_decoder in field_decoder.subfields:
+                    condition_field_mask |= subfield_decoder.mask << shift
+
+        # Exclude an instruction whose fixed bits conflict with the fixed bits of the bit pattern
+        pattern_fixed_bit_mask = fixed_bit_mask & ~variable_bit_mask
+        if fixed_bits & pattern_fixed_bit_mask != bit_pattern.fixed_bits & pattern_fixed_bit_mask:
+            continue
+
+        symbolic_instructions.append(_SymbolicInstruction(
+            index=i, fixed_bit_mask=_project_to_steps(bit_pattern, fixed_bit_mask),
+            fixed_bits=_project_to_steps(bit_pattern, fixed_bits & fixed_bit_mask),
+            dependency_mask=_project_to_steps(bit_pattern, fixed_bit_mask | condition_field_mask),
+            has_condition=condition is not None))
+
+    return symbolic_instructions
+
+
+def _condition_field_names(condition: core.InstructionDecoderCondition) -> Iterator[str]:
+    """Iterate over the names of fields a condition refers to"""
+    if isinstance(condition, (core.AndIdCondition, core.OrIdCondition)):
+        for child_condition in condition.conditions:
+            yield from _condition_field_names(child_condition)
+    else:
+        for condition_object in [getattr(condition, 'subject', None), getattr(condition, 'object', None)]:
+            if isinstance(condition_object, core.FunctionIdConditionObject):
+                yield condition_object.argument.field
+            elif isinstance(condition_object, core.FieldIdConditionObject):
+                yield condition_object.field
 
-    return _CheckResult(no_error_count=no_error_count, undefined_error_count=context.undefined_count,
-                        duplicate_error_count=context.duplicate_count, duplicate_instruction_pairs=duplicate_instruction_pairs)
+
+def _project_to_bits(bit_pattern: _BitPattern, step: int) -> int:
+    """Scatter variable bits of a step to the bit positions in a bit pattern"""
+    bits = 0
+    for bit_range in bit_pattern.variable_bit_ranges:
+        bits |= (step & bit_range.mask) << bit_range.shift
+    return bits
+
+
+def _project_to_steps(bit_pattern: _BitPattern, bits: int) -> int:
+    """Gather bits at the variable bit positions in a bit pattern to a step"""
+    step = 0
+    for bit_range in bit_pattern.variable_bit_ranges:
+        step |= (bits >> bit_range.shift) & bit_range.mask
+    return step
+
+
+def _create_symbolic_node(context: _SymbolicCheckContext, depth: int, prefix: int, unresolved_indexes: Tuple[int, ...],
+                          matched_instruction_indexes: Tuple[int, ...]) -> _SymbolicNode:
+    """
+    Create a node of the steps starting with a prefix
+
+    :param context: Context information while checking symbolically
+    :param depth: Count of the upper variable bits determined by a prefix
+    :param prefix: Upper variable bits of the steps
+    :param unresolved_indexes: Index numbers of instructions in context.instructions not resolved yet
+    :param matched_instruction_indexes: Sorted index numbers of instructions matched with all the steps
+    :return: Created node
+    """
+    symbolic_instructions = context.instructions
+    lower_bit_count = context.check_context.bit_pattern.variable_bit_size - depth
+    lower_bit_mask = common.make_mask(lower_bit_count)
+
+    # Resolve instructions not depending on the lower bits
+    unresolved_indexes_left: List[int] = []
+    conditional_indexes: List[int] = []
+    resolved_instruction_indexes = list(matched_instruction_indexes)
+    for i in unresolved_indexes:
+        if symbolic_instructions[i].dependency_mask & lower_bit_mask != 0:
+            unresolved_indexes_left.append(i)
+        elif symbolic_instructions[i].has_condition:
+            conditional_indexes.append(i)
+        else:
+            resolved_instruction_indexes.append(symbolic_instructions[i].index)
+
+    if len(conditional_indexes) > 0:
+        # NOTE The conditions are tested with any step in a node because their fields are determined
+        instruction_indexes = _find_matched_instruction_indexes(context, prefix << lower_bit_count)
+        resolved_instruction_indexes.extend(symbolic_instructions[i].index for i in conditional_indexes
+                                            if symbolic_instructions[i].index in instruction_indexes)
+
+    matched_instruction_indexes = tuple(sorted(resolved_instruction_indexes))
+    if len(unresolved_indexes_left) == 0:
+        return matched_instruction_indexes
+
+    # Share an identical node
+    steps = prefix << lower_bit_count
+    node_key = (depth, tuple((i, steps & symbolic_instructions[i].dependency_mask if symbolic_instructions[i].has_condition
+                              else 0) for i in unresolved_indexes_left), matched_instruction_indexes)
+    node = context.nodes.get(node_key)
+    if node is not None:
+        return node
+
+    # Split by the next variable bit
+    bit = lower_bit_count - 1
+    child_nodes: List[_SymbolicNode] = []
+    for bit_value in [0, 1]:
+        child_indexes = tuple(i for i in unresolved_indexes_left
+                              if (symbolic_instructions[i].fixed_bit_mask >> bit) & 1 == 0
+                              or (symbolic_instructions[i].fixed_bits >> bit) & 1 == bit_value)
+        child_nodes.append(_create_symbolic_node(context, depth + 1, (prefix << 1) | bit_value, child_indexes,
+                                                 matched_instruction_indexes))
+
+    zero_node, one_node = child_nodes
+    node = zero_node if isinstance(zero_node, tuple) and zero_node == one_node \
+        else _SymbolicSplitNode(zero_node=zero_node, one_node=one_node)
+    context.nodes[node_key] = node
+    return node
+
+
+def _find_matched_instruction_indexes(context: _SymbolicCheckContext, step: int) -> Set[int]:
+    """Find index numbers of instructions matched with the bits of a step"""
+    mcdecoder = context.check_context.decode_context.mcdecoder
+    bits = _project_to_bits(context.check_context.bit_pattern, step) | context.check_context.bit_pattern.fixed_bits
+    decode_context = core.DecodeContext(mcdecoder=mcdecoder, code16x1=bits >> 16, code16x2=bits, code32x1=bits)
+    return {context.instruction_indexes[id(instruction)]
+            for instruction in core.find_matched_instructions(decode_context, context.engine)}
+
+
+def _iterate_symbolic_runs(root_node: _SymbolicNode, step_count: int) -> Iterator[Tuple[int, Tuple[int, ...]]]:
+    """
+    Iterate over runs of steps with the same matched instructions in order of steps
+
+    :return: Iterator of pairs of the count of steps in a run and index numbers of instructions matched with them
+    """
+    # Walk nodes in depth-first order with a stack of pairs of a node and the count of its steps
+    stack: List[Tuple[_SymbolicNode, int]] = [(root_node, step_count)]
+    while len(stack) > 0:
+        node, step_count = stack.pop()
+        if isinstance(node, tuple):
+            yield step_count, node
+        else:
+            stack.append((node.one_node, step_count >> 1))
+            stack.append((node.zero_node, step_count >> 1))
+
+
+def _create_check_context(mcdecoder: core.McDecoder, bit_pattern: _BitPattern) -> _CheckContext:
+    decode_context = core.DecodeContextVectorized(
+        mcdecoder=mcdecoder, code16x1_vec=np.empty(()), code16x2_vec=np.empty(()), code32x1_vec=np.empty(()))
+    symbolic_instructions = _create_symbolic_instructions(mcdecoder, bit_pattern)
+    return _CheckContext(
+        bit_pattern=bit_pattern, decode_context=decode_context,
+        step_fixed_bit_mask_vec=np.array([instruction.fixed_bit_mask for instruction in symbolic_instructions],
+                                         dtype=np.int64),
+        step_fixed_bits_vec=np.array([instruction.fixed_bits for instruction in symbolic_instructions], dtype=np.int64))
+
+
+def _initialize_shard_process(mcdecoder: core.McDecoder, bit_pattern: _BitPattern) -> None:
+    """Initialize a process checking shards. A decoder model is passed once for each process"""
+    global _shard_context
+    _shard_context = _create_check_context(mcdecoder, bit_pattern)
+
+
+def _match_shard(shard: Tuple[int, int], vec_size: int,
+                 engine: Literal['linear', 'tree', 'lut', 'table']) -> List[_ChunkResult]:
+    """
+    Match the chunks of a shard in a process checking shards
+
+    :param shard: Pair of step numbers of the first and the last codes in a shard
+    :return: Results of the chunks in a shard
+    """
+    assert _shard_context is not None
+    shard_start, shard_end = shard
+    return [_match_chunk(_shard_context, step_start, min(step_start + vec_size - 1, shard_end), engine)
+            for step_start in range(shard_start, shard_end + 1, vec_size)]
+
+
+def _match_chunk(context: _CheckContext, step_start: int, step_end: int,
+                 engine: Literal['linear', 'tree', 'lut', 'table']) -> _ChunkResult:
+    """
+    Match a chunk of codes and find the ranges of errors in it.
+
+    A chunk is not matched at all if no instructions can reach it.
+    """
+    # Skip a chunk no instructions can reach, that is, its upper steps bits conflict with all the fixed bits
+    if not _has_reachable_instructions(context, step_start, step_end):
+        return _ChunkResult(
+            step_end=step_end, undefined_range_mat=np.array([[
+                step_start, *_make_bits(context, np.array([step_start])).tolist(),
+                step_end, *_make_bits(context, np.array([step_end])).tolist()]], dtype=np.int64),
+            duplicate_range_mat=np.empty((0, 4), dtype=np.int64), duplicate_instruction_sets=set())
+
+    # Make bits to test
+    step_vec = np.arange(step_start, step_end + 1)
+    bits_vec = _make_bits(context, step_vec)
+
+    context.decode_context.code32x1_vec = bits_vec
+    context.decode_context.code16x1_vec = bits_vec >> 16
+    context.decode_context.code16x2_vec = bits_vec
+
+    # Emulate decode matching
+    match_result = core.find_matched_instructions_sparse(
+        context.decode_context, engine)
+    matched_instruction_count_vec = match_result.matched_count_vec
+
+    return _ChunkResult(
+        step_end=step_end,
+        undefined_range_mat=_create_range_mat(step_start, bits_vec, np.flatnonzero(matched_instruction_count_vec == 0)),
+        duplicate_range_mat=_create_range_mat(step_start, bits_vec, np.flatnonzero(matched_instruction_count_vec >= 2)),
+        duplicate_instruction_sets=_detect_duplicate_instruction_sets(match_result, matched_instruction_count_vec))
+
+
+def _has_reachable_instructions(context: _CheckContext, step_start: int, step_end: int) -> bool:
+    """Test if any instructions can match with a chunk by the upper step bits common to all the steps of a chunk"""
+    if context.step_fixed_bit_mask_vec is None or context.step_fixed_bits_vec is None:
+        return True
+
+    common_step_bit_mask = ~common.make_mask((step_start ^ step_end).bit_length())
+    return bool(np.any((context.step_fixed_bits_vec ^ step_start) & context.step_fixed_bit_mask_vec
+                       & common_step_bit_mask == 0))
+
+
+def _report_chunk(context: _CheckContext, chunk_result: _ChunkResult, callback: Callable[[List[_Error]], None]) -> None:
+    """Report errors of a chunk concatenating their ranges with ongoing ones of the previous chunk"""
+    context.duplicate_instruction_sets.update(chunk_result.duplicate_instruction_sets)
+
+    # Collect errors
+    errors: List[_Error] = []
+
+    # Find undefined
+    undefined_errors = _detect_undefined_errors(context, chunk_result.undefined_range_mat, chunk_result.step_end)
+    errors.extend(undefined_errors)
+
+    # Find duplicates
+    duplicate_errors = _detect_duplicate_errors(context, chunk_result.duplicate_range_mat, chunk_result.step_end)
+    errors.extend(duplicate_errors)
+
+    # Report errors
+    if len(errors) > 0:
+        errors = sorted(errors, key=lambda error: error.bits_start)
+        callback(errors)
 
 
 def _create_bit_pattern(bit_pattern: str, base: Literal[2, 16]) -> _BitPattern:
@@ -285,115 +910,99 @@ def _create_bit_pattern(bit_pattern: str, base: Literal[2, 16]) -> _BitPattern:
     return _BitPattern(fixed_bits=fixed_bits, variable_bit_size=variable_bit_size, variable_bit_ranges=variable_bit_ranges)
 
 
-def _detect_undefined_errors(context: _CheckContext, header_mat: np.ndarray, matched_instruction_count_vec: np.ndarray,
-                             step_end: int) -> List[_Error]:
-    errors = []
+def _create_range_mat(step_start: int, bits_vec: np.ndarray, error_row_vec: np.ndarray) -> np.ndarray:
+    """
+    Split codes with errors into ranges of sequential steps
 
-    undefined_header_mat = header_mat[matched_instruction_count_vec == 0]
-    # N x M matrix of ranges x (step start, bits start, step end and bits end). Each row expresses a range
-    undefined_range_mat: Optional[np.ndarray] = None
-    if len(undefined_header_mat) > 0:
-        # Split ranges
-        start_index_vec = np.hstack((np.array([0]), np.where(
-            np.diff(undefined_header_mat[:, 0]) != 1)[0] + 1))
-        end_index_vec = np.hstack(
-            (np.where(np.diff(undefined_header_mat[:, 0]) != 1)[0], np.array([-1])))
-        undefined_range_mat = np.hstack(
-            (undefined_header_mat[start_index_vec], undefined_header_mat[end_index_vec]))
-
-        # Concatenate ongoing undefined range
-        if context.ongoing_undefined_range_vec is not None:
-            if undefined_range_mat[0, 0] == context.ongoing_undefined_range_vec[2] + 1:
-                undefined_range_mat[0,
-                                    0:2] = context.ongoing_undefined_range_vec[0:2]
-            else:
-                undefined_range_mat = np.vstack(
-                    (context.ongoing_undefined_range_vec, undefined_range_mat))
+    :param step_start: Step number of the first code in a chunk
+    :param bits_vec: N-vector of the bits of codes in a chunk
+    :param error_row_vec: Vector of sorted row numbers of codes with errors
+    :return: N x 4 matrix of ranges x (step start, bits start, step end and bits end). Each row expresses a range
+    """
+    if error_row_vec.shape[0] == 0:
+        return np.empty((0, 4), dtype=np.int64)
 
-            context.ongoing_undefined_range_vec = None
+    split_vec = np.flatnonzero(np.diff(error_row_vec) != 1)
+    start_row_vec = error_row_vec[np.concatenate(([0], split_vec + 1))]
+    end_row_vec = error_row_vec[np.concatenate((split_vec, [-1]))]
+    return np.stack((start_row_vec + step_start, bits_vec[start_row_vec].astype(np.int64),
+                     end_row_vec + step_start, bits_vec[end_row_vec].astype(np.int64)), axis=1)
 
-    else:
-        # Use ongoing undefined range
-        if context.ongoing_undefined_range_vec is not None:
-            undefined_range_mat = context.ongoing_undefined_range_vec.reshape(
-                1, 4)
-            context.ongoing_undefined_range_vec = None
-
-    if undefined_range_mat is not None:
-        # Save ongoing undefined range
-        if undefined_range_mat[-1, 2] == step_end:
-            context.ongoing_undefined_range_vec = undefined_range_mat[-1]
-            undefined_range_mat = undefined_range_mat[:-1]
-
-        # Create errors
-        for undefined_range_vec in undefined_range_mat:
-            error_step_start, error_bits_start = undefined_range_vec[0:2]
-            error_step_end, error_bits_end = undefined_range_vec[2:4]
-            context.undefined_count += error_step_end - error_step_start + 1
-            errors.append(
-                _Error(type='undefined', bits_start=error_bits_start, bits_end=error_bits_end))
 
-    return errors
+def _detect_duplicate_instruction_sets(match_result: core.InstructionMatchResult,
+                                       matched_instruction_count_vec: np.ndarray) -> Set[Tuple[int, ...]]:
+    """Detect duplicate instructions. Codes are grouped by their counts of matched instructions"""
+    duplicate_instruction_sets: Set[Tuple[int, ...]] = set()
+    duplicate_row_vec = np.flatnonzero(matched_instruction_count_vec >= 2)
+    duplicate_count_vec = matched_instruction_count_vec[duplicate_row_vec]
+    for count in np.unique(duplicate_count_vec).tolist():
+        offset_vec = match_result.row_offset_vec[duplicate_row_vec[duplicate_count_vec == count]]
+        instruction_index_mat = match_result.instruction_index_vec[offset_vec.reshape(-1, 1) + np.arange(count)]
+        duplicate_instruction_sets.update(
+            tuple(instruction_indexes) for instruction_indexes in np.unique(instruction_index_mat, axis=0).tolist())
 
+    return duplicate_instruction_sets
 
-def _detect_duplicate_errors(context: _CheckContext, header_mat: np.ndarray, test_mat: np.ndarray,
-                             matched_instruction_count_vec: np.ndarray, step_end: int) -> List[_Error]:
+
+def _detect_undefined_errors(context: _CheckContext, undefined_range_mat: np.ndarray, step_end: int) -> List[_Error]:
     errors = []
 
-    duplicate_header_mat = header_mat[matched_instruction_count_vec >= 2]
-    # N x M matrix of ranges x (step start, bits start, step end and bits end). Each row expresses a range
-    duplicate_range_mat: Optional[np.ndarray] = None
-    if len(duplicate_header_mat) > 0:
-        # Save duplicate instruction pairs
-        duplicate_test_mat = test_mat[matched_instruction_count_vec >= 2]
-        duplicate_instruction_mat = np.unique(
-            duplicate_test_mat, axis=0)
-        context.duplicate_instruction_mat = np.vstack(
-            (context.duplicate_instruction_mat, duplicate_instruction_mat))
-
-        # Split ranges
-        start_index_vec = np.hstack((np.array([0]), np.where(
-            np.diff(duplicate_header_mat[:, 0]) != 1)[0] + 1))
-        end_index_vec = np.hstack(
-            (np.where(np.diff(duplicate_header_mat[:, 0]) != 1)[0], np.array([-1])))
-        duplicate_range_mat = np.hstack(
-            (duplicate_header_mat[start_index_vec], duplicate_header_mat[end_index_vec]))
-
-        # Concatenate ongoing duplicate range
-        if context.ongoing_duplicate_range_vec is not None:
-            if duplicate_range_mat[0, 0] == context.ongoing_duplicate_range_vec[2] + 1:
-                duplicate_range_mat[0,
-                                    0:2] = context.ongoing_duplicate_range_vec[0:2]
-            else:
-                duplicate_range_mat = np.vstack(
-                    (context.ongoing_duplicate_range_vec, duplicate_range_mat))
+    undefined_range_mat, context.ongoing_undefined_range_vec = _concatenate_ongoing_range(
+        undefined_range_mat, context.ongoing_undefined_range_vec, step_end)
 
-            context.ongoing_duplicate_range_vec = None
+    # Create errors
+    for undefined_range_vec in undefined_range_mat:
+        error_step_start, error_bits_start = undefined_range_vec[0:2]
+        error_step_end, error_bits_end = undefined_range_vec[2:4]
+        context.undefined_count += error_step_end - error_step_start + 1
+        errors.append(
+            _Error(type='undefined', bits_start=error_bits_start, bits_end=error_bits_end))
+
+    return errors
 
-    else:
-        # Use ongoing duplicate range
-        if context.ongoing_duplicate_range_vec is not None:
-            duplicate_range_mat = context.ongoing_duplicate_range_vec.reshape(
-                1, 4)
-            context.ongoing_duplicate_range_vec = None
-
-    if duplicate_range_mat is not None:
-        # Save ongoing duplicate range
-        if duplicate_range_mat[-1, 2] == step_end:
-            context.ongoing_duplicate_range_vec = duplicate_range_mat[-1]
-            duplicate_range_mat = duplicate_range_mat[:-1]
-
-        # Create errors
-        for duplicate_range_vec in duplicate_range_mat:
-            error_step_start, error_bits_start = duplicate_range_vec[0:2]
-            error_step_end, error_bits_end = duplicate_range_vec[2:4]
-            context.duplicate_count += error_step_end - error_step_start + 1
-            errors.append(
-                _Error(type='duplicate', bits_start=error_bits_start, bits_end=error_bits_end))
+
+def _detect_duplicate_errors(context: _CheckContext, duplicate_range_mat: np.ndarray, step_end: int) -> List[_Error]:
+    errors = []
+
+    duplicate_range_mat, context.ongoing_duplicate_range_vec = _concatenate_ongoing_range(
+        duplicate_range_mat, context.ongoing_duplicate_range_vec, step_end)
+
+    # Create errors
+    for duplicate_range_vec in duplicate_range_mat:
+        error_step_start, error_bits_start = duplicate_range_vec[0:2]
+        error_step_end, error_bits_end = duplicate_range_vec[2:4]
+        context.duplicate_count += error_step_end - error_step_start + 1
+        errors.append(
+            _Error(type='duplicate', bits_start=error_bits_start, bits_end=error_bits_end))
 
     return errors
 
 
+def _concatenate_ongoing_range(range_mat: np.ndarray, ongoing_range_vec: Optional[np.ndarray],
+                               step_end: int) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Concatenate an ongoing range of the previous chunk with the ranges of a chunk
+
+    :param range_mat: N x 4 matrix of ranges in a chunk x (step start, bits start, step end and bits end)
+    :param ongoing_range_vec: Ongoing range of the previous chunk. None if no ongoing range
+    :param step_end: Step number of the last code in a chunk
+    :return: Pair of the ranges ended and a new ongoing range reaching the end of a chunk
+    """
+    # Concatenate ongoing range
+    if ongoing_range_vec is not None:
+        if len(range_mat) > 0 and range_mat[0, 0] == ongoing_range_vec[2] + 1:
+            range_mat = range_mat.copy()
+            range_mat[0, 0:2] = ongoing_range_vec[0:2]
+        else:
+            range_mat = np.vstack((ongoing_range_vec, range_mat))
+
+    # Save ongoing range
+    if len(range_mat) > 0 and range_mat[-1, 2] == step_end:
+        return range_mat[:-1], range_mat[-1]
+
+    return range_mat, None
+
+
 def _create_left_errors(context: _CheckContext) -> List[_Error]:
     errors = []
 
@@ -419,30 +1028,22 @@ def _create_left_errors(context: _CheckContext) -> List[_Error]:
 
 
 def _make_bits(context: _CheckContext, step_vec: np.ndarray) -> np.ndarray:
-    bits_vec = np.full_like(step_vec, context.bit_pattern.fixed_bits)
+    # NOTE Bits are made as uint32 because bit patterns are stripped to 32 bits
+    bits_vec = np.full(step_vec.shape, context.bit_pattern.fixed_bits, dtype=np.uint32)
     for bit_range in context.bit_pattern.variable_bit_ranges:
-        bits_vec |= (step_vec & bit_range.mask) << bit_range.shift
+        bits_vec |= ((step_vec & bit_range.mask) << bit_range.shift).astype(np.uint32)
     return bits_vec
 
 
 def _detect_duplicate_instruction_pairs(context: _CheckContext) -> List[List[str]]:
     duplicate_instruction_pairs: Set[FrozenSet[str]] = set()
 
-    # Remove the dummy row
-    duplicate_instruction_mat = context.duplicate_instruction_mat[1:]
-
     # Make unique instruction pair combinations
-    if len(duplicate_instruction_mat) > 0:
-        instruction_name_vec = np.array(
-            [instruction.name for instruction in context.decode_context.mcdecoder.instructions])
-
-        duplicate_instruction_mat = np.unique(
-            duplicate_instruction_mat, axis=0)
-
-        for matched_instruction_vec in duplicate_instruction_mat:
-            instructions = instruction_name_vec[matched_instruction_vec]
-            for instruction_pair in itertools.combinations(instructions, 2):
-                duplicate_instruction_pairs.add(frozenset(instruction_pair))
+    instruction_names = [instruction.name for instruction in context.decode_context.mcdecoder.instructions]
+    for instruction_indexes in context.duplicate_instruction_sets:
+        instructions = [instruction_names[i] for i in instruction_indexes]
+        for instruction_pair in itertools.combinations(instructions, 2):
+            duplicate_instruction_pairs.add(frozenset(instruction_pair))
 
     # Sort duplicate instruction pairs
     sorted_instruction_pairs = sorted(sorted(pair)
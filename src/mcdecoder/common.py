@@ -1,11 +1,26 @@
+import importlib
 import os
 import re
-from typing import Literal
+import types
+from typing import Any, Literal
 
 
 # region External functions
 
 
+def import_lazily(name: str) -> types.ModuleType:
+    """
+    Import a module lazily.
+
+    The returned proxy module imports the actual module on first attribute access.
+    It is used to avoid importing heavy third-party modules on start-up.
+
+    :param name: Absolute name of a module to import
+    :return: Proxy module of the module
+    """
+    return _LazyModule(name)
+
+
 def convert_to_big_endian(bits: str, base: Literal[2, 16], byteorder: Literal['big', 'little']) -> str:
     """
     Convert the byte order of bits to big endian.
@@ -109,3 +124,18 @@ def make_parent_directories(file: str) -> bool:
     return True
 
 # endregion
+
+# region Internal classes
+
+
+class _LazyModule(types.ModuleType):
+    """Proxy module that imports the actual module on first attribute access"""
+
+    def __getattr__(self, name: str) -> Any:
+        # Import the actual module and take over its attributes
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, name)
+
+
+# endregion
@@ -1,18 +1,28 @@
+from __future__ import annotations
+
 from abc import abstractmethod
-from dataclasses import dataclass
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+import functools
 import glob
+import hashlib
 import importlib.resources
 import importlib.util
 import itertools
 import json
 from os import name
 import os.path
+import pickle
+import tempfile
 from types import ModuleType
 from typing import (
+    TYPE_CHECKING,
     Any,
+    BinaryIO,
     Callable,
     Dict,
     Iterable,
+    Iterator,
     List,
     Literal,
     Optional,
@@ -22,12 +32,18 @@ from typing import (
 )
 
 import deprecation
-import jsonschema
 import lark
-import numpy as np
 import yaml
 
-from . import __version__
+from . import __version__, common
+
+if TYPE_CHECKING:
+    import jsonschema
+    import numpy as np
+else:
+    # Import heavy modules on demand because some sub-commands or cached models don't need them
+    jsonschema = common.import_lazily('jsonschema')
+    np = common.import_lazily('numpy')
 
 
 # region External classes
@@ -61,6 +77,8 @@ class InstructionDescription(TypedDict):
     """Container of user-defined data for an instruction"""
     field_extras: Optional[Dict[str, Any]]
     """Container of user-defined data for each field"""
+    priority: Optional[int]
+    """Priority of an instruction to be tested earlier than others"""
 
 
 class MachineDescription(TypedDict):
@@ -77,6 +95,8 @@ class McDecoderDescription(TypedDict):
     """Namespace for the symbols of a generated decoder"""
     process_instruction_hook: Optional[str]
     """Hook function to process model for an instruction decoder"""
+    table_memory_budget: Optional[int]
+    """Max byte size of each two-level table"""
 
 
 class McDescription(TypedDict):
@@ -206,6 +226,19 @@ class InstructionEncodingDescription:
     """Child InstructionEncodingElementDescriptions"""
 
 
+@dataclass
+class ParsedInstructionDescription:
+    """InstructionDescription with its parsed encoding format and conditions"""
+    instruction: InstructionDescription
+    """Original InstructionDescription"""
+    encoding: InstructionEncodingDescription
+    """Parsed encoding format of an instruction"""
+    match_condition: Optional[InstructionConditionDescription]
+    """Parsed condition an instruction must satisfy"""
+    unmatch_condition: Optional[InstructionConditionDescription]
+    """Parsed condition an instruction must not satisfy"""
+
+
 # endregion
 
 # region Decoder models
@@ -444,6 +477,8 @@ class InstructionDecoder:
     """User-defined data for an instruction"""
     _encoding: str
     """Encoding of an instruction"""
+    priority: int = 0
+    """Priority of an instruction. Instructions with higher priority are tested earlier by a decoder"""
 
     @property
     @deprecation.deprecated(deprecated_in='0.1a6', removed_in='1.0', current_version=__version__.__version__,
@@ -520,6 +555,36 @@ class McdDecisionTree:
     """Length of encoding elements"""
     root_node: McdDecisionNode
     """Root node of a decision tree"""
+    priority: int = 0
+    """Priority of the instructions of a decision tree. Decision trees are ordered by priority in descending order"""
+
+
+@dataclass
+class McdTwoLevelTable:
+    """
+    Two-level table to find matched instructions for a code in bounded steps.
+
+    The first level is indexed by the bits of a code at index_bit_positions.
+    Its entry is the second level, that is, a list of candidate instructions whose fixed bits and conditions are tested.
+    """
+    encoding_element_bit_length: int
+    """Bit length of an encoding element"""
+    length_of_encoding_elements: int
+    """Length of encoding elements"""
+    index_bit_positions: List[int]
+    """Bit positions of a code to make an index of the first level. The first position makes the most significant bit"""
+    candidates: List[List[InstructionDecoder]]
+    """Candidate instructions for each index of the first level. They are ordered in the same way as McDecoder.instructions"""
+
+    @property
+    def index_mask(self) -> int:
+        """Mask of the bit positions of a code to make an index of the first level"""
+        return functools.reduce(lambda mask, bitpos: mask | (1 << bitpos), self.index_bit_positions, 0)
+
+    @property
+    def max_candidate_count(self) -> int:
+        """Max count of candidate instructions for an index, that is, the max steps to find matched instructions"""
+        return max(len(candidate_instructions) for candidate_instructions in self.candidates)
 
 
 @dataclass
@@ -537,6 +602,19 @@ class McDecoder:
     """Child McdDecisionTrees"""
     extras: Optional[Any]
     """User-defined data not related to a machine, an instruction and a field"""
+    table_memory_budget: Optional[int] = None
+    """Max byte size of each two-level table. None for the default budget"""
+    _instruction_table: Optional[_InstructionTable] = field(default=None, repr=False, compare=False)
+    """Columnar table of instructions used for matching. It is created on first use if not created with a model"""
+    _two_level_tables: Optional[List[McdTwoLevelTable]] = field(default=None, repr=False, compare=False)
+    """Child McdTwoLevelTables. They are created on first use"""
+
+    @property
+    def two_level_tables(self) -> List[McdTwoLevelTable]:
+        """Child McdTwoLevelTables. Each of them corresponds to a McdDecisionTree. They are created on first use"""
+        if self._two_level_tables is None:
+            self._two_level_tables = _create_two_level_tables(_get_instruction_table(self))
+        return self._two_level_tables
 
     @property
     @deprecation.deprecated(deprecated_in='0.1a6', removed_in='1.0', current_version=__version__.__version__,
@@ -568,6 +646,8 @@ class DecodeContext:
     """16-bit code(2 words of 16-bit)"""
     code32x1: int
     """32-bit code(1 word of 32-bit)"""
+    cache: Optional[DecodeCache] = None
+    """Cache of decoding results for codes. None not to cache results"""
 
 
 @dataclass
@@ -585,6 +665,140 @@ class DecodeContextVectorized:
     """N-vector of 16-bit codes(2 words of 16-bit)"""
     code32x1_vec: np.ndarray
     """N-vector of 32-bit codes(1 word of 32-bit)"""
+    cache: Optional[DecodeCache] = None
+    """
+    Cache to count duplicate codes. If it is specified, duplicate codes are matched only once.
+    Codes other than the first occurrence are counted as hits and the others as misses
+    """
+
+
+@dataclass
+class DecodeCache:
+    """
+    Bounded cache of decoding results for codes, which are evicted in the LRU(Least Recently Used) order.
+
+    Results are keyed by the codes of DecodeContext, that is, code16x1, code16x2 and code32x1.
+    It speeds up decoding code streams such as execution traces where the same codes recur.
+
+    NOTE A cache must be used with only one McDecoder. Cached results are shared and must not be modified.
+    """
+    maxsize: int = 4096
+    """Max count of codes to cache results for"""
+    hits: int = field(default=0, init=False)
+    """Count of results found in a cache"""
+    misses: int = field(default=0, init=False)
+    """Count of results not found in a cache"""
+    evictions: int = field(default=0, init=False)
+    """Count of codes evicted from a cache"""
+    _entries: OrderedDict[Tuple[int, int, int], Dict[Tuple[Any, ...], Any]] = \
+        field(default_factory=OrderedDict, init=False, repr=False)
+    _mcdecoder: Optional[McDecoder] = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        if self.maxsize <= 0:
+            raise ValueError(f'maxsize must be positive: {self.maxsize}')
+
+    @property
+    def currsize(self) -> int:
+        """Count of codes cached currently"""
+        return len(self._entries)
+
+    def clear(self) -> None:
+        """Clear cached results and counters"""
+        self._entries.clear()
+        self._mcdecoder = None
+        self.hits = self.misses = self.evictions = 0
+
+    def _get_or_create(self, context: DecodeContext, item_key: Tuple[Any, ...], create: Callable[[], Any]) -> Any:
+        """
+        Get a cached result for the codes of a context or create and cache it
+
+        :param item_key: Key of a result among the results for the same codes
+        :param create: Function to create a result
+        """
+        self._use_mcdecoder(context.mcdecoder)
+
+        code_key = (context.code16x1, context.code16x2, context.code32x1)
+        items = self._entries.get(code_key)
+        if items is None:
+            items = self._entries[code_key] = {}
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        else:
+            self._entries.move_to_end(code_key)
+
+        if item_key in items:
+            self.hits += 1
+            return items[item_key]
+
+        self.misses += 1
+        value = items[item_key] = create()
+        return value
+
+    def _use_mcdecoder(self, mcdecoder: McDecoder) -> None:
+        if self._mcdecoder is None:
+            self._mcdecoder = mcdecoder
+        elif self._mcdecoder is not mcdecoder:
+            raise ValueError('A DecodeCache must be used with only one McDecoder')
+
+
+@dataclass
+class BufferDecodeResult:
+    """
+    Decoding result of a binary buffer.
+
+    Each N-vector is indexed by the position of a code decoded in a buffer.
+    """
+    offset_vec: np.ndarray
+    """N-vector of byte offsets of codes in a buffer"""
+    instruction_index_vec: np.ndarray
+    """
+    N-vector of index numbers of the first matched instructions in McDecoder.instructions.
+    It holds -1 for a code no instructions are matched with.
+    """
+    matched_count_vec: np.ndarray
+    """N-vector of counts of matched instructions"""
+    field_value_mat: np.ndarray
+    """
+    N x K matrix of codes and fields holding decoded field values of the first matched instructions.
+    The k-th column corresponds to the k-th field of an instruction and K is the maximum count of fields of instructions.
+    It holds 0 for a field an instruction doesn't have.
+    """
+
+
+@dataclass
+class InstructionMatchResult:
+    """
+    Instructions matched with vectorized codes in a sparse form like CSR(Compressed Sparse Row).
+
+    The index numbers of instructions matched with the n-th code are
+    instruction_index_vec[row_offset_vec[n]:row_offset_vec[n + 1]] in ascending order.
+    """
+    row_offset_vec: np.ndarray
+    """(N+1)-vector of offsets of the matched instructions of each code in instruction_index_vec"""
+    instruction_index_vec: np.ndarray
+    """K-vector of index numbers of matched instructions in McDecoder.instructions. K is the count of matches"""
+    condition_evaluation_count: int = 0
+    """Count of evaluations of unique condition atoms for codes, e.g. cond != 15"""
+    saved_condition_evaluation_count: int = 0
+    """Count of evaluations of condition atoms saved by sharing the results of the same atoms among instructions"""
+
+    @property
+    def matched_count_vec(self) -> np.ndarray:
+        """N-vector of counts of matched instructions"""
+        return np.diff(self.row_offset_vec)
+
+    @property
+    def first_instruction_index_vec(self) -> np.ndarray:
+        """
+        N-vector of index numbers of the first matched instructions.
+        It holds -1 for a code no instructions are matched with.
+        """
+        matched_vec = self.row_offset_vec[1:] > self.row_offset_vec[:-1]
+        first_instruction_index_vec = np.full(matched_vec.shape[0], -1, dtype=np.intp)
+        first_instruction_index_vec[matched_vec] = self.instruction_index_vec[self.row_offset_vec[:-1][matched_vec]]
+        return first_instruction_index_vec
 
 
 @dataclass
@@ -619,89 +833,93 @@ class InstructionDecodeResult:
 # region External functions
 
 
-def create_mcdecoder_model(mcfile: str) -> McDecoder:
+def create_mcdecoder_model(mcfile: str, use_cache: bool = False, trusted: bool = False) -> McDecoder:
     """
     Create a model which contains information of MC decoder
 
+    If use_cache is True, the model is loaded from the on-disk model cache
+    as long as the MC description file, the files included by it and config.py are unchanged.
+    Otherwise, the model is created from the MC description file and stored to the cache.
+
     :param mcfile: Path to an MC description file
+    :param use_cache: True to use the on-disk model cache
+    :param trusted: True to skip the schema validation of an MC description already validated
     :return: Created McDecoder
     :raises LoadError: if there's an invalid or inconsistent information
     """
-    # Load MC description
-    mc_desc = load_mc_description(mcfile)
+    if use_cache:
+        cached_mcdecoder = _load_cached_mcdecoder_model(mcfile)
+        if cached_mcdecoder is not None:
+            return cached_mcdecoder
 
-    # Load config
-    config_file = os.path.join(os.path.dirname(mcfile), 'config.py')
-    config_module: Optional[ModuleType] = None
-    if os.path.isfile(config_file):
-        config_module = _load_config_module(config_file)
+    mcdecoder = _create_mcdecoder_model(mcfile, trusted)
 
-    # Create machine and instruction decoders
-    machine_decoder = _create_machine_decoder_model(mc_desc['machine'])
-    instruction_decoders = [_create_instruction_decoder_model(
-        instruction_desc) for instruction_desc in mc_desc['instructions']]
+    if use_cache:
+        _store_cached_mcdecoder_model(mcfile, mcdecoder)
 
-    # Create decision tree
-    decision_trees = _create_decision_trees(instruction_decoders)
+    return mcdecoder
 
-    # Create MC decoder
-    namespace: Optional[str] = None
-    decoder_desc: Optional[McDecoderDescription] = None
-    if 'decoder' in mc_desc:
-        decoder_desc = mc_desc['decoder']
-        if 'namespace' in decoder_desc:
-            namespace = decoder_desc['namespace']
 
-    extras = mc_desc['extras'] if 'extras' in mc_desc else None
-    mcd = McDecoder(
-        namespace=namespace,
-        namespace_prefix=_make_namespace_prefix(namespace),
-        machine=machine_decoder,
-        instructions=instruction_decoders,
-        decision_trees=decision_trees,
-        extras=extras,
-    )
+def clear_model_cache() -> None:
+    """Remove all the models and the records of validated MC descriptions stored in the on-disk model cache"""
+    cache_directory = _model_cache_directory()
+    if not os.path.isdir(cache_directory):
+        return
 
-    # Process model
-    process_instruction_hook: Optional[Callable[[
-        InstructionDecoder], None]] = None
-    if decoder_desc is not None:
-        if 'process_instruction_hook' in decoder_desc:
-            process_instruction_hook_name = cast(
-                str, decoder_desc['process_instruction_hook'])
-            if config_module is None:
-                raise LoadError(
-                    "There must be config.py for the attribute decoder.process_instruction_hook.")
-            if not hasattr(config_module, process_instruction_hook_name):
-                raise LoadError(
-                    f"You must define '{process_instruction_hook_name}' in config.py")
+    for extension in [_MODEL_CACHE_FILE_EXTENSION, _VALIDATED_MARK_FILE_EXTENSION]:
+        for cache_file in glob.iglob(os.path.join(cache_directory, '*' + extension)):
+            try:
+                os.remove(cache_file)
+            except OSError:
+                pass
 
-            process_instruction_hook = getattr(
-                config_module, process_instruction_hook_name)
 
-    if process_instruction_hook is not None:
-        for instruction_decoder in instruction_decoders:
-            process_instruction_hook(instruction_decoder)
+def load_mc_description(mcfile: str, trusted: bool = False) -> McDescription:
+    """
+    Load an MC description file and validate against the schema
 
-    return mcd
+    :param mcfile: Path to an MC description file
+    :param trusted: True to skip the schema validation of an MC description already validated
+    :return: Loaded McDescription
+    """
+    mc_desc, _ = load_and_parse_mc_description(mcfile, trusted)
+    return mc_desc
 
 
-def load_mc_description(mcfile: str) -> McDescription:
+def load_and_parse_mc_description(mcfile: str, trusted: bool = False) \
+        -> Tuple[McDescription, List[ParsedInstructionDescription]]:
     """
-    Load an MC description file and validate against the schema
+    Load an MC description file, validate it and parse the encoding formats and conditions of its instructions.
+
+    Each encoding format and condition is parsed only once and the parsed results are used for validation.
+
+    If trusted is True, the schema validation is skipped for an MC description
+    whose content hash is recorded as validated in the on-disk model cache.
 
     :param mcfile: Path to an MC description file
-    :return: Loaded McDescription
+    :param trusted: True to skip the schema validation of an MC description already validated
+    :return: Loaded McDescription and ParsedInstructionDescriptions for its instructions
     """
     # Load MC description
     _yaml_include_context.base_dir = os.path.dirname(mcfile)
+    _yaml_include_context.include_patterns = {}
     with open(mcfile, 'rb') as file:
-        mc_desc = yaml.load(file, Loader=yaml.Loader)
+        mc_desc = yaml.load(file, Loader=_YamlLoader)
 
-    # Validate
-    _validate_mc_desc(mc_desc)
+    # Validate against the schema
+    validated_mark_file = _validated_mark_file(mcfile) if trusted else None
+    if validated_mark_file is None or not os.path.isfile(validated_mark_file):
+        _validate_mc_desc_for_schema(mc_desc)
 
-    return cast(McDescription, mc_desc)
+        if validated_mark_file is not None:
+            _touch_validated_mark_file(validated_mark_file)
+
+    # Parse instructions and validate them
+    parsed_instructions = [_parse_instruction_description(instruction_desc)
+                           for instruction_desc in mc_desc['instructions']]
+    _validate_mc_desc_for_constraint(parsed_instructions)
+
+    return cast(McDescription, mc_desc), parsed_instructions
 
 
 def _load_config_module(config_file: str) -> ModuleType:
@@ -719,7 +937,7 @@ def parse_instruction_encoding(instruction_encoding: str) -> InstructionEncoding
     :param instruction_encoding: String of the encoding format of an instruction
     :return: Parsed InstructionEncodingDescription
     """
-    parsed_tree = _instruction_encoding_parser.parse(instruction_encoding)
+    parsed_tree = _get_instruction_encoding_parser().parse(instruction_encoding)
     return cast(InstructionEncodingDescription, _InstructionEncodingDescriptionTransformer(None).transform(parsed_tree))
 
 
@@ -735,80 +953,98 @@ def calc_instruction_bit_size(instruction_encoding: InstructionEncodingDescripti
     return sum(len(field.bits_format) for field in field_encodings)
 
 
-def find_matched_instructions(context: DecodeContext) -> List[InstructionDecoder]:
+def find_matched_instructions(context: DecodeContext, engine: Literal['linear', 'tree', 'lut', 'table'] = 'linear',
+                              first_match: bool = False) -> List[InstructionDecoder]:
     """
     Find instructions matched with a given code
 
+    Possible engines are:
+
+    * linear: Testing all the instructions
+    * tree: Testing only the instructions narrowed down by walking decision trees
+    * lut: Looking up a table precomputed for 16-bit codes(1 word of 16-bit) and walking decision trees for other codes
+    * table: Testing only the candidate instructions looked up in two-level tables
+
+    All the engines find the same instructions.
+
+    If first_match is True, only the first matched instruction in priority order is found
+    as a generated decoder does. Priority order is the order a generated decoder tests instructions in,
+    that is, instructions with higher priority come first and then decision trees are walked.
+    The engines linear and tree stop testing instructions once an instruction is matched.
+
     :param context: Context information while decoding
+    :param engine: Engine to find instructions
+    :param first_match: True to find only the first matched instruction
     :return: Matched InstructionDecoders
     """
-    context_vectorized = DecodeContextVectorized(
-        mcdecoder=context.mcdecoder,
-        code16x1_vec=np.array([context.code16x1]),
-        code16x2_vec=np.array([context.code16x2]),
-        code32x1_vec=np.array([context.code32x1]),
-    )
-    test_mat = find_matched_instructions_vectorized(context_vectorized)
+    if context.cache is not None:
+        # NOTE All the engines find the same instructions
+        return list(context.cache._get_or_create(context, ('match', first_match), lambda: find_matched_instructions(
+            replace(context, cache=None), engine, first_match)))
+
+    instruction_table = _get_instruction_table(context.mcdecoder)
+    code_by_form = [context.code16x1, context.code16x2, context.code32x1]
+    if first_match:
+        instruction_indexes = _find_first_matched_instruction_indexes(code_by_form, instruction_table, engine)
+    else:
+        instruction_indexes = _find_matched_instruction_indexes(code_by_form, instruction_table, engine)
 
-    instruction_vec = np.array(
-        context.mcdecoder.instructions, dtype=object)
-    return list(instruction_vec[test_mat[0]])
+    return list(instruction_table.instruction_vec[instruction_indexes])
 
 
-def find_matched_instructions_vectorized(context: DecodeContextVectorized) -> np.ndarray:
+def find_matched_instructions_vectorized(context: DecodeContextVectorized,
+                                        engine: Literal['linear', 'tree', 'lut', 'table'] = 'linear',
+                                        first_match: bool = False) -> np.ndarray:
     """
     Find all the matched instructions to vectorized codes and return matched instructin matrix.
 
+    See find_matched_instructions for possible engines and first_match.
+
     :param context: Context information while decoding
+    :param engine: Engine to find instructions
+    :param first_match: True to find only the first matched instruction for each code
     :return: N x M matrix of codes(N) and instructions(M).
             Each element holds the boolean result whether a code is matched for an instruction.
     """
-    # Vectorize the attributes of instruction decoders
-    instruction_fields_mat = np.array([(instruction.encoding_element_bit_length, instruction.length_of_encoding_elements,
-                                        instruction.fixed_bit_mask, instruction.fixed_bits)
-                                       for instruction in context.mcdecoder.instructions])
-
-    encoding_element_bit_length_vec = instruction_fields_mat[:, 0]
-    length_of_encoding_elements_vec = instruction_fields_mat[:, 1]
-    fixed_bit_mask_vec = instruction_fields_mat[:, 2]
-    fixed_bits_vec = instruction_fields_mat[:, 3]
-
-    # Test instructions what form of codes they need
-    code16x1_test_vec = np.logical_and(  # type: ignore # TODO pyright can't recognize numpy.logical_and
-        encoding_element_bit_length_vec == 16, length_of_encoding_elements_vec == 1)
-    code16x2_test_vec = np.logical_and(  # type: ignore # TODO pyright can't recognize numpy.logical_and
-        encoding_element_bit_length_vec == 16, length_of_encoding_elements_vec == 2)
-    code32x1_test_vec = np.logical_and(  # type: ignore # TODO pyright can't recognize numpy.logical_and
-        encoding_element_bit_length_vec == 32, length_of_encoding_elements_vec == 1)
-
-    # N x M matrix of codes and instructions holding code values
-    code_mat: np.ndarray = np.zeros(
-        (context.code16x1_vec.shape[0], code16x1_test_vec.shape[0]), dtype=int)
-    code_mat[:, code16x1_test_vec] = context.code16x1_vec.reshape(-1, 1)
-    code_mat[:, code16x2_test_vec] = context.code16x2_vec.reshape(-1, 1)
-    code_mat[:, code32x1_test_vec] = context.code32x1_vec.reshape(-1, 1)
-
-    # N x M matrix of codes and instructions holding fixed bits test boolean values
-    fb_test_mat = (code_mat & fixed_bit_mask_vec) == fixed_bits_vec
-
-    test_mat = fb_test_mat
-    for i, instruction_decoder in enumerate(context.mcdecoder.instructions):
-        if instruction_decoder.match_condition is not None:
-            test_vec = _test_instruction_condition_vectorized(
-                code_mat[:, i], instruction_decoder.match_condition, instruction_decoder)
-            test_mat[:, i] = np.logical_and(  # type: ignore # TODO pyright can't recognize numpy.logical_and
-                test_mat[:, i], test_vec)
-
-        elif instruction_decoder.unmatch_condition is not None:
-            test_vec = np.logical_not(  # type: ignore # TODO pyright can't recognize numpy.logical_not
-                _test_instruction_condition_vectorized(code_mat[:, i], instruction_decoder.unmatch_condition,
-                                                       instruction_decoder))
-            test_mat[:, i] = np.logical_and(  # type: ignore # TODO pyright can't recognize numpy.logical_and
-                test_mat[:, i], test_vec)
+    instruction_table = _get_instruction_table(context.mcdecoder)
+    code_form_mat = _create_code_form_mat(context)
+    row_vec, instruction_index_vec = _find_matched_pairs_of_context(context, code_form_mat, instruction_table, engine,
+                                                                    first_match)
 
+    test_mat = np.zeros((code_form_mat.shape[0], instruction_table.instruction_vec.shape[0]), dtype=bool)
+    test_mat[row_vec, instruction_index_vec] = True
     return test_mat
 
 
+def find_matched_instructions_sparse(context: DecodeContextVectorized,
+                                     engine: Literal['linear', 'tree', 'lut', 'table'] = 'linear',
+                                     first_match: bool = False) -> InstructionMatchResult:
+    """
+    Find all the matched instructions to vectorized codes and return them in a sparse form.
+
+    Unlike find_matched_instructions_vectorized, no matrices of codes and instructions are made,
+    so that memory scales with the count of matches rather than the count of codes x instructions.
+
+    See find_matched_instructions for possible engines and first_match.
+
+    :param context: Context information while decoding
+    :param engine: Engine to find instructions
+    :param first_match: True to find only the first matched instruction for each code
+    :return: InstructionMatchResult
+    """
+    instruction_table = _get_instruction_table(context.mcdecoder)
+    code_form_mat = _create_code_form_mat(context)
+    counter = _ConditionEvaluationCounter()
+    row_vec, instruction_index_vec = _find_matched_pairs_of_context(context, code_form_mat, instruction_table, engine,
+                                                                    first_match, counter)
+
+    row_offset_vec = np.zeros(code_form_mat.shape[0] + 1, dtype=np.intp)
+    np.cumsum(np.bincount(row_vec, minlength=code_form_mat.shape[0]), out=row_offset_vec[1:])
+    return InstructionMatchResult(row_offset_vec=row_offset_vec, instruction_index_vec=instruction_index_vec,
+                                  condition_evaluation_count=counter.evaluation_count,
+                                  saved_condition_evaluation_count=counter.saved_evaluation_count)
+
+
 def decode_instruction(context: DecodeContext, instruction_decoder: InstructionDecoder) -> InstructionDecodeResult:
     """
     Decode an instruction
@@ -817,6 +1053,10 @@ def decode_instruction(context: DecodeContext, instruction_decoder: InstructionD
     :param instruction_decoder: InstructionDecoder to decode with
     :return: InstructionDecodeResult
     """
+    if context.cache is not None:
+        return context.cache._get_or_create(context, ('decode', id(instruction_decoder)), lambda: decode_instruction(
+            replace(context, cache=None), instruction_decoder))
+
     code = _get_appropriate_code(context, instruction_decoder)
 
     field_results: List[InstructionFieldDecodeResult] = []
@@ -827,6 +1067,137 @@ def decode_instruction(context: DecodeContext, instruction_decoder: InstructionD
 
     return InstructionDecodeResult(decoder=instruction_decoder, fields=field_results)
 
+
+def decode_instructions_vectorized(context: DecodeContextVectorized, instruction_index_vec: np.ndarray) \
+        -> Dict[str, np.ndarray]:
+    """
+    Decode instructions for vectorized codes
+
+    Codes are grouped by instructions so that each subfield is decoded once per group.
+
+    :param context: Context information while decoding
+    :param instruction_index_vec: N-vector of index numbers of instructions in McDecoder.instructions to decode codes with.
+            -1 not to decode a code
+    :return: Dictionary of a field name and N-vector of decoded field values.
+            A value is -1 for a code not decoded with an instruction having the field
+    """
+    instruction_table = _get_instruction_table(context.mcdecoder)
+
+    # Fields with the same name share a column
+    field_columns: Dict[str, int] = {}
+    for name in instruction_table.field_name_vec:
+        field_columns.setdefault(name, len(field_columns))
+    field_column_vec = np.array([field_columns[name] for name in instruction_table.field_name_vec], dtype=np.intp)
+
+    code_form_mat = _create_code_form_mat(context)
+    field_value_mat = _decode_fields_vectorized(code_form_mat, np.asarray(instruction_index_vec), instruction_table,
+                                                field_column_vec, len(field_columns), -1)
+    return {name: field_value_mat[:, column] for name, column in field_columns.items()}
+
+
+def decode_buffer(mcdecoder: McDecoder, buffer: Any, offset_step: Optional[int] = None,
+                  engine: Literal['linear', 'tree', 'lut', 'table'] = 'linear') -> BufferDecodeResult:
+    """
+    Decode codes at every offset of a binary buffer such as a whole code section
+
+    A buffer is viewed with the byte order of a machine without copying it.
+    Codes are made in the same way as the sub-command 'emulate' does,
+    that is, bytes beyond the end of a buffer are regarded as 0 and a trailing odd byte is ignored.
+
+    If offset_step is not specified, it is defaulted to the minimum byte length of encoding elements of instructions.
+
+    :param mcdecoder: McDecoder used for decoding
+    :param buffer: Object supporting the buffer protocol: bytes, bytearray, memoryview, numpy.ndarray and so on
+    :param offset_step: Byte length between offsets to decode codes at. It must be a multiple of 2
+    :param engine: Engine to find instructions. See find_matched_instructions for possible engines
+    :return: BufferDecodeResult
+    """
+    if offset_step is None:
+        offset_step = _min_encoding_element_byte_length(mcdecoder)
+    if offset_step <= 0 or offset_step % 2 != 0:
+        raise ValueError(f'offset_step must be a positive multiple of 2: {offset_step}')
+
+    instruction_table = _get_instruction_table(mcdecoder)
+
+    # N x 3 matrix of offsets and code forms holding code values
+    code_form_mat = _create_code_form_mat_from_buffer(buffer, mcdecoder.machine.byteorder)[::offset_step // 2]
+    offset_vec = np.arange(code_form_mat.shape[0]) * offset_step
+
+    # Find matched instructions and decode fields of the first matched instructions
+    instruction_index_vec, matched_count_vec = _find_first_matched_instructions(mcdecoder, code_form_mat, engine)
+    field_value_mat = _decode_fields_vectorized(code_form_mat, instruction_index_vec, instruction_table,
+                                                instruction_table.field_position_vec,
+                                                _max_field_count(instruction_table), 0)
+
+    return BufferDecodeResult(offset_vec=offset_vec, instruction_index_vec=instruction_index_vec,
+                              matched_count_vec=matched_count_vec, field_value_mat=field_value_mat)
+
+
+def linear_sweep(mcdecoder: McDecoder, buffer: Any, engine: Literal['linear', 'tree', 'lut', 'table'] = 'linear',
+                 chunk_size: int = 1 << 20) -> Iterator[BufferDecodeResult]:
+    """
+    Decode instructions one after another from the start of a binary buffer or a binary file (linear sweep)
+
+    The byte length of each instruction is determined by the first matched instruction
+    and the next instruction is decoded right after it.
+    If no instructions are matched with a code, the next instruction is decoded
+    after the minimum byte length of encoding elements of instructions.
+
+    A buffer is decoded chunk by chunk and the result for each chunk is yielded,
+    so that a large binary file can be decoded without reading it into memory at once.
+    Codes are made in the same way as decode_buffer does.
+
+    :param mcdecoder: McDecoder used for decoding
+    :param buffer: Object supporting the buffer protocol or a path to a binary file
+    :param engine: Engine to find instructions. See find_matched_instructions for possible engines
+    :param chunk_size: Byte length of a chunk. It must be a positive multiple of 4
+    :return: Iterator of BufferDecodeResults for chunks. The offsets are ones from the start of a buffer
+    """
+    if chunk_size <= 0 or chunk_size % 4 != 0:
+        raise ValueError(f'chunk_size must be a positive multiple of 4: {chunk_size}')
+
+    instruction_table = _get_instruction_table(mcdecoder)
+
+    # View a file or a buffer as bytes without reading or copying it
+    if isinstance(buffer, (str, os.PathLike)):
+        byte_view = np.memmap(buffer, dtype=np.uint8, mode='r') if os.path.getsize(buffer) > 0 \
+            else np.empty(0, dtype=np.uint8)
+    else:
+        byte_view = np.frombuffer(buffer, dtype=np.uint8)
+    byte_length = byte_view.shape[0] // 2 * 2
+
+    # Byte lengths to advance by for each instruction and for a code no instructions are matched with
+    # NOTE All the instructions start at multiples of offset_step
+    offset_step = _min_encoding_element_byte_length(mcdecoder)
+    instruction_length_vec = np.array([bit_length * length // 8 for bit_length, length in _CODE_FORMS],
+                                      dtype=np.intp)[instruction_table.code_form_vec]
+
+    position = 0
+    while position < byte_length:
+        # NOTE A chunk is followed by extra bytes to make codes for its last offsets
+        chunk_end = min(position + chunk_size, byte_length)
+        code_form_mat = _create_code_form_mat_from_buffer(
+            byte_view[position:chunk_end + 2], mcdecoder.machine.byteorder)[:(chunk_end - position) // 2:offset_step // 2]
+
+        # Find matched instructions at all the offsets of a chunk
+        instruction_index_vec, matched_count_vec = _find_first_matched_instructions(mcdecoder, code_form_mat, engine)
+        step_vec = np.where(instruction_index_vec >= 0, instruction_length_vec[instruction_index_vec],
+                            offset_step) // offset_step
+
+        # Walk through the offsets of instructions
+        row_vec, end_row = _walk_steps(step_vec)
+        yield BufferDecodeResult(
+            offset_vec=position + row_vec * offset_step,
+            instruction_index_vec=instruction_index_vec[row_vec],
+            matched_count_vec=matched_count_vec[row_vec],
+            field_value_mat=_decode_fields_vectorized(
+                code_form_mat[row_vec], instruction_index_vec[row_vec], instruction_table,
+                instruction_table.field_position_vec, _max_field_count(instruction_table), 0),
+        )
+
+        # The last instruction of a chunk may overrun the chunk
+        position += end_row * offset_step
+
 # endregion
 
 # region Internal classes
@@ -837,6 +1208,254 @@ class _YamlIncludeContext:
     """Context information for YAML !include tag"""
     base_dir: str
     """Base directory for !include tag"""
+    include_patterns: Dict[str, List[str]] = field(default_factory=dict)
+    """Dictionary of an absolute path pattern of !include tag and its matched files"""
+
+
+class _YamlLoader(getattr(yaml, 'CSafeLoader', yaml.SafeLoader)):  # type: ignore
+    """
+    YAML loader for MC description files.
+
+    It is backed by LibYAML if PyYAML is built with LibYAML. Otherwise, it falls back to the pure-Python loader.
+    """
+    pass
+
+
+@dataclass
+class _ModelCacheHeader:
+    """Header of a cache file in the on-disk model cache. It is followed by a pickled McDecoder"""
+    version: str
+    """Version of a cache file format"""
+    file_digests: Dict[str, Optional[str]]
+    """Dictionary of an absolute path of a file a model depends on and its content hash"""
+    include_patterns: Dict[str, List[str]]
+    """Dictionary of an absolute path pattern of !include tag and its matched files"""
+
+
+@dataclass
+class _ConditionProgram:
+    """
+    Condition of an instruction compiled into Python functions.
+
+    Each field referenced by a condition is decoded only once per call.
+    The functions are compiled from the source on first use because they can't be pickled with a model.
+    """
+    source: str
+    """Python source defining the functions test(code) and test_vectorized(code_vec)"""
+    _test: Optional[Callable[[int], bool]] = field(default=None, repr=False, compare=False)
+    """Compiled function test"""
+    _test_vectorized: Optional[Callable[[np.ndarray], np.ndarray]] = field(default=None, repr=False, compare=False)
+    """Compiled function test_vectorized"""
+
+    def test(self, code: int) -> bool:
+        """
+        Test a condition for a code
+
+        :param code: Code
+        :return: True if a code satisfies a condition
+        """
+        if self._test is None:
+            self._compile()
+        return cast(Callable[[int], bool], self._test)(code)
+
+    def test_vectorized(self, code_vec: np.ndarray) -> np.ndarray:
+        """
+        Test a condition for vectorized codes
+
+        :param code_vec: N-vector of codes
+        :return: N-vector of boolean results whether codes satisfy a condition
+        """
+        if self._test_vectorized is None:
+            self._compile()
+        return cast(Callable[[np.ndarray], np.ndarray], self._test_vectorized)(code_vec)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {**self.__dict__, '_test': None, '_test_vectorized': None}
+
+    def _compile(self) -> None:
+        namespace: Dict[str, Any] = {'np': np}
+        namespace.update((f'_scalar_{name}', function) for name, function in _SCALAR_FUNCTION_NAME_TO_FUNCTION.items())
+        namespace.update((f'_vectorized_{name}', function) for name, function in _FUNCTION_NAME_TO_FUNCTION.items())
+        exec(compile(self.source, '<instruction condition>', 'exec'), namespace)
+        self._test = namespace['test']
+        self._test_vectorized = namespace['test_vectorized']
+
+
+@dataclass
+class _ConditionEvaluationCounter:
+    """Counter of evaluations of condition atoms"""
+    evaluation_count: int = 0
+    """Count of evaluations of unique atoms for codes"""
+    saved_evaluation_count: int = 0
+    """Count of evaluations saved by sharing the results of the same atoms among instructions"""
+
+
+@dataclass
+class _MatchNode:
+    """Node of a decision tree to find matched instructions. It is created from McdDecisionNode"""
+    mask: int
+    """Mask of threshold bit positions"""
+    fixed_bit_nodes: Dict[int, _MatchNode]
+    """Dictionary of a threshold value and its fixed bit _MatchNode"""
+    arbitrary_bit_node: Optional[_MatchNode]
+    """Arbitrary bit _MatchNode"""
+    instructions: List[Tuple[int, int, int, Optional[_ConditionProgram]]]
+    """
+    Instructions decided by a node. Its entry is a tuple of
+    an index number of an instruction, a mask of fixed bit positions, fixed bits and a condition program to test
+    """
+
+
+@dataclass
+class _FixedBitGroup:
+    """
+    Group of instructions sharing a code form and a mask of fixed bit positions.
+
+    Codes are tested against the fixed bits of all the instructions of a group at once by a binary search.
+    """
+    code_form: int
+    """Index number of a code form in _CODE_FORMS"""
+    fixed_bit_mask: int
+    """Mask of fixed bit positions"""
+    fixed_bits_vec: np.ndarray
+    """G-vector of sorted unique fixed bits of instructions"""
+    instruction_offset_vec: np.ndarray
+    """(G+1)-vector of offsets of the instructions having each fixed bits in instruction_index_vec"""
+    instruction_index_vec: np.ndarray
+    """Vector of the index numbers of instructions sorted by fixed bits"""
+
+
+@dataclass
+class _InstructionLut:
+    """
+    Lookup table of the instructions matched with every 16-bit code(1 word of 16-bit).
+
+    Only the instructions of 1 word of 16-bit are looked up.
+    An entry for a code is an index number of an instruction if exactly one instruction is matched,
+    -1 if no instructions are matched and -2 - d for the d-th duplicate entry if multiple instructions are matched.
+    """
+    entry_vec: np.ndarray
+    """65536-vector of entries for codes"""
+    duplicate_offset_vec: np.ndarray
+    """(D+1)-vector of offsets of the instructions of each duplicate entry in duplicate_instruction_index_vec"""
+    duplicate_instruction_index_vec: np.ndarray
+    """Vector of index numbers of instructions of duplicate entries"""
+
+
+@dataclass
+class _TwoLevelTable:
+    """Two-level table to find matched instructions. McdTwoLevelTable is created from it"""
+    index_bit_positions: List[int]
+    """Bit positions of a code to make an index of the first level. The first position makes the most significant bit"""
+    index_bit_ranges: List[Tuple[int, int, int]]
+    """
+    Contiguous bit ranges of a code to make an index of the first level.
+    Its entry is a tuple of an LSB in a code, a bit length and an LSB in an index
+    """
+    candidate_offset_vec: np.ndarray
+    """(E+1)-vector of offsets of the candidate instructions of each index in candidate_instruction_index_vec"""
+    candidate_instruction_index_vec: np.ndarray
+    """Vector of the index numbers of candidate instructions"""
+    condition_programs: Dict[int, _ConditionProgram]
+    """Dictionary of an index number of a candidate instruction and its condition program to test"""
+
+
+@dataclass
+class _InstructionTable:
+    """
+    Immutable columnar table of the instructions of McDecoder.
+
+    It is created once for a model so that matching doesn't need to gather the attributes of instructions on every call.
+    Each M-vector is indexed by the index number of an instruction in McDecoder.instructions.
+    """
+    instruction_vec: np.ndarray
+    """M-vector of InstructionDecoders"""
+    code_form_vec: np.ndarray
+    """M-vector of the index numbers of code forms in _CODE_FORMS instructions need"""
+    fixed_bit_mask_vec: np.ndarray
+    """M-vector of masks of fixed bit positions of instructions"""
+    fixed_bits_vec: np.ndarray
+    """M-vector of fixed bits of instructions"""
+    instruction_field_offset_vec: np.ndarray
+    """(M+1)-vector of offsets of the fields of each instruction in F-vectors"""
+    field_instruction_index_vec: np.ndarray
+    """F-vector of the index numbers of instructions fields belong to"""
+    field_name_vec: np.ndarray
+    """F-vector of names of fields"""
+    field_position_vec: np.ndarray
+    """F-vector of the index numbers of fields in instructions"""
+    field_subfield_offset_vec: np.ndarray
+    """(F+1)-vector of offsets of the subfields of each field in S-vectors"""
+    subfield_field_index_vec: np.ndarray
+    """S-vector of the index numbers of fields in F-vectors subfields belong to"""
+    subfield_mask_vec: np.ndarray
+    """S-vector of masks of subfields in instructions"""
+    subfield_lsb_in_instruction_vec: np.ndarray
+    """S-vector of LSBs of subfields in instructions"""
+    subfield_lsb_in_field_vec: np.ndarray
+    """S-vector of LSBs of subfields in fields"""
+    match_trees: List[Tuple[int, _MatchNode]]
+    """Decision trees to find matched instructions. Its entry is a pair of an index number of a code form and a root node"""
+    fixed_bit_groups: List[_FixedBitGroup]
+    """Groups of instructions to test fixed bits of instructions without a matrix of codes and instructions"""
+    priority_rank_vec: np.ndarray
+    """M-vector of ranks of instructions in priority order, that is, the order a generated decoder tests instructions in"""
+    priority_instructions: List[Tuple[int, int, int, int, Optional[_ConditionProgram]]]
+    """
+    Instructions in priority order. Its entry is a tuple of an index number of an instruction,
+    an index number of a code form, a mask of fixed bit positions, fixed bits and a condition program to test
+    """
+    condition_atoms: List[Tuple[int, _ConditionProgram]]
+    """
+    Unique atoms of conditions, that is, equality, in and in_range conditions.
+    Its entry is a pair of an index number of a code form and a program to test an atom.
+    Atoms are identical if they have the same code form and the same program source including field bit layouts
+    """
+    condition_formulas: List[Tuple[Any, ...]]
+    """
+    Unique formulas of conditions over atoms. A formula is one of
+    ('atom', index number of an atom), ('not', formula), ('and', tuple of formulas) and ('or', tuple of formulas)
+    """
+    condition_formula_atom_indexes: List[List[int]]
+    """Index numbers of unique atoms each formula refers to"""
+    instruction_formula_vec: np.ndarray
+    """M-vector of index numbers of condition formulas of instructions. -1 for an instruction without conditions"""
+    table_memory_budget: int
+    """Max byte size of each two-level table"""
+    lut: Optional[_InstructionLut] = None
+    """Lookup table for the lut engine. It is None if there are no instructions of 1 word of 16-bit"""
+    two_level_tables: Optional[List[Tuple[int, _TwoLevelTable]]] = None
+    """
+    Two-level tables for the table engine. Its entry is a pair of an index number of a code form and a table.
+    They are created on first use by _get_two_level_tables not to slow down loading a model for the other engines
+    """
+
+    def __post_init__(self) -> None:
+        self._freeze()
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        # NOTE Unpickled arrays are writable
+        self.__dict__.update(state)
+        self._freeze()
+
+    def _freeze(self) -> None:
+        children = [*self.fixed_bit_groups, *([self.lut] if self.lut is not None else []),
+                    *(two_level_table for _, two_level_table in self.two_level_tables or [])]
+        arrays = itertools.chain(self.__dict__.values(), *(child.__dict__.values() for child in children))
+        for value in arrays:
+            if isinstance(value, np.ndarray):
+                value.setflags(write=False)
+
+
+@dataclass
+class _ParserTablesHeader:
+    """Header of a serialized parser tables file. It is followed by the tables saved by Lark"""
+    grammar_digest: str
+    """Content hash of a grammar the tables are built from"""
+    start: str
+    """Start rule of a grammar"""
+    lark_version: str
+    """Version of Lark the tables are built with"""
 
 
 @lark.v_args(inline=True)
@@ -944,6 +1563,21 @@ class _InstructionConditionDescriptionTransformer(lark.Transformer):
         pass
 
 
+@dataclass
+class _ConditionTableCreateContext:
+    """Context information while creating unique condition programs, atoms and formulas"""
+    programs: Dict[str, _ConditionProgram] = field(default_factory=dict)
+    """Dictionary of the source of a condition program and the program"""
+    atoms: List[Tuple[int, _ConditionProgram]] = field(default_factory=list)
+    """Unique atoms. See _InstructionTable.condition_atoms"""
+    atom_indexes: Dict[Tuple[int, str], int] = field(default_factory=dict)
+    """Dictionary of a pair of a code form and the source of an atom and the index number of an atom"""
+    formulas: List[Tuple[Any, ...]] = field(default_factory=list)
+    """Unique formulas. See _InstructionTable.condition_formulas"""
+    formula_indexes: Dict[Tuple[Any, ...], int] = field(default_factory=dict)
+    """Dictionary of a formula and its index number"""
+
+
 @dataclass
 class _DecisionTreeCreateContext:
     """Context information while creating a decision tree"""
@@ -956,22 +1590,184 @@ class _DecisionTreeCreateContext:
 # region Internal functions
 
 
-def _yaml_include_constructor(loader: yaml.Loader, node: yaml.Node) -> Any:
-    """Constructor for YAML !include tag"""
-    if not isinstance(node, yaml.ScalarNode):
-        raise LoadError(f'Unsupported type for !include: {node}')
+def _create_mcdecoder_model(mcfile: str, trusted: bool) -> McDecoder:
+    """Create a model which contains information of MC decoder without the model cache"""
+    # Load MC description
+    mc_desc, parsed_instructions = load_and_parse_mc_description(mcfile, trusted)
 
-    # Make path pattern
-    path_pattern = os.path.join(
-        _yaml_include_context.base_dir, loader.construct_scalar(node))
+    # Load config
+    config_file = os.path.join(os.path.dirname(mcfile), 'config.py')
+    config_module: Optional[ModuleType] = None
+    if os.path.isfile(config_file):
+        config_module = _load_config_module(config_file)
+
+    # Create machine and instruction decoders
+    machine_decoder = _create_machine_decoder_model(mc_desc['machine'])
+    instruction_decoders = [_create_instruction_decoder_model(
+        parsed_instruction) for parsed_instruction in parsed_instructions]
+
+    # Create decision tree
+    decision_trees = _create_decision_trees(instruction_decoders)
+
+    # Create MC decoder
+    namespace: Optional[str] = None
+    table_memory_budget: Optional[int] = None
+    decoder_desc: Optional[McDecoderDescription] = None
+    if 'decoder' in mc_desc:
+        decoder_desc = mc_desc['decoder']
+        if 'namespace' in decoder_desc:
+            namespace = decoder_desc['namespace']
+        if 'table_memory_budget' in decoder_desc:
+            table_memory_budget = cast(int, decoder_desc['table_memory_budget'])
+
+    extras = mc_desc['extras'] if 'extras' in mc_desc else None
+    mcd = McDecoder(
+        namespace=namespace,
+        namespace_prefix=_make_namespace_prefix(namespace),
+        machine=machine_decoder,
+        instructions=instruction_decoders,
+        decision_trees=decision_trees,
+        extras=extras,
+        table_memory_budget=table_memory_budget,
+    )
+
+    # Process model
+    process_instruction_hook: Optional[Callable[[
+        InstructionDecoder], None]] = None
+    if decoder_desc is not None:
+        if 'process_instruction_hook' in decoder_desc:
+            process_instruction_hook_name = cast(
+                str, decoder_desc['process_instruction_hook'])
+            if config_module is None:
+                raise LoadError(
+                    "There must be config.py for the attribute decoder.process_instruction_hook.")
+            if not hasattr(config_module, process_instruction_hook_name):
+                raise LoadError(
+                    f"You must define '{process_instruction_hook_name}' in config.py")
+
+            process_instruction_hook = getattr(
+                config_module, process_instruction_hook_name)
+
+    if process_instruction_hook is not None:
+        for instruction_decoder in instruction_decoders:
+            process_instruction_hook(instruction_decoder)
+
+    # Create instruction table
+    # NOTE This must be done after processing model not to miss changes by the hook
+    mcd._instruction_table = _create_instruction_table(instruction_decoders, decision_trees, table_memory_budget)
+
+    return mcd
+
+
+def _load_cached_mcdecoder_model(mcfile: str) -> Optional[McDecoder]:
+    """Load a model from the on-disk model cache. Returns None if the cached model is missing or outdated"""
+    try:
+        with open(_model_cache_file(mcfile), 'rb') as file:
+            header = cast(_ModelCacheHeader, pickle.load(file))
+            if not _is_model_cache_header_valid(header):
+                return None
+
+            return cast(McDecoder, pickle.load(file))
+
+    except Exception:
+        # A missing or broken cache file is treated as a cache miss
+        return None
+
+
+def _store_cached_mcdecoder_model(mcfile: str, mcdecoder: McDecoder) -> None:
+    """Store a model to the on-disk model cache. The model is not stored if it cannot be pickled"""
+    # Collect the files the model depends on
+    config_file = os.path.abspath(os.path.join(os.path.dirname(mcfile), 'config.py'))
+    included_files = itertools.chain.from_iterable(_yaml_include_context.include_patterns.values())
+    dependent_files = itertools.chain([os.path.abspath(mcfile), config_file], included_files)
+
+    header = _ModelCacheHeader(
+        version=_MODEL_CACHE_VERSION,
+        file_digests={file: _file_digest(file) for file in dependent_files},
+        include_patterns=dict(_yaml_include_context.include_patterns),
+    )
+
+    # Write the cache file atomically
+    cache_directory = _model_cache_directory()
+    temp_file: Optional[str] = None
+    try:
+        os.makedirs(cache_directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=cache_directory, suffix='.tmp', delete=False) as file:
+            temp_file = file.name
+            pickle.dump(header, file, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(mcdecoder, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+        os.replace(temp_file, _model_cache_file(mcfile))
+        temp_file = None
+
+    except (OSError, pickle.PicklingError, AttributeError, TypeError):
+        # Models holding unpicklable objects (e.g. set by process_instruction_hook) aren't cached
+        pass
+
+    finally:
+        if temp_file is not None and os.path.exists(temp_file):
+            os.remove(temp_file)
+
+
+def _is_model_cache_header_valid(header: _ModelCacheHeader) -> bool:
+    """Test if the files a cached model depends on are unchanged"""
+    if header.version != _MODEL_CACHE_VERSION:
+        return False
+
+    # Test if !include tags still match the same files
+    for include_pattern, included_files in header.include_patterns.items():
+        if _glob_included_files(include_pattern) != included_files:
+            return False
+
+    # Test if the contents of the files are unchanged
+    return all(_file_digest(file) == digest for file, digest in header.file_digests.items())
+
+
+def _model_cache_directory() -> str:
+    """Directory of the on-disk model cache"""
+    if 'MCDECODER_CACHE_DIR' in os.environ:
+        return os.environ['MCDECODER_CACHE_DIR']
+
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'mcdecoder')
+
+
+def _model_cache_file(mcfile: str) -> str:
+    """Path to a cache file for an MC description file"""
+    key = hashlib.sha256(os.path.abspath(mcfile).encode()).hexdigest()
+    return os.path.join(_model_cache_directory(), key + _MODEL_CACHE_FILE_EXTENSION)
+
+
+def _file_digest(file: str) -> Optional[str]:
+    """Calculate the content hash of a file. Returns None if the file doesn't exist"""
+    if not os.path.isfile(file):
+        return None
+
+    with open(file, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _glob_included_files(path_pattern: str) -> List[str]:
+    """Find files for a path pattern of !include tag"""
+    return sorted(path for path in glob.iglob(path_pattern) if os.path.isfile(path))
+
+
+def _yaml_include_constructor(loader: _YamlLoader, node: yaml.Node) -> Any:
+    """Constructor for YAML !include tag"""
+    if not isinstance(node, yaml.ScalarNode):
+        raise LoadError(f'Unsupported type for !include: {node}')
+
+    # Make path pattern
+    path_pattern = os.path.join(
+        _yaml_include_context.base_dir, loader.construct_scalar(node))
 
     # Load included yamls
     results = []
-    paths = sorted(path for path in glob.iglob(
-        path_pattern) if os.path.isfile(path))
+    paths = _glob_included_files(path_pattern)
+    _yaml_include_context.include_patterns[os.path.abspath(path_pattern)] = [os.path.abspath(path) for path in paths]
     for path in paths:
-        with open(path, 'r') as file:
-            results.append(yaml.load(file, Loader=yaml.Loader))
+        with open(path, 'rb') as file:
+            results.append(yaml.load(file, Loader=_YamlLoader))
 
     result_types = list(set(type(result) for result in results))
     if len(result_types) == 0:
@@ -995,34 +1791,58 @@ def _yaml_include_constructor(loader: yaml.Loader, node: yaml.Node) -> Any:
 
 
 def _add_yaml_include_constructor() -> None:
-    """Add !include constructor to PyYAML"""
-    yaml.add_constructor('!include', _yaml_include_constructor)
+    """Add !include constructor to the YAML loader for MC description files"""
+    yaml.add_constructor('!include', _yaml_include_constructor, Loader=_YamlLoader)
 
 
-def _validate_mc_desc(mc_desc: Any) -> None:
-    _validate_mc_desc_for_schema(mc_desc)
-    _validate_mc_desc_for_constraint(mc_desc)
+def _validate_mc_desc_for_schema(mc_desc: Any) -> None:
+    # NOTE Raise the same error as jsonschema.validate
+    error = jsonschema.exceptions.best_match(_get_mc_desc_validator().iter_errors(mc_desc))
+    if error is not None:
+        raise error
 
 
-def _validate_mc_desc_for_schema(mc_desc: Any) -> None:
+@functools.lru_cache(maxsize=None)
+def _get_mc_desc_validator() -> Any:
+    """Get the validator for MC descriptions. It is created on first use and the schema is checked only once"""
     with importlib.resources.open_text('mcdecoder.schemas', 'mc_desc_schema.json') as file:
         schema = json.load(file)
 
-    jsonschema.validate(mc_desc, schema)
+    validator_class = jsonschema.validators.validator_for(schema)
+    validator_class.check_schema(schema)
+    return validator_class(schema)
+
+
+def _validated_mark_file(mcfile: str) -> str:
+    """
+    Path to a file to mark an MC description as validated against the schema.
+
+    The file name is the content hash of the MC description file and the files included by it.
+    NOTE This must be called after loading the MC description to know the included files
+    """
+    included_files = itertools.chain.from_iterable(_yaml_include_context.include_patterns.values())
+    digest = hashlib.sha256(_MODEL_CACHE_VERSION.encode())
+    for file in itertools.chain([mcfile], included_files):
+        digest.update(cast(str, _file_digest(file)).encode())
+
+    return os.path.join(_model_cache_directory(), digest.hexdigest() + _VALIDATED_MARK_FILE_EXTENSION)
 
 
-def _validate_mc_desc_for_constraint(mc_desc: Any) -> None:
-    for instruction_desc in mc_desc['instructions']:
-        instruction_encoding = parse_instruction_encoding(
-            instruction_desc['format'])
+def _touch_validated_mark_file(validated_mark_file: str) -> None:
+    try:
+        os.makedirs(os.path.dirname(validated_mark_file), exist_ok=True)
+        with open(validated_mark_file, 'wb'):
+            pass
+    except OSError:
+        pass
+
 
-        instruction_condition: Optional[InstructionConditionDescription] = None
-        if 'match_condition' in instruction_desc:
-            instruction_condition = _parse_instruction_condition(
-                instruction_desc['match_condition'])
-        elif 'unmatch_condition' in instruction_desc:
-            instruction_condition = _parse_instruction_condition(
-                instruction_desc['unmatch_condition'])
+def _validate_mc_desc_for_constraint(parsed_instructions: List[ParsedInstructionDescription]) -> None:
+    for parsed_instruction in parsed_instructions:
+        instruction_desc = parsed_instruction.instruction
+        instruction_encoding = parsed_instruction.encoding
+        instruction_condition = parsed_instruction.match_condition \
+            if parsed_instruction.match_condition is not None else parsed_instruction.unmatch_condition
 
         _validate_instruction_encoding_length_consistency(
             instruction_desc, instruction_encoding)
@@ -1108,9 +1928,50 @@ def _validate_instruction_condition_field_existence(instruction_desc: Instructio
             f"The instruction condition uses the missing field '{condition_object.field}': {instruction_desc['name']}")
 
 
-def _create_instruction_encoding_parser() -> lark.Lark:
-    with importlib.resources.open_text('mcdecoder.grammars', 'instruction_encoding.lark') as file:
-        return lark.Lark(file, start='instruction_encoding', parser='lalr')
+def _parse_instruction_description(instruction_desc: InstructionDescription) -> ParsedInstructionDescription:
+    """Parse the encoding format and conditions of an instruction"""
+    match_condition: Optional[InstructionConditionDescription] = None
+    if 'match_condition' in instruction_desc:
+        match_condition = _parse_instruction_condition_memoized(
+            cast(str, instruction_desc['match_condition']))
+
+    unmatch_condition: Optional[InstructionConditionDescription] = None
+    if 'unmatch_condition' in instruction_desc:
+        unmatch_condition = _parse_instruction_condition_memoized(
+            cast(str, instruction_desc['unmatch_condition']))
+
+    return ParsedInstructionDescription(
+        instruction=instruction_desc,
+        encoding=_parse_instruction_encoding_memoized(instruction_desc['format']),
+        match_condition=match_condition,
+        unmatch_condition=unmatch_condition,
+    )
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_instruction_encoding_memoized(instruction_encoding: str) -> InstructionEncodingDescription:
+    """
+    Memoized version of parse_instruction_encoding.
+
+    NOTE The returned InstructionEncodingDescription is shared among callers and must not be modified.
+    """
+    return parse_instruction_encoding(instruction_encoding)
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_instruction_condition_memoized(instruction_condition: str) -> InstructionConditionDescription:
+    """
+    Memoized version of _parse_instruction_condition.
+
+    NOTE The returned InstructionConditionDescription is shared among callers and must not be modified.
+    """
+    return _parse_instruction_condition(instruction_condition)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_instruction_encoding_parser() -> lark.Lark:
+    """Get the parser for instruction encodings. It is created on first use"""
+    return _create_parser('instruction_encoding.lark', 'instruction_encoding')
 
 
 def _calc_instruction_encoding_element_bit_length(encoding_element: InstructionEncodingElementDescription) -> int:
@@ -1135,11 +1996,10 @@ def _make_namespace_prefix(namespace: Optional[str]) -> str:
     return namespace + '_' if namespace is not None else ''
 
 
-def _create_instruction_decoder_model(instruction_desc: InstructionDescription) -> InstructionDecoder:
+def _create_instruction_decoder_model(parsed_instruction: ParsedInstructionDescription) -> InstructionDecoder:
     """Create a model which contains information of individual instruction decoder"""
-    # Parse instruction encoding
-    instruction_encoding = parse_instruction_encoding(
-        instruction_desc['format'])
+    instruction_desc = parsed_instruction.instruction
+    instruction_encoding = parsed_instruction.encoding
     field_encodings = list(itertools.chain.from_iterable(
         element.fields for element in instruction_encoding.elements))
     instruction_bit_size = calc_instruction_bit_size(instruction_encoding)
@@ -1177,17 +2037,10 @@ def _create_instruction_decoder_model(instruction_desc: InstructionDescription)
         field_decoders, key=lambda field: field._msb, reverse=True)
 
     # Create instruction decode conditions
-    if 'match_condition' in instruction_desc:
-        match_condition = _parse_and_create_instruction_decoder_condition(
-            cast(str, instruction_desc['match_condition']))
-    else:
-        match_condition = None
-
-    if 'unmatch_condition' in instruction_desc:
-        unmatch_condition = _parse_and_create_instruction_decoder_condition(
-            cast(str, instruction_desc['unmatch_condition']))
-    else:
-        unmatch_condition = None
+    match_condition = _create_instruction_decoder_condition(parsed_instruction.match_condition) \
+        if parsed_instruction.match_condition is not None else None
+    unmatch_condition = _create_instruction_decoder_condition(parsed_instruction.unmatch_condition) \
+        if parsed_instruction.unmatch_condition is not None else None
 
     # Create instruction decoder model
     instruction_extras = instruction_desc['extras'] if 'extras' in instruction_desc else None
@@ -1204,6 +2057,7 @@ def _create_instruction_decoder_model(instruction_desc: InstructionDescription)
         match_condition=match_condition,
         unmatch_condition=unmatch_condition,
         extras=instruction_extras,
+        priority=instruction_desc['priority'] if 'priority' in instruction_desc else 0,
     )
 
 
@@ -1290,11 +2144,6 @@ def _calc_type_bit_size(bit_size: int) -> int:
         return 32
 
 
-def _parse_and_create_instruction_decoder_condition(instruction_condition: str) -> InstructionDecoderCondition:
-    parsed_condition = _parse_instruction_condition(instruction_condition)
-    return _create_instruction_decoder_condition(parsed_condition)
-
-
 def _create_instruction_decoder_condition(condition: InstructionConditionDescription) -> InstructionDecoderCondition:
     if isinstance(condition, LogicalInstructionConditionDescription):
         child_decode_conditions = [_create_instruction_decoder_condition(
@@ -1315,7 +2164,7 @@ def _create_instruction_decoder_condition(condition: InstructionConditionDescrip
     elif isinstance(condition, InInstructionConditionDescription):
         decoder_condition_subject = _create_instruction_decoder_condition_object(
             condition.subject)
-        return InIdCondition(subject=decoder_condition_subject, values=condition.values)
+        return InIdCondition(subject=decoder_condition_subject, values=list(condition.values))
 
     elif isinstance(condition, InRangeInstructionConditionDescription):  # pragma: no branch
         decoder_condition_subject = _create_instruction_decoder_condition_object(
@@ -1343,13 +2192,497 @@ def _create_instruction_decoder_condition_object(object: InstructionConditionObj
 
 def _parse_instruction_condition(instruction_condition: str) -> InstructionConditionDescription:
     """Parse an instruction condition and returns a parsed condition"""
-    parsed_tree = _instruction_condition_parser.parse(instruction_condition)
+    parsed_tree = _get_instruction_condition_parser().parse(instruction_condition)
     return cast(InstructionConditionDescription, _InstructionConditionDescriptionTransformer(None).transform(parsed_tree))
 
 
-def _create_instruction_condition_parser() -> lark.Lark:
-    with importlib.resources.open_text('mcdecoder.grammars', 'instruction_condition.lark') as file:
-        return lark.Lark(file, start='condition', parser='lalr')
+@functools.lru_cache(maxsize=None)
+def _get_instruction_condition_parser() -> lark.Lark:
+    """Get the parser for instruction conditions. It is created on first use"""
+    return _create_parser('instruction_condition.lark', 'condition')
+
+
+def _create_parser(grammar_file: str, start: str) -> lark.Lark:
+    """
+    Create an LALR parser for a grammar in mcdecoder.grammars.
+
+    The parser is restored from the parser tables shipped with mcdecoder or stored in the cache directory
+    if they are built from the same grammar with the same version of Lark.
+    Otherwise, the parser is built from the grammar and its tables are stored in the cache directory.
+    """
+    grammar = importlib.resources.read_text('mcdecoder.grammars', grammar_file)
+    header = _make_parser_tables_header(grammar, start)
+
+    # Restore the parser from the shipped parser tables
+    try:
+        with importlib.resources.open_binary('mcdecoder.grammars', grammar_file + _PARSER_TABLES_FILE_EXTENSION) as file:
+            parser = _load_parser_tables(file, header)
+            if parser is not None:
+                return parser
+    except OSError:
+        pass
+
+    # Restore the parser from the parser tables in the cache directory
+    cache_file_name = f'{grammar_file}-{header.grammar_digest[:16]}-{header.lark_version}{_PARSER_TABLES_FILE_EXTENSION}'
+    cache_file = os.path.join(_model_cache_directory(), cache_file_name)
+    try:
+        with open(cache_file, 'rb') as file:
+            parser = _load_parser_tables(file, header)
+            if parser is not None:
+                return parser
+    except OSError:
+        pass
+
+    # Build the parser and store its tables to the cache directory
+    parser = lark.Lark(grammar, start=start, parser='lalr')
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        _save_parser_tables(cache_file, parser, header)
+    except OSError:
+        pass
+
+    return parser
+
+
+def _make_parser_tables_header(grammar: str, start: str) -> _ParserTablesHeader:
+    return _ParserTablesHeader(grammar_digest=hashlib.sha256(grammar.encode()).hexdigest(), start=start,
+                               lark_version=lark.__version__)
+
+
+def _load_parser_tables(file: BinaryIO, expected_header: _ParserTablesHeader) -> Optional[lark.Lark]:
+    """Load parser tables from a file. Returns None if they are built from another grammar or for another version of Lark"""
+    try:
+        header = pickle.load(file)
+        if header != expected_header:
+            return None
+
+        return lark.Lark.load(file)
+
+    except Exception:
+        # Broken parser tables are treated as missing
+        return None
+
+
+def _save_parser_tables(tables_file: str, parser: lark.Lark, header: _ParserTablesHeader) -> None:
+    """Save the tables of a parser to a file atomically"""
+    # NOTE A unique temporary file keeps processes saving the same tables at once from mixing their writes
+    temp_file: Optional[str] = None
+    try:
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(os.path.abspath(tables_file)), suffix='.tmp',
+                                         delete=False) as file:
+            temp_file = file.name
+            pickle.dump(header, file, protocol=pickle.HIGHEST_PROTOCOL)
+            parser.save(file)
+
+        os.replace(temp_file, tables_file)
+        temp_file = None
+
+    finally:
+        if temp_file is not None and os.path.exists(temp_file):
+            os.remove(temp_file)
+
+
+def _write_shipped_parser_tables() -> None:
+    """
+    Regenerate the parser tables shipped with mcdecoder.
+
+    Run this after changing a grammar in mcdecoder.grammars.
+    """
+    grammar_directory = os.path.join(os.path.dirname(__file__), 'grammars')
+    for grammar_file, start in _GRAMMAR_FILES_AND_STARTS:
+        with open(os.path.join(grammar_directory, grammar_file), 'r') as file:
+            grammar = file.read()
+
+        header = _make_parser_tables_header(grammar, start)
+        parser = lark.Lark(grammar, start=start, parser='lalr')
+        _save_parser_tables(os.path.join(grammar_directory, grammar_file + _PARSER_TABLES_FILE_EXTENSION), parser, header)
+
+
+def _get_instruction_table(mcdecoder: McDecoder) -> _InstructionTable:
+    if mcdecoder._instruction_table is None:
+        mcdecoder._instruction_table = _create_instruction_table(mcdecoder.instructions, mcdecoder.decision_trees,
+                                                                 mcdecoder.table_memory_budget)
+    return mcdecoder._instruction_table
+
+
+def _get_two_level_tables(instruction_table: _InstructionTable) -> List[Tuple[int, _TwoLevelTable]]:
+    if instruction_table.two_level_tables is None:
+        condition_program_dict = {i: condition_program for i, _, _, _, condition_program
+                                  in instruction_table.priority_instructions if condition_program is not None}
+        instruction_table.two_level_tables = [
+            (code_form, _create_internal_two_level_table(instruction_table, root_node, condition_program_dict))
+            for code_form, root_node in instruction_table.match_trees]
+        instruction_table._freeze()
+    return instruction_table.two_level_tables
+
+
+def _create_instruction_table(instruction_decoders: List[InstructionDecoder], decision_trees: List[McdDecisionTree],
+                              table_memory_budget: Optional[int]) -> _InstructionTable:
+    instruction_vec = np.empty(len(instruction_decoders), dtype=object)
+    instruction_vec[:] = instruction_decoders
+
+    condition_program_dict: Dict[int, _ConditionProgram] = {}
+    condition_context = _ConditionTableCreateContext()
+    instruction_formula_vec = np.full(len(instruction_decoders), -1, dtype=np.intp)
+    field_rows: List[Tuple[int, str, int]] = []
+    subfield_rows: List[Tuple[int, int, int, int]] = []
+    for i, instruction_decoder in enumerate(instruction_decoders):
+        # NOTE An unmatch condition is tested only if there is no match condition
+        code_form = _CODE_FORMS.index((instruction_decoder.encoding_element_bit_length,
+                                       instruction_decoder.length_of_encoding_elements))
+        if instruction_decoder.match_condition is not None:
+            condition_program_dict[i] = _share_condition_program(condition_context, _create_condition_program(
+                instruction_decoder.match_condition, True, instruction_decoder))
+            instruction_formula_vec[i] = _create_condition_formula_index(
+                condition_context, instruction_decoder.match_condition, True, instruction_decoder, code_form)
+        elif instruction_decoder.unmatch_condition is not None:
+            condition_program_dict[i] = _share_condition_program(condition_context, _create_condition_program(
+                instruction_decoder.unmatch_condition, False, instruction_decoder))
+            instruction_formula_vec[i] = _create_condition_formula_index(
+                condition_context, instruction_decoder.unmatch_condition, False, instruction_decoder, code_form)
+
+        for field_position, field_decoder in enumerate(instruction_decoder.fields):
+            field_index = len(field_rows)
+            field_rows.append((i, field_decoder.name, field_position))
+            subfield_rows.extend((field_index, sf_decoder.mask, sf_decoder.lsb_in_instruction, sf_decoder.lsb_in_field)
+                                 for sf_decoder in field_decoder.subfields)
+
+    field_instruction_index_vec = np.array([row[0] for row in field_rows], dtype=np.intp)
+    field_name_vec = np.empty(len(field_rows), dtype=object)
+    field_name_vec[:] = [row[1] for row in field_rows]
+    subfield_mat = np.array(subfield_rows, dtype=np.int64).reshape(-1, 4)
+    subfield_field_index_vec = subfield_mat[:, 0].astype(np.intp)
+
+    # Create match trees
+    instruction_indexes = {id(instruction): i for i, instruction in enumerate(instruction_decoders)}
+    match_trees = [(_CODE_FORMS.index((tree.encoding_element_bit_length, tree.length_of_encoding_elements)),
+                    _create_match_node(tree.root_node, instruction_indexes, condition_program_dict))
+                   for tree in decision_trees]
+
+    code_form_vec = np.array([_CODE_FORMS.index((instruction.encoding_element_bit_length,
+                                                 instruction.length_of_encoding_elements))
+                              for instruction in instruction_decoders], dtype=np.intp)
+    fixed_bit_mask_vec = np.array([instruction.fixed_bit_mask for instruction in instruction_decoders], dtype=np.uint32)
+    fixed_bits_vec = np.array([instruction.fixed_bits for instruction in instruction_decoders], dtype=np.uint32)
+
+    # Order instructions in the same way as a generated decoder tests them
+    priority_order: List[int] = []
+    for tree in decision_trees:
+        _collect_instructions_in_priority_order(tree.root_node, instruction_indexes, priority_order)
+    priority_rank_vec = np.empty(len(instruction_decoders), dtype=np.intp)
+    priority_rank_vec[priority_order] = np.arange(len(priority_order))
+
+    instruction_table = _InstructionTable(
+        instruction_vec=instruction_vec,
+        code_form_vec=code_form_vec,
+        fixed_bit_mask_vec=fixed_bit_mask_vec,
+        fixed_bits_vec=fixed_bits_vec,
+        instruction_field_offset_vec=np.searchsorted(field_instruction_index_vec, np.arange(len(instruction_decoders) + 1)),
+        field_instruction_index_vec=field_instruction_index_vec,
+        field_name_vec=field_name_vec,
+        field_position_vec=np.array([row[2] for row in field_rows], dtype=np.intp),
+        field_subfield_offset_vec=np.searchsorted(subfield_field_index_vec, np.arange(len(field_rows) + 1)),
+        subfield_field_index_vec=subfield_field_index_vec,
+        subfield_mask_vec=subfield_mat[:, 1].astype(np.uint32),
+        subfield_lsb_in_instruction_vec=subfield_mat[:, 2].astype(np.uint8),
+        subfield_lsb_in_field_vec=subfield_mat[:, 3].astype(np.uint8),
+        match_trees=match_trees,
+        fixed_bit_groups=_create_fixed_bit_groups(code_form_vec, fixed_bit_mask_vec, fixed_bits_vec),
+        priority_rank_vec=priority_rank_vec,
+        condition_atoms=condition_context.atoms,
+        condition_formulas=condition_context.formulas,
+        condition_formula_atom_indexes=[sorted(set(_condition_formula_atom_indexes(formula)))
+                                        for formula in condition_context.formulas],
+        instruction_formula_vec=instruction_formula_vec,
+        priority_instructions=[(i, int(code_form_vec[i]), instruction_decoders[i].fixed_bit_mask,
+                                instruction_decoders[i].fixed_bits, condition_program_dict.get(i)) for i in priority_order],
+        table_memory_budget=_DEFAULT_TABLE_MEMORY_BUDGET if table_memory_budget is None else table_memory_budget,
+    )
+
+    # Precompute the lookup table while creating a model so that it is cached with a model
+    if np.any(code_form_vec == _LUT_CODE_FORM):
+        instruction_table = replace(instruction_table, lut=_create_instruction_lut(instruction_table))
+
+    return instruction_table
+
+
+def _create_instruction_lut(instruction_table: _InstructionTable) -> _InstructionLut:
+    # Test all the codes at once
+    code_form_mat = np.zeros((1 << 16, len(_CODE_FORMS)), dtype=np.uint32)
+    code_form_mat[:, _LUT_CODE_FORM] = np.arange(1 << 16)
+    row_vec, instruction_index_vec = _find_matched_pairs_linearly(code_form_mat, instruction_table, _LUT_CODE_FORM)
+    order_vec = np.lexsort((instruction_index_vec, row_vec))
+    row_vec, instruction_index_vec = row_vec[order_vec], instruction_index_vec[order_vec]
+
+    # Make entries for codes matched with one or multiple instructions
+    count_vec = np.bincount(row_vec, minlength=1 << 16)
+    duplicate_row_vec = np.flatnonzero(count_vec >= 2)
+    entry_dtype = np.int16 if max(instruction_table.instruction_vec.shape[0], duplicate_row_vec.shape[0] + 2) < (1 << 15) \
+        else np.int32
+    entry_vec = np.full(1 << 16, -1, dtype=entry_dtype)
+    single_pair_vec = count_vec[row_vec] == 1
+    entry_vec[row_vec[single_pair_vec]] = instruction_index_vec[single_pair_vec]
+    entry_vec[duplicate_row_vec] = -2 - np.arange(duplicate_row_vec.shape[0])
+
+    return _InstructionLut(
+        entry_vec=entry_vec,
+        duplicate_offset_vec=np.append(0, np.cumsum(count_vec[duplicate_row_vec])),
+        duplicate_instruction_index_vec=instruction_index_vec[~single_pair_vec],
+    )
+
+
+def _create_fixed_bit_groups(code_form_vec: np.ndarray, fixed_bit_mask_vec: np.ndarray,
+                             fixed_bits_vec: np.ndarray) -> List[_FixedBitGroup]:
+    key_mat = np.stack([code_form_vec, fixed_bit_mask_vec], axis=1).astype(np.int64)
+    unique_key_mat, group_vec = np.unique(key_mat, axis=0, return_inverse=True)
+    group_vec = group_vec.reshape(-1)
+
+    fixed_bit_groups: List[_FixedBitGroup] = []
+    for g, (code_form, fixed_bit_mask) in enumerate(unique_key_mat.tolist()):
+        instruction_index_vec = np.flatnonzero(group_vec == g)
+        instruction_index_vec = instruction_index_vec[np.argsort(fixed_bits_vec[instruction_index_vec], kind='stable')]
+        unique_fixed_bits_vec, start_vec = np.unique(fixed_bits_vec[instruction_index_vec], return_index=True)
+        fixed_bit_groups.append(_FixedBitGroup(
+            code_form=code_form, fixed_bit_mask=fixed_bit_mask, fixed_bits_vec=unique_fixed_bits_vec,
+            instruction_offset_vec=np.append(start_vec, instruction_index_vec.shape[0]),
+            instruction_index_vec=instruction_index_vec))
+
+    return fixed_bit_groups
+
+
+def _collect_instructions_in_priority_order(node: McdDecisionNode, instruction_indexes: Dict[int, int],
+                                            priority_order: List[int]) -> None:
+    """
+    Collect the index numbers of instructions of a node and its descendants
+    in the order a generated decoder tests them in: a node itself, its fixed bit nodes and then its arbitrary bit node
+    """
+    priority_order.extend(instruction_indexes[id(instruction)] for instruction in node.instructions)
+    for child_node in node.fixed_bit_nodes.values():
+        _collect_instructions_in_priority_order(child_node, instruction_indexes, priority_order)
+
+    if node.arbitrary_bit_node is not None:
+        _collect_instructions_in_priority_order(node.arbitrary_bit_node, instruction_indexes, priority_order)
+
+
+def _collect_match_node_instruction_indexes(node: _MatchNode, instruction_indexes: List[int]) -> None:
+    """Collect the index numbers of instructions of a node and its descendants"""
+    instruction_indexes.extend(i for i, _, _, _ in node.instructions)
+    for child_node in node.fixed_bit_nodes.values():
+        _collect_match_node_instruction_indexes(child_node, instruction_indexes)
+
+    if node.arbitrary_bit_node is not None:
+        _collect_match_node_instruction_indexes(node.arbitrary_bit_node, instruction_indexes)
+
+
+def _create_match_node(node: McdDecisionNode, instruction_indexes: Dict[int, int],
+                       condition_program_dict: Dict[int, _ConditionProgram]) -> _MatchNode:
+    instructions: List[Tuple[int, int, int, Optional[_ConditionProgram]]] = []
+    for instruction in node.instructions:
+        i = instruction_indexes[id(instruction)]
+        instructions.append((i, instruction.fixed_bit_mask, instruction.fixed_bits, condition_program_dict.get(i)))
+
+    return _MatchNode(
+        mask=node.mask,
+        fixed_bit_nodes={threshold_value: _create_match_node(child_node, instruction_indexes, condition_program_dict)
+                         for threshold_value, child_node in node.fixed_bit_nodes.items()},
+        arbitrary_bit_node=_create_match_node(node.arbitrary_bit_node, instruction_indexes, condition_program_dict)
+        if node.arbitrary_bit_node is not None else None,
+        instructions=instructions,
+    )
+
+
+def _find_matched_instruction_indexes(code_by_form: List[int], instruction_table: _InstructionTable,
+                                      engine: Literal['linear', 'tree', 'lut', 'table']) -> List[int]:
+    """
+    Find instructions matched with a code
+
+    :param code_by_form: Code values for code forms
+    :return: Index numbers of matched instructions in ascending order
+    """
+    instruction_indexes: List[int] = []
+    if engine in ('tree', 'lut'):
+        for code_form, match_node in instruction_table.match_trees:
+            if engine != 'lut' or code_form != _LUT_CODE_FORM:
+                _find_matched_instructions_by_node(code_by_form[code_form], match_node, instruction_indexes)
+
+        # NOTE A lookup table covers all the decision trees of 1 word of 16-bit
+        if engine == 'lut' and instruction_table.lut is not None:
+            _look_up_instruction_lut(code_by_form[_LUT_CODE_FORM], instruction_table.lut, instruction_indexes)
+
+    elif engine == 'table':
+        for code_form, two_level_table in _get_two_level_tables(instruction_table):
+            _find_matched_instructions_by_two_level_table(code_by_form[code_form], two_level_table, instruction_table,
+                                                          instruction_indexes)
+
+    else:
+        code_form_mat = np.array([code_by_form], dtype=np.uint32)
+        _, instruction_index_vec = _find_matched_pairs(code_form_mat, instruction_table, engine)
+        instruction_indexes = instruction_index_vec.tolist()
+
+    return sorted(instruction_indexes)
+
+
+def _find_first_matched_instruction_indexes(code_by_form: List[int], instruction_table: _InstructionTable,
+                                            engine: Literal['linear', 'tree', 'lut', 'table']) -> List[int]:
+    """
+    Find the first instruction matched with a code in priority order
+
+    :param code_by_form: Code values for code forms
+    :return: Index number of the first matched instruction. It is empty if nothing matched
+    """
+    if engine == 'linear':
+        for i, code_form, fixed_bit_mask, fixed_bits, condition_program in instruction_table.priority_instructions:
+            code = code_by_form[code_form]
+            if (code & fixed_bit_mask) == fixed_bits and (condition_program is None or condition_program.test(code)):
+                return [i]
+
+        return []
+
+    elif engine == 'tree':
+        for code_form, match_node in instruction_table.match_trees:
+            instruction_index = _find_first_matched_instruction_by_node(code_by_form[code_form], match_node)
+            if instruction_index is not None:
+                return [instruction_index]
+
+        return []
+
+    # Choose the first one of a few instructions looked up
+    instruction_indexes = _find_matched_instruction_indexes(code_by_form, instruction_table, engine)
+    return [min(instruction_indexes, key=lambda i: instruction_table.priority_rank_vec[i])] \
+        if len(instruction_indexes) > 0 else []
+
+
+def _find_matched_instructions_by_node(code: int, node: _MatchNode, instruction_indexes: List[int]) -> None:
+    """
+    Find instructions matched with a code by walking a node and its descendants.
+
+    The index numbers of matched instructions are added to instruction_indexes.
+    """
+    for i, fixed_bit_mask, fixed_bits, condition_program in node.instructions:
+        if (code & fixed_bit_mask) == fixed_bits and (condition_program is None or condition_program.test(code)):
+            instruction_indexes.append(i)
+
+    child_node = node.fixed_bit_nodes.get(code & node.mask)
+    if child_node is not None:
+        _find_matched_instructions_by_node(code, child_node, instruction_indexes)
+
+    if node.arbitrary_bit_node is not None:
+        _find_matched_instructions_by_node(code, node.arbitrary_bit_node, instruction_indexes)
+
+
+def _find_first_matched_instruction_by_node(code: int, node: _MatchNode) -> Optional[int]:
+    """
+    Find the first instruction matched with a code by walking a node and its descendants as a generated decoder does
+
+    :return: Index number of the first matched instruction. None if nothing matched
+    """
+    for i, fixed_bit_mask, fixed_bits, condition_program in node.instructions:
+        if (code & fixed_bit_mask) == fixed_bits and (condition_program is None or condition_program.test(code)):
+            return i
+
+    child_node = node.fixed_bit_nodes.get(code & node.mask)
+    if child_node is not None:
+        instruction_index = _find_first_matched_instruction_by_node(code, child_node)
+        if instruction_index is not None:
+            return instruction_index
+
+    if node.arbitrary_bit_node is not None:
+        return _find_first_matched_instruction_by_node(code, node.arbitrary_bit_node)
+
+    return None
+
+
+def _find_matched_instructions_by_two_level_table(code: int, two_level_table: _TwoLevelTable,
+                                                  instruction_table: _InstructionTable,
+                                                  instruction_indexes: List[int]) -> None:
+    """
+    Find instructions matched with a code by testing the candidate instructions in a two-level table.
+
+    The index numbers of matched instructions are added to instruction_indexes.
+    """
+    index = 0
+    for lsb, bit_length, index_lsb in two_level_table.index_bit_ranges:
+        index |= ((code >> lsb) & ((1 << bit_length) - 1)) << index_lsb
+
+    offset_vec = two_level_table.candidate_offset_vec
+    for i in two_level_table.candidate_instruction_index_vec[offset_vec[index]:offset_vec[index + 1]].tolist():
+        if (code & int(instruction_table.fixed_bit_mask_vec[i])) == instruction_table.fixed_bits_vec[i]:
+            condition_program = two_level_table.condition_programs.get(i)
+            if condition_program is None or condition_program.test(code):
+                instruction_indexes.append(i)
+
+
+def _find_matched_instructions_by_node_vectorized(code_vec: np.ndarray, row_vec: np.ndarray, node: _MatchNode,
+                                                  matches: List[Tuple[np.ndarray, int]], common_bit_mask: int = 0,
+                                                  common_bits: int = 0) -> None:
+    """
+    Find instructions whose fixed bits are matched with codes by walking a node and its descendants.
+
+    Codes are partitioned by the threshold values of a node and only passed to the corresponding child nodes.
+    Bits common to all the codes decide the child node and the instructions matched without testing codes.
+
+    :param code_vec: N-vector of codes reaching a node
+    :param row_vec: N-vector of the row numbers of codes
+    :param node: _MatchNode to walk
+    :param matches: List to add matches to. Its entry is a pair of a vector of row numbers of codes and
+            an index number of an instruction matched with them
+    :param common_bit_mask: Mask of bit positions whose bits are common to all the codes
+    :param common_bits: Bits common to all the codes
+    """
+    if code_vec.shape[0] == 0:
+        return
+
+    # Test fixed bits of instructions decided by the node
+    # NOTE Conditions are tested later at once for all the codes passing the fixed bits test
+    for i, fixed_bit_mask, fixed_bits, _ in node.instructions:
+        if (fixed_bits ^ common_bits) & fixed_bit_mask & common_bit_mask != 0:
+            continue
+
+        matched_row_vec = row_vec[(code_vec & fixed_bit_mask) == fixed_bits] \
+            if fixed_bit_mask & ~common_bit_mask != 0 else row_vec
+        if matched_row_vec.shape[0] > 0:
+            matches.append((matched_row_vec, i))
+
+    # Pass all the codes to the child node decided by the common bits
+    if len(node.fixed_bit_nodes) > 0 and node.mask & ~common_bit_mask == 0:
+        child_node = node.fixed_bit_nodes.get(common_bits & node.mask)
+        if child_node is not None:
+            _find_matched_instructions_by_node_vectorized(code_vec, row_vec, child_node, matches, common_bit_mask,
+                                                          common_bits)
+
+    # Partition codes by threshold values for fixed bit nodes
+    elif len(node.fixed_bit_nodes) > 0:
+        threshold_vec = code_vec & node.mask
+        order_vec = np.argsort(threshold_vec, kind='stable')
+        unique_threshold_vec, start_vec = np.unique(threshold_vec[order_vec], return_index=True)
+        end_vec = np.append(start_vec[1:], order_vec.shape[0])
+        for threshold_value, start, end in zip(unique_threshold_vec.tolist(), start_vec, end_vec):
+            child_node = node.fixed_bit_nodes.get(threshold_value)
+            if child_node is not None:
+                child_order_vec = order_vec[start:end]
+                _find_matched_instructions_by_node_vectorized(
+                    code_vec[child_order_vec], row_vec[child_order_vec], child_node, matches,
+                    common_bit_mask | node.mask, (common_bits & ~node.mask) | threshold_value)
+
+    # Pass through all the codes to an arbitrary bit node
+    if node.arbitrary_bit_node is not None:
+        _find_matched_instructions_by_node_vectorized(
+            code_vec, row_vec, node.arbitrary_bit_node, matches, common_bit_mask, common_bits)
+
+
+def _find_common_bits(code_vec: np.ndarray) -> Tuple[int, int]:
+    """
+    Find bits common to all the codes
+
+    :param code_vec: N-vector of codes
+    :return: Pair of a mask of bit positions whose bits are common to all the codes and the common bits
+    """
+    if code_vec.shape[0] == 0:
+        return 0, 0
+
+    all_one_bits = int(np.bitwise_and.reduce(code_vec))
+    any_one_bits = int(np.bitwise_or.reduce(code_vec))
+    return ~(all_one_bits ^ any_one_bits) & 0xffffffff, all_one_bits
 
 
 def _create_decision_trees(instruction_decoders: List[InstructionDecoder]) -> List[McdDecisionTree]:
@@ -1360,35 +2693,35 @@ def _create_decision_trees(instruction_decoders: List[InstructionDecoder]) -> Li
     encoding_form_mat = np.array([(instruction.encoding_element_bit_length, instruction.length_of_encoding_elements)
                                   for instruction in instruction_decoder_vec])
     unique_encoding_form_mat = np.unique(encoding_form_mat, axis=0)
+    priority_vec = np.array([instruction.priority for instruction in instruction_decoder_vec])
 
-    # Create decision tree for each encoding form
+    # Create decision tree for each priority in descending order and each encoding form
+    # NOTE Decision trees of the same encoding form share a context to number their nodes uniquely
     decision_trees: List[McdDecisionTree] = []
-    for encoding_form_vec in unique_encoding_form_mat:
+    create_contexts = [_DecisionTreeCreateContext() for _ in unique_encoding_form_mat]
+    for priority, (create_context, encoding_form_vec) in itertools.product(
+            np.unique(priority_vec)[::-1], zip(create_contexts, unique_encoding_form_mat)):
         encoding_element_bit_length, length_of_encoding_elements = encoding_form_vec
 
-        # Collect encodings related to encoding form
-        matched_instruction_decoder_vec = instruction_decoder_vec[(
-            encoding_form_mat == encoding_form_vec).all(axis=1)]
+        # Collect encodings related to encoding form and priority
+        test_vec = (encoding_form_mat == encoding_form_vec).all(axis=1) & (priority_vec == priority)
+        if not np.any(test_vec):
+            continue
+        matched_instruction_decoder_vec = instruction_decoder_vec[test_vec]
 
         # N x M matrix of instructions and encoding bits
-        str_encoding_mat = np.array([list(instruction._encoding)
-                                     for instruction in matched_instruction_decoder_vec])
-        encoding_mat: np.ndarray = np.empty_like(
-            str_encoding_mat, dtype=int)
-        encoding_mat[str_encoding_mat == '0'] = 0
-        encoding_mat[str_encoding_mat == '1'] = 1
-        encoding_mat[str_encoding_mat == 'x'] = _ARBITRARY_BIT_INT
+        encoding_mat = _create_encoding_mat(matched_instruction_decoder_vec)
 
         # Prepare bit positions
         bitpos_vec = np.arange(encoding_mat.shape[1] - 1, -1, -1)
 
         # Create nodes
-        root_node = _create_decision_node(_DecisionTreeCreateContext(
-        ), encoding_mat, matched_instruction_decoder_vec, bitpos_vec)
+        root_node = _create_decision_node(create_context, encoding_mat, matched_instruction_decoder_vec, bitpos_vec)
 
         # Create tree
         decision_tree = McdDecisionTree(encoding_element_bit_length=encoding_element_bit_length,
-                                        length_of_encoding_elements=length_of_encoding_elements, root_node=root_node)
+                                        length_of_encoding_elements=length_of_encoding_elements, root_node=root_node,
+                                        priority=int(priority))
         decision_trees.append(decision_tree)
 
     return decision_trees
@@ -1412,10 +2745,7 @@ def _create_decision_node(context: _DecisionTreeCreateContext, encoding_mat: np.
         x_encoding_mat = encoding_mat == _ARBITRARY_BIT_INT
 
         # Evaluate bit positions if they're appropriate for decision threshold
-        zero_count_vec = np.sum(encoding_mat == 0, axis=0)
-        one_count_vec = np.sum(encoding_mat == 1, axis=0)
-        score_vec = (zero_count_vec * one_count_vec + 1) * \
-            (zero_count_vec + one_count_vec)
+        score_vec = _score_threshold_bits(encoding_mat)
 
         # Determine bit positions for threshold
         prime_threshold_index = np.argmax(score_vec)
@@ -1484,6 +2814,158 @@ def _create_decision_node(context: _DecisionTreeCreateContext, encoding_mat: np.
         return decision_node
 
 
+def _create_encoding_mat(instruction_decoder_vec: Iterable[InstructionDecoder]) -> np.ndarray:
+    """
+    Make N x M matrix of instructions and encoding bits
+
+    NOTE The encodings of instructions must have the same length.
+    """
+    str_encoding_mat = np.array([list(instruction._encoding)
+                                 for instruction in instruction_decoder_vec])
+    encoding_mat: np.ndarray = np.empty_like(
+        str_encoding_mat, dtype=int)
+    encoding_mat[str_encoding_mat == '0'] = 0
+    encoding_mat[str_encoding_mat == '1'] = 1
+    encoding_mat[str_encoding_mat == 'x'] = _ARBITRARY_BIT_INT
+    return encoding_mat
+
+
+def _score_threshold_bits(encoding_mat: np.ndarray) -> np.ndarray:
+    """
+    Evaluate bit positions if they're appropriate for decision threshold.
+
+    A bit position splitting instructions into more even groups of fixed 0 and 1 scores higher.
+
+    :param encoding_mat: N x M matrix of instructions and encoding bits
+    :return: M-vector of scores of bit positions
+    """
+    zero_count_vec = np.sum(encoding_mat == 0, axis=0)
+    one_count_vec = np.sum(encoding_mat == 1, axis=0)
+    return (zero_count_vec * one_count_vec + 1) * (zero_count_vec + one_count_vec)
+
+
+def _create_two_level_tables(instruction_table: _InstructionTable) -> List[McdTwoLevelTable]:
+    """Create McdTwoLevelTables of a model from the two-level tables for the table engine"""
+    two_level_tables: List[McdTwoLevelTable] = []
+    for code_form, two_level_table in _get_two_level_tables(instruction_table):
+        encoding_element_bit_length, length_of_encoding_elements = _CODE_FORMS[code_form]
+        candidate_instructions = instruction_table.instruction_vec[two_level_table.candidate_instruction_index_vec].tolist()
+        offsets = two_level_table.candidate_offset_vec.tolist()
+        two_level_tables.append(McdTwoLevelTable(
+            encoding_element_bit_length=encoding_element_bit_length,
+            length_of_encoding_elements=length_of_encoding_elements,
+            index_bit_positions=two_level_table.index_bit_positions,
+            candidates=[candidate_instructions[start:end] for start, end in zip(offsets[:-1], offsets[1:])],
+        ))
+
+    return two_level_tables
+
+
+def _create_internal_two_level_table(instruction_table: _InstructionTable, root_node: _MatchNode,
+                                     condition_program_dict: Dict[int, _ConditionProgram]) -> _TwoLevelTable:
+    """
+    Create a two-level table for a decision tree.
+
+    The first level is indexed by the threshold bits of the root node of a decision tree,
+    which are the most discriminating bit group.
+    Bits are added to the index in the order of scores only if they lower the max count of candidate instructions
+    and the table doesn't exceed the memory budget,
+    so that a table doesn't grow with bits no longer shortening lookups.
+    """
+    # Instructions of a decision tree in the same order as McDecoder.instructions
+    tree_instruction_indexes: List[int] = []
+    _collect_match_node_instruction_indexes(root_node, tree_instruction_indexes)
+    tree_instruction_index_vec = np.sort(np.array(tree_instruction_indexes, dtype=np.intp))
+    encoding_mat = _create_encoding_mat(instruction_table.instruction_vec[tree_instruction_index_vec])
+    bitpos_vec = np.arange(encoding_mat.shape[1] - 1, -1, -1)
+
+    # Order the threshold bits of the root node by scores
+    threshold_column_vec = np.flatnonzero((root_node.mask >> bitpos_vec) & 1 == 1)
+    threshold_column_vec = threshold_column_vec[np.argsort(
+        -_score_threshold_bits(encoding_mat[:, threshold_column_vec]), kind='stable')]
+
+    # Add bits lowering the max count of candidates within the memory budget
+    index_column_vec = np.empty(0, dtype=np.intp)
+    entry_vec, row_vec = _expand_two_level_table_entries(encoding_mat[:, index_column_vec])
+    max_candidate_count = tree_instruction_index_vec.shape[0]
+    for column in threshold_column_vec.tolist():
+        if max_candidate_count <= 1:
+            break
+
+        next_index_column_vec = np.sort(np.append(index_column_vec, column))
+        next_encoding_mat = encoding_mat[:, next_index_column_vec]
+        if _estimate_two_level_table_size(next_encoding_mat != _ARBITRARY_BIT_INT) > instruction_table.table_memory_budget:
+            continue
+
+        next_entry_vec, next_row_vec = _expand_two_level_table_entries(next_encoding_mat)
+        next_max_candidate_count = int(np.bincount(next_entry_vec).max())
+        if next_max_candidate_count < max_candidate_count:
+            index_column_vec, entry_vec, row_vec = next_index_column_vec, next_entry_vec, next_row_vec
+            max_candidate_count = next_max_candidate_count
+
+    # Make contiguous bit ranges from the most significant bit of an index
+    index_bit_positions: List[int] = bitpos_vec[index_column_vec].tolist()
+    index_bit_ranges: List[Tuple[int, int, int]] = []
+    for index_bitpos, bitpos in enumerate(reversed(index_bit_positions)):
+        if len(index_bit_ranges) > 0:
+            lsb, bit_length, index_lsb = index_bit_ranges[-1]
+            if bitpos == lsb + bit_length and index_bitpos == index_lsb + bit_length:
+                index_bit_ranges[-1] = (lsb, bit_length + 1, index_lsb)
+                continue
+
+        index_bit_ranges.append((bitpos, 1, index_bitpos))
+
+    candidate_count_vec = np.bincount(entry_vec, minlength=1 << index_column_vec.shape[0])
+    return _TwoLevelTable(
+        index_bit_positions=index_bit_positions,
+        index_bit_ranges=index_bit_ranges,
+        candidate_offset_vec=np.append(0, np.cumsum(candidate_count_vec)).astype(np.intp),
+        candidate_instruction_index_vec=tree_instruction_index_vec[row_vec],
+        condition_programs={i: condition_program_dict[i] for i in tree_instruction_index_vec.tolist()
+                            if i in condition_program_dict},
+    )
+
+
+def _expand_two_level_table_entries(index_encoding_mat: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Expand instructions to the entries of the first level of a two-level table their encodings can match
+
+    :param index_encoding_mat: N x K matrix of instructions and index bits
+    :return: Vector of entries and vector of row numbers of instructions. Pairs are sorted by entries and then by rows
+    """
+    weight_vec = 1 << np.arange(index_encoding_mat.shape[1] - 1, -1, -1, dtype=np.int64)
+    base_vec = (index_encoding_mat == 1).astype(np.int64) @ weight_vec
+    arbitrary_vec = (index_encoding_mat == _ARBITRARY_BIT_INT).astype(np.int64) @ weight_vec
+
+    # Expand instructions sharing arbitrary bits at once
+    entry_vecs = [np.empty(0, dtype=np.int64)]
+    row_vecs = [np.empty(0, dtype=np.intp)]
+    for arbitrary_bits in np.unique(arbitrary_vec).tolist():
+        arbitrary_bits_vec = np.zeros(1, dtype=np.int64)
+        for weight in weight_vec[(arbitrary_bits & weight_vec) != 0].tolist():
+            arbitrary_bits_vec = np.append(arbitrary_bits_vec, arbitrary_bits_vec | weight)
+
+        row_vec = np.flatnonzero(arbitrary_vec == arbitrary_bits)
+        entry_vecs.append((base_vec[row_vec, np.newaxis] | arbitrary_bits_vec).reshape(-1))
+        row_vecs.append(np.repeat(row_vec, arbitrary_bits_vec.shape[0]))
+
+    entry_vec, row_vec = np.concatenate(entry_vecs), np.concatenate(row_vecs)
+    order_vec = np.lexsort((row_vec, entry_vec))
+    return entry_vec[order_vec], row_vec[order_vec]
+
+
+def _estimate_two_level_table_size(fixed_mat: np.ndarray) -> int:
+    """
+    Estimate the byte size of a two-level table
+
+    :param fixed_mat: N x K matrix of instructions and index bits holding whether a bit is fixed
+    :return: Byte size of offsets and candidate instructions of 4 bytes each
+    """
+    index_bit_length = fixed_mat.shape[1]
+    candidate_count = int(np.sum(1 << (index_bit_length - np.sum(fixed_mat, axis=1))))
+    return ((1 << index_bit_length) + 1 + candidate_count) * 4
+
+
 def _print_node(node: McdDecisionNode, level: int) -> None:  # pragma: no cover
     """
     Print the debug information of McdDecisionNode.
@@ -1504,6 +2986,518 @@ def _print_node(node: McdDecisionNode, level: int) -> None:  # pragma: no cover
         _print_node(node.arbitrary_bit_node, level + 1)
 
 
+def _min_encoding_element_byte_length(mcdecoder: McDecoder) -> int:
+    return min((instruction.encoding_element_bit_length // 8 for instruction in mcdecoder.instructions), default=2)
+
+
+def _find_first_matched_instructions(mcdecoder: McDecoder, code_form_mat: np.ndarray,
+                                     engine: Literal['linear', 'tree', 'lut', 'table']) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the first matched instructions in priority order for codes
+    in the same way as find_matched_instructions with first_match does.
+
+    Codes are processed chunk by chunk not to make a huge matrix of codes and instructions.
+    The first matched instructions are selected from all the matched instructions to match codes only once.
+
+    :param code_form_mat: N x 3 matrix of codes and code forms holding code values
+    :return: N-vector of index numbers of the first matched instructions (-1 if nothing matched)
+            and N-vector of counts of matched instructions
+    """
+    instruction_table = _get_instruction_table(mcdecoder)
+    matched_count_vec = np.zeros(code_form_mat.shape[0], dtype=np.intp)
+    instruction_index_vec = np.full(code_form_mat.shape[0], -1, dtype=np.intp)
+    for start in range(0, code_form_mat.shape[0], _DECODE_BUFFER_CHUNK_SIZE):
+        chunk_code_form_mat = code_form_mat[start:start + _DECODE_BUFFER_CHUNK_SIZE]
+        context = DecodeContextVectorized(mcdecoder=mcdecoder, code16x1_vec=chunk_code_form_mat[:, 0],
+                                          code16x2_vec=chunk_code_form_mat[:, 1], code32x1_vec=chunk_code_form_mat[:, 2])
+        match_result = find_matched_instructions_sparse(context, engine)
+        chunk_matched_count_vec = match_result.matched_count_vec
+
+        # Select the first matched instructions in priority order
+        first_row_vec, first_instruction_index_vec = _select_first_matched_pairs(
+            np.repeat(np.arange(chunk_matched_count_vec.shape[0]), chunk_matched_count_vec),
+            match_result.instruction_index_vec, instruction_table)
+
+        matched_count_vec[start:start + _DECODE_BUFFER_CHUNK_SIZE] = chunk_matched_count_vec
+        instruction_index_vec[start + first_row_vec] = first_instruction_index_vec
+
+    return instruction_index_vec, matched_count_vec
+
+
+def _create_code_form_mat(context: DecodeContextVectorized) -> np.ndarray:
+    """
+    Make N x 3 matrix of codes and code forms holding code values.
+
+    NOTE Codes are held as uint32 because no code forms exceed 32 bits.
+    """
+    code_form_mat = np.empty((np.shape(context.code16x1_vec)[0], len(_CODE_FORMS)), dtype=np.uint32)
+    code_form_mat[:, 0] = context.code16x1_vec
+    code_form_mat[:, 1] = context.code16x2_vec
+    code_form_mat[:, 2] = context.code32x1_vec
+    return code_form_mat
+
+
+def _find_matched_pairs_of_context(context: DecodeContextVectorized, code_form_mat: np.ndarray,
+                                   instruction_table: _InstructionTable, engine: Literal['linear', 'tree', 'lut', 'table'],
+                                   first_match: bool, counter: Optional[_ConditionEvaluationCounter] = None) \
+        -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find pairs of codes and instructions matched with each other for the codes of a context.
+
+    If a context has a cache, duplicate codes are matched only once.
+
+    :param code_form_mat: N x 3 matrix of codes and code forms holding code values
+    :return: K-vector of row numbers of codes and K-vector of index numbers of instructions.
+            Pairs are sorted by rows and then by instructions
+    """
+    if context.cache is None:
+        row_vec, instruction_index_vec = _find_matched_pairs(code_form_mat, instruction_table, engine, counter)
+        if first_match:
+            row_vec, instruction_index_vec = _select_first_matched_pairs(row_vec, instruction_index_vec, instruction_table)
+
+        return row_vec, instruction_index_vec
+
+    context.cache._use_mcdecoder(context.mcdecoder)
+
+    # Match unique codes
+    unique_code_form_mat, inverse_vec = _unique_code_forms(code_form_mat)
+    context.cache.hits += code_form_mat.shape[0] - unique_code_form_mat.shape[0]
+    context.cache.misses += unique_code_form_mat.shape[0]
+
+    unique_row_vec, unique_instruction_index_vec = _find_matched_pairs(unique_code_form_mat, instruction_table, engine,
+                                                                       counter)
+    if first_match:
+        unique_row_vec, unique_instruction_index_vec = _select_first_matched_pairs(
+            unique_row_vec, unique_instruction_index_vec, instruction_table)
+
+    # Expand the matches of unique codes to all the codes
+    unique_offset_vec = np.zeros(unique_code_form_mat.shape[0] + 1, dtype=np.intp)
+    np.cumsum(np.bincount(unique_row_vec, minlength=unique_code_form_mat.shape[0]), out=unique_offset_vec[1:])
+    start_vec = unique_offset_vec[inverse_vec]
+    count_vec = unique_offset_vec[inverse_vec + 1] - start_vec
+    return (np.repeat(np.arange(code_form_mat.shape[0]), count_vec),
+            unique_instruction_index_vec[_expand_ranges(start_vec, count_vec)])
+
+
+def _unique_code_forms(code_form_mat: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find unique codes
+
+    Codes are packed into 64-bit keys not to sort rows of a matrix, which is much slower.
+    Keys of code16x2 and code32x1 are made first and then keys of them and code16x1
+    only if codes of the same key have different code16x1.
+
+    :param code_form_mat: N x 3 matrix of codes and code forms holding code values
+    :return: U x 3 matrix of unique codes and N-vector of row numbers in it for codes
+    """
+    key_vec = (code_form_mat[:, 1].astype(np.uint64) << np.uint64(32)) | code_form_mat[:, 2]
+    unique_key_vec, inverse_vec = np.unique(key_vec, return_inverse=True)
+    inverse_vec = inverse_vec.reshape(-1)
+
+    unique_code_form_mat = np.empty((unique_key_vec.shape[0], len(_CODE_FORMS)), dtype=np.uint32)
+    unique_code_form_mat[inverse_vec, 0] = code_form_mat[:, 0]
+    unique_code_form_mat[:, 1] = unique_key_vec >> np.uint64(32)
+    unique_code_form_mat[:, 2] = unique_key_vec & np.uint64(0xffffffff)
+    if np.array_equal(unique_code_form_mat[inverse_vec, 0], code_form_mat[:, 0]):
+        return unique_code_form_mat, inverse_vec
+
+    key_vec = (inverse_vec.astype(np.uint64) << np.uint64(32)) | code_form_mat[:, 0]
+    unique_key_vec, inverse_vec = np.unique(key_vec, return_inverse=True)
+    unique_code_form_mat = unique_code_form_mat[(unique_key_vec >> np.uint64(32)).astype(np.intp)]
+    unique_code_form_mat[:, 0] = unique_key_vec & np.uint64(0xffffffff)
+    return unique_code_form_mat, inverse_vec.reshape(-1)
+
+
+def _find_matched_pairs(code_form_mat: np.ndarray, instruction_table: _InstructionTable,
+                        engine: Literal['linear', 'tree', 'lut', 'table'],
+                        counter: Optional[_ConditionEvaluationCounter] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find pairs of codes and instructions matched with each other.
+
+    Only the pairs passing the fixed bits test are made,
+    so that no matrices of codes and instructions are needed.
+
+    :param code_form_mat: N x 3 matrix of codes and code forms holding code values
+    :param counter: Counter to add the counts of condition evaluations to
+    :return: K-vector of row numbers of codes and K-vector of index numbers of instructions.
+            Pairs are sorted by rows and then by instructions
+    """
+    if engine in ('tree', 'lut'):
+        row_vecs = [np.empty(0, dtype=np.intp)]
+        instruction_index_vecs = [np.empty(0, dtype=np.intp)]
+        matches: List[Tuple[np.ndarray, int]] = []
+        row_vec = np.arange(code_form_mat.shape[0])
+        for code_form, match_node in instruction_table.match_trees:
+            if engine != 'lut' or code_form != _LUT_CODE_FORM:
+                code_vec = code_form_mat[:, code_form]
+                _find_matched_instructions_by_node_vectorized(code_vec, row_vec, match_node, matches,
+                                                              *_find_common_bits(code_vec))
+
+        # Test conditions only for codes passing the fixed bits test
+        fb_row_vec, fb_instruction_index_vec = _test_conditions_of_pairs(
+            code_form_mat, instruction_table,
+            np.concatenate([row_vec for row_vec, _ in matches] + [np.empty(0, dtype=np.intp)]),
+            np.concatenate([np.full(row_vec.shape[0], i, dtype=np.intp) for row_vec, i in matches]
+                           + [np.empty(0, dtype=np.intp)]), counter)
+        row_vecs.append(fb_row_vec)
+        instruction_index_vecs.append(fb_instruction_index_vec)
+
+        # NOTE A lookup table covers all the decision trees of 1 word of 16-bit
+        if engine == 'lut' and instruction_table.lut is not None:
+            lut_row_vec, lut_instruction_index_vec = _look_up_instruction_lut_vectorized(
+                code_form_mat[:, _LUT_CODE_FORM], instruction_table.lut)
+            row_vecs.append(lut_row_vec)
+            instruction_index_vecs.append(lut_instruction_index_vec)
+
+        matched_row_vec = np.concatenate(row_vecs)
+        matched_instruction_index_vec = np.concatenate(instruction_index_vecs)
+
+    elif engine == 'linear':
+        matched_row_vec, matched_instruction_index_vec = _find_matched_pairs_linearly(code_form_mat, instruction_table,
+                                                                                      counter=counter)
+
+    elif engine == 'table':
+        matched_row_vec, matched_instruction_index_vec = _find_matched_pairs_by_two_level_tables(
+            code_form_mat, instruction_table, counter)
+
+    else:
+        raise ValueError(f'Unknown engine: {engine}')
+
+    # Sort pairs unless they are sorted already as pairs found only by looking up a table
+    key_vec = matched_row_vec.astype(np.int64) * instruction_table.instruction_vec.shape[0] + matched_instruction_index_vec
+    if np.any(key_vec[1:] < key_vec[:-1]):
+        order_vec = np.argsort(key_vec)
+        matched_row_vec, matched_instruction_index_vec = matched_row_vec[order_vec], matched_instruction_index_vec[order_vec]
+
+    return matched_row_vec, matched_instruction_index_vec
+
+
+def _select_first_matched_pairs(row_vec: np.ndarray, instruction_index_vec: np.ndarray,
+                                instruction_table: _InstructionTable) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Select the pair of the first matched instruction in priority order for each code
+
+    :param row_vec: K-vector of row numbers of codes sorted in ascending order
+    :param instruction_index_vec: K-vector of index numbers of instructions
+    :return: Selected pairs of codes and instructions sorted by rows
+    """
+    order_vec = np.lexsort((instruction_table.priority_rank_vec[instruction_index_vec], row_vec))
+    row_vec, instruction_index_vec = row_vec[order_vec], instruction_index_vec[order_vec]
+
+    first_vec = np.ones(row_vec.shape[0], dtype=bool)
+    first_vec[1:] = row_vec[1:] != row_vec[:-1]
+    return row_vec[first_vec], instruction_index_vec[first_vec]
+
+
+def _find_matched_pairs_linearly(code_form_mat: np.ndarray, instruction_table: _InstructionTable,
+                                 code_form: Optional[int] = None, counter: Optional[_ConditionEvaluationCounter] = None) \
+        -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find unordered pairs of codes and instructions matched with each other by testing all the instructions
+
+    :param code_form: Index number of a code form in _CODE_FORMS to test only its instructions. None to test all
+    :param counter: Counter to add the counts of condition evaluations to
+    """
+    # Find bits common to all the codes to skip instructions no codes can reach
+    common_bits_list = [_find_common_bits(code_form_mat[:, form]) for form in range(len(_CODE_FORMS))]
+
+    # Test fixed bits of instructions in each group by looking up masked codes
+    row_vecs = [np.empty(0, dtype=np.intp)]
+    instruction_index_vecs = [np.empty(0, dtype=np.intp)]
+    for group in instruction_table.fixed_bit_groups:
+        if code_form is not None and group.code_form != code_form:
+            continue
+
+        # Narrow down fixed bits to ones not conflicting with the common bits
+        common_bit_mask, common_bits = common_bits_list[group.code_form]
+        common_bit_mask &= group.fixed_bit_mask
+        reachable_position_vec = np.flatnonzero((group.fixed_bits_vec & common_bit_mask) == (common_bits & common_bit_mask))
+        if reachable_position_vec.shape[0] == 0:
+            continue
+
+        fixed_bits_vec = group.fixed_bits_vec[reachable_position_vec]
+        masked_code_vec = code_form_mat[:, group.code_form] & group.fixed_bit_mask
+        if fixed_bits_vec.shape[0] == 1:
+            fb_row_vec = np.flatnonzero(masked_code_vec == fixed_bits_vec[0]) \
+                if common_bit_mask != group.fixed_bit_mask else np.arange(masked_code_vec.shape[0])
+            fb_position_vec = np.full(fb_row_vec.shape[0], reachable_position_vec[0], dtype=np.intp)
+        else:
+            position_vec = np.minimum(np.searchsorted(fixed_bits_vec, masked_code_vec), fixed_bits_vec.shape[0] - 1)
+            fb_row_vec = np.flatnonzero(fixed_bits_vec[position_vec] == masked_code_vec)
+            fb_position_vec = reachable_position_vec[position_vec[fb_row_vec]]
+
+        # Expand codes to all the instructions having the same fixed bits
+        start_vec = group.instruction_offset_vec[fb_position_vec]
+        count_vec = group.instruction_offset_vec[fb_position_vec + 1] - start_vec
+        row_vecs.append(np.repeat(fb_row_vec, count_vec))
+        instruction_index_vecs.append(group.instruction_index_vec[_expand_ranges(start_vec, count_vec)])
+
+    # Test conditions only for codes passing the fixed bits test
+    return _test_conditions_of_pairs(code_form_mat, instruction_table, np.concatenate(row_vecs),
+                                     np.concatenate(instruction_index_vecs), counter)
+
+
+def _find_matched_pairs_by_two_level_tables(code_form_mat: np.ndarray, instruction_table: _InstructionTable,
+                                            counter: Optional[_ConditionEvaluationCounter] = None) \
+        -> Tuple[np.ndarray, np.ndarray]:
+    """Find unordered pairs of codes and instructions matched with each other by looking up two-level tables"""
+    row_vecs = [np.empty(0, dtype=np.intp)]
+    instruction_index_vecs = [np.empty(0, dtype=np.intp)]
+    for code_form, two_level_table in _get_two_level_tables(instruction_table):
+        code_vec = code_form_mat[:, code_form]
+
+        # Make indexes of the first level
+        index_vec = np.zeros(code_vec.shape[0], dtype=np.intp)
+        for lsb, bit_length, index_lsb in two_level_table.index_bit_ranges:
+            index_vec |= ((code_vec >> lsb) & ((1 << bit_length) - 1)).astype(np.intp) << index_lsb
+
+        # Expand codes to their candidate instructions
+        start_vec = two_level_table.candidate_offset_vec[index_vec]
+        count_vec = two_level_table.candidate_offset_vec[index_vec + 1] - start_vec
+        row_vec = np.repeat(np.arange(code_vec.shape[0]), count_vec)
+        instruction_index_vec = two_level_table.candidate_instruction_index_vec[_expand_ranges(start_vec, count_vec)]
+
+        # Test fixed bits of candidate instructions
+        fb_test_vec = (code_vec[row_vec] & instruction_table.fixed_bit_mask_vec[instruction_index_vec]) \
+            == instruction_table.fixed_bits_vec[instruction_index_vec]
+        row_vecs.append(row_vec[fb_test_vec])
+        instruction_index_vecs.append(instruction_index_vec[fb_test_vec])
+
+    # Test conditions only for codes passing the fixed bits test
+    return _test_conditions_of_pairs(code_form_mat, instruction_table, np.concatenate(row_vecs),
+                                     np.concatenate(instruction_index_vecs), counter)
+
+
+def _test_conditions_of_pairs(code_form_mat: np.ndarray, instruction_table: _InstructionTable, fb_row_vec: np.ndarray,
+                              fb_instruction_index_vec: np.ndarray,
+                              counter: Optional[_ConditionEvaluationCounter] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Test the conditions of instructions for pairs of codes and instructions passing the fixed bits test.
+
+    Each unique condition atom is evaluated once for all the codes needing it
+    and its results are shared among the instructions having the same atom.
+
+    :param counter: Counter to add the counts of condition evaluations to
+    :return: Pairs of codes and instructions satisfying the conditions
+    """
+    # Group pairs by condition formulas
+    formula_vec = instruction_table.instruction_formula_vec[fb_instruction_index_vec]
+    order_vec = np.argsort(formula_vec, kind='stable')
+    fb_row_vec = fb_row_vec[order_vec]
+    fb_instruction_index_vec = fb_instruction_index_vec[order_vec]
+    formula_offset_vec = np.searchsorted(formula_vec[order_vec], np.arange(len(instruction_table.condition_formulas) + 1))
+    formula_ranges = [(f, start, end) for f, (start, end) in enumerate(zip(formula_offset_vec[:-1].tolist(),
+                                                                           formula_offset_vec[1:].tolist())) if start < end]
+
+    # Evaluate each unique atom once for the unique codes needing it
+    atom_row_vecs: Dict[int, List[np.ndarray]] = {}
+    for f, start, end in formula_ranges:
+        for a in instruction_table.condition_formula_atom_indexes[f]:
+            atom_row_vecs.setdefault(a, []).append(fb_row_vec[start:end])
+
+    atom_results: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+    for a, row_vecs in atom_row_vecs.items():
+        unique_row_vec = np.unique(np.concatenate(row_vecs))
+        code_form, atom_program = instruction_table.condition_atoms[a]
+        atom_results[a] = (unique_row_vec, atom_program.test_vectorized(code_form_mat[unique_row_vec, code_form]))
+
+    # Combine the results of atoms for each formula
+    test_vec = np.ones(fb_row_vec.shape[0], dtype=bool)
+    for f, start, end in formula_ranges:
+        test_vec[start:end] = _evaluate_condition_formula(instruction_table.condition_formulas[f], fb_row_vec[start:end],
+                                                          atom_results)
+
+    if counter is not None:
+        evaluation_count = sum(unique_row_vec.shape[0] for unique_row_vec, _ in atom_results.values())
+        counter.evaluation_count += evaluation_count
+        counter.saved_evaluation_count += sum((end - start) * len(instruction_table.condition_formula_atom_indexes[f])
+                                              for f, start, end in formula_ranges) - evaluation_count
+
+    return fb_row_vec[test_vec], fb_instruction_index_vec[test_vec]
+
+
+def _evaluate_condition_formula(formula: Tuple[Any, ...], row_vec: np.ndarray,
+                                atom_results: Dict[int, Tuple[np.ndarray, np.ndarray]]) -> np.ndarray:
+    """
+    Evaluate a condition formula for codes with the results of atoms
+
+    :param formula: Condition formula. See _InstructionTable.condition_formulas
+    :param row_vec: N-vector of row numbers of codes
+    :param atom_results: Dictionary of an index number of an atom and
+            a pair of a vector of sorted row numbers of codes and a vector of results for them
+    :return: N-vector of boolean results whether codes satisfy a formula
+    """
+    if formula[0] == 'atom':
+        unique_row_vec, result_vec = atom_results[formula[1]]
+        return result_vec[np.searchsorted(unique_row_vec, row_vec)]
+
+    elif formula[0] == 'not':
+        return ~_evaluate_condition_formula(formula[1], row_vec, atom_results)
+
+    test_vec = np.full(row_vec.shape[0], formula[0] == 'and')
+    for child_formula in formula[1]:
+        if formula[0] == 'and':
+            test_vec &= _evaluate_condition_formula(child_formula, row_vec, atom_results)
+        else:
+            test_vec |= _evaluate_condition_formula(child_formula, row_vec, atom_results)
+
+    return test_vec
+
+
+def _look_up_instruction_lut(code: int, lut: _InstructionLut, instruction_indexes: List[int]) -> None:
+    """
+    Find instructions matched with a 16-bit code by looking up a table.
+
+    The index numbers of matched instructions are added to instruction_indexes.
+    """
+    entry = int(lut.entry_vec[code & 0xffff])
+    if entry >= 0:
+        instruction_indexes.append(entry)
+    elif entry <= -2:
+        duplicate = -2 - entry
+        instruction_indexes.extend(lut.duplicate_instruction_index_vec[
+            lut.duplicate_offset_vec[duplicate]:lut.duplicate_offset_vec[duplicate + 1]].tolist())
+
+
+def _look_up_instruction_lut_vectorized(code_vec: np.ndarray, lut: _InstructionLut) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find pairs of 16-bit codes and instructions matched with each other by looking up a table
+
+    :return: K-vector of row numbers of codes and K-vector of index numbers of instructions
+    """
+    entry_vec = lut.entry_vec[code_vec & 0xffff]
+
+    # Codes matched with exactly one instruction
+    single_row_vec = np.flatnonzero(entry_vec >= 0)
+    duplicate_row_vec = np.flatnonzero(entry_vec <= -2)
+    if duplicate_row_vec.shape[0] == 0:
+        return single_row_vec, entry_vec[single_row_vec].astype(np.intp)
+
+    # Expand codes matched with multiple instructions
+    duplicate_vec = -2 - entry_vec[duplicate_row_vec].astype(np.intp)
+    start_vec = lut.duplicate_offset_vec[duplicate_vec]
+    count_vec = lut.duplicate_offset_vec[duplicate_vec + 1] - start_vec
+
+    return (np.concatenate([single_row_vec, np.repeat(duplicate_row_vec, count_vec)]),
+            np.concatenate([entry_vec[single_row_vec].astype(np.intp),
+                            lut.duplicate_instruction_index_vec[_expand_ranges(start_vec, count_vec)]]))
+
+
+def _expand_ranges(start_vec: np.ndarray, count_vec: np.ndarray) -> np.ndarray:
+    """
+    Expand ranges into the positions in them
+
+    :param start_vec: N-vector of start positions of ranges
+    :param count_vec: N-vector of counts of positions in ranges
+    :return: Concatenated positions of all the ranges
+    """
+    range_start_vec = np.repeat(np.cumsum(count_vec) - count_vec, count_vec)
+    return np.repeat(start_vec, count_vec) + np.arange(range_start_vec.shape[0]) - range_start_vec
+
+
+def _max_field_count(instruction_table: _InstructionTable) -> int:
+    return int(np.max(np.diff(instruction_table.instruction_field_offset_vec), initial=0))
+
+
+def _walk_steps(step_vec: np.ndarray) -> Tuple[np.ndarray, int]:
+    """
+    Walk from row 0 advancing by the step of each row until passing the last row.
+
+    It is done by pointer doubling instead of a Python loop over rows:
+    the rows reached with 2^k steps are made from ones with 2^(k-1) steps.
+
+    :param step_vec: N-vector of positive steps of rows
+    :return: Vector of walked rows and the row where a walk ends beyond the last row
+    """
+    row_count = step_vec.shape[0]
+    if row_count == 0:
+        return np.empty(0, dtype=np.intp), 0
+
+    # Row reached by one step from each row. Rows beyond the last row stay there
+    # NOTE A step from the last rows can be as long as the maximum step
+    max_step = int(np.max(step_vec))
+    jump_vec = np.arange(row_count + max_step, dtype=np.intp)
+    jump_vec[:row_count] += step_vec
+
+    # Rows reached by 0 to 2^k - 1 steps and then row reached by 2^k steps from each row
+    path_vec = np.zeros(1, dtype=np.intp)
+    while path_vec[-1] < row_count:
+        path_vec = np.concatenate((path_vec, jump_vec[path_vec]))
+        jump_vec = jump_vec[jump_vec]
+
+    walked_count = int(np.searchsorted(path_vec, row_count))
+    return path_vec[:walked_count], int(path_vec[walked_count])
+
+
+def _create_code_form_mat_from_buffer(buffer: Any, byteorder: Literal['big', 'little']) -> np.ndarray:
+    """
+    Make codes at every 16-bit offset of a buffer.
+
+    :return: N x 3 matrix of offsets and code forms in _CODE_FORMS holding code values
+    """
+    # View the buffer as 16-bit words without copying
+    byte_view = np.frombuffer(buffer, dtype=np.uint8)
+    word_dtype = np.dtype(np.uint16).newbyteorder('>' if byteorder == 'big' else '<')
+    word_vec = np.frombuffer(byte_view, dtype=word_dtype, count=byte_view.shape[0] // 2)
+
+    # Combine each word and its next word
+    code_form_mat = np.zeros((word_vec.shape[0], len(_CODE_FORMS)), dtype=np.uint32)
+    first_word_vec = code_form_mat[:, 0]
+    first_word_vec[:] = word_vec
+    second_word_vec = np.zeros_like(first_word_vec)
+    second_word_vec[:-1] = first_word_vec[1:]
+
+    code_form_mat[:, 1] = (first_word_vec << 16) | second_word_vec
+    if byteorder == 'big':
+        code_form_mat[:, 2] = code_form_mat[:, 1]
+    else:
+        code_form_mat[:, 2] = (second_word_vec << 16) | first_word_vec
+
+    return code_form_mat
+
+
+def _decode_fields_vectorized(code_form_mat: np.ndarray, instruction_index_vec: np.ndarray,
+                              instruction_table: _InstructionTable, field_column_vec: np.ndarray, column_count: int,
+                              fill_value: int) -> np.ndarray:
+    """
+    Decode the fields of instructions for codes.
+
+    Codes are grouped by instructions so that each subfield is decoded once per group.
+
+    :param code_form_mat: N x 3 matrix of codes and code forms holding code values
+    :param instruction_index_vec: N-vector of index numbers of instructions to decode with. -1 to decode nothing
+    :param instruction_table: _InstructionTable of McDecoder
+    :param field_column_vec: F-vector of columns of a result matrix to store decoded values of fields into
+    :param column_count: Count of columns of a result matrix
+    :param fill_value: Value of a result matrix for fields not decoded
+    :return: N x K matrix of codes and columns holding decoded field values
+    """
+    field_value_mat = np.full((instruction_index_vec.shape[0], column_count), fill_value, dtype=np.int64)
+    field_offset_vec = instruction_table.instruction_field_offset_vec
+    subfield_offset_vec = instruction_table.field_subfield_offset_vec
+
+    # Group codes by instructions
+    order_vec = np.argsort(instruction_index_vec, kind='stable')
+    unique_instruction_index_vec, start_vec = np.unique(instruction_index_vec[order_vec], return_index=True)
+    end_vec = np.append(start_vec[1:], order_vec.shape[0])
+    for i, start, end in zip(unique_instruction_index_vec.tolist(), start_vec, end_vec):
+        if i < 0:
+            continue
+
+        row_vec = order_vec[start:end]
+        code_vec = code_form_mat[row_vec, instruction_table.code_form_vec[i]]
+        for f in range(field_offset_vec[i], field_offset_vec[i + 1]):
+            value_vec = np.zeros_like(code_vec)
+            for s in range(subfield_offset_vec[f], subfield_offset_vec[f + 1]):
+                value_vec |= ((code_vec & int(instruction_table.subfield_mask_vec[s]))
+                              >> int(instruction_table.subfield_lsb_in_instruction_vec[s])) \
+                    << int(instruction_table.subfield_lsb_in_field_vec[s])
+
+            field_value_mat[row_vec, field_column_vec[f]] = value_vec
+
+    return field_value_mat
+
+
 def _decode_field(code: int, field_decoder: InstructionFieldDecoder) -> int:
     value = 0
     for sf_decoder in field_decoder.subfields:
@@ -1524,102 +3518,173 @@ def _get_appropriate_code(context: DecodeContext, instruction_decoder: Instructi
         return 0
 
 
-def _test_instruction_condition_vectorized(code_vec: np.ndarray, condition: InstructionDecoderCondition,  # noqa: C901
-                                           instruction_decoder: InstructionDecoder) -> np.ndarray:
-    # NOTE Do not refactor and split into multiple functions for performance
-    if isinstance(condition, AndIdCondition):
-        total_test_vec = np.full_like(code_vec, True)
-        for child_condition in condition.conditions:
-            test_vec: np.ndarray = _test_instruction_condition_vectorized(
-                code_vec, child_condition, instruction_decoder)
-            total_test_vec = np.logical_and(  # type: ignore # TODO pyright can't recognize numpy.logical_and
-                total_test_vec, test_vec)
+def _share_condition_program(context: _ConditionTableCreateContext, condition_program: _ConditionProgram) -> _ConditionProgram:
+    """Share a condition program with others having the same source so that it is compiled once"""
+    return context.programs.setdefault(condition_program.source, condition_program)
 
-        return total_test_vec
 
-    elif isinstance(condition, OrIdCondition):
-        total_test_vec = np.full_like(code_vec, False)
-        for child_condition in condition.conditions:
-            test_vec: np.ndarray = _test_instruction_condition_vectorized(
-                code_vec, child_condition, instruction_decoder)
-            total_test_vec = np.logical_or(  # type: ignore # TODO pyright can't recognize numpy.logical_and
-                total_test_vec, test_vec)
+def _create_condition_formula_index(context: _ConditionTableCreateContext, condition: InstructionDecoderCondition,
+                                    is_match_condition: bool, instruction_decoder: InstructionDecoder, code_form: int) -> int:
+    """
+    Create a formula of a condition over unique atoms
+
+    :param context: Context information while creating condition formulas
+    :param condition: Condition of an instruction
+    :param is_match_condition: True for a match condition, False for an unmatch condition
+    :param instruction_decoder: InstructionDecoder a condition belongs to
+    :param code_form: Index number of the code form of an instruction
+    :return: Index number of a unique formula
+    """
+    formula = _create_condition_formula(context, condition, instruction_decoder, code_form)
+    if not is_match_condition:
+        formula = ('not', formula)
+
+    if formula not in context.formula_indexes:
+        context.formula_indexes[formula] = len(context.formulas)
+        context.formulas.append(formula)
+
+    return context.formula_indexes[formula]
+
+
+def _create_condition_formula(context: _ConditionTableCreateContext, condition: InstructionDecoderCondition,
+                              instruction_decoder: InstructionDecoder, code_form: int) -> Tuple[Any, ...]:
+    """Make a formula of a condition. Atoms found in it are added to a context"""
+    if isinstance(condition, (AndIdCondition, OrIdCondition)):
+        return ('and' if isinstance(condition, AndIdCondition) else 'or',
+                tuple(_create_condition_formula(context, child_condition, instruction_decoder, code_form)
+                      for child_condition in condition.conditions))
+
+    # NOTE Atoms are identical if their sources are identical because the sources include field bit layouts
+    atom_program = _create_condition_program(condition, True, instruction_decoder)
+    atom_key = (code_form, atom_program.source)
+    if atom_key not in context.atom_indexes:
+        context.atom_indexes[atom_key] = len(context.atoms)
+        context.atoms.append((code_form, _share_condition_program(context, atom_program)))
+
+    return ('atom', context.atom_indexes[atom_key])
+
+
+def _condition_formula_atom_indexes(formula: Tuple[Any, ...]) -> Iterator[int]:
+    """Iterate over the index numbers of atoms a condition formula refers to"""
+    if formula[0] == 'atom':
+        yield formula[1]
+    elif formula[0] == 'not':
+        yield from _condition_formula_atom_indexes(formula[1])
+    else:
+        for child_formula in formula[1]:
+            yield from _condition_formula_atom_indexes(child_formula)
+
+
+def _create_condition_program(condition: InstructionDecoderCondition, is_match_condition: bool,
+                              instruction_decoder: InstructionDecoder) -> _ConditionProgram:
+    """
+    Compile a condition of an instruction into a _ConditionProgram.
+
+    :param condition: Condition to compile
+    :param is_match_condition: True for a match condition, False for an unmatch condition
+    :param instruction_decoder: InstructionDecoder a condition belongs to
+    :return: Created _ConditionProgram
+    """
+    # Dictionary of a field name and a local variable name holding its value
+    field_variables: Dict[str, str] = {}
+
+    scalar_expression = _condition_expression(condition, instruction_decoder, field_variables, False)
+    vectorized_expression = _condition_expression(condition, instruction_decoder, field_variables, True)
+
+    # Decode each referenced field only once
+    field_statements = [f'    {variable} = {_field_expression(field_decoder)}\n'
+                        for field_decoder in instruction_decoder.fields
+                        for name, variable in field_variables.items() if name == field_decoder.name]
+
+    # NOTE A condition not referring to any field results in a scalar for vectorized codes
+    if len(field_variables) == 0:
+        vectorized_expression = f'np.broadcast_to({vectorized_expression}, code.shape)'
+
+    scalar_result = f'({scalar_expression})' if is_match_condition else f'not ({scalar_expression})'
+    vectorized_result = f'({vectorized_expression})' if is_match_condition else f'~({vectorized_expression})'
+
+    source = ''.join(['def test(code):\n', *field_statements, f'    return {scalar_result}\n',
+                      'def test_vectorized(code):\n', *field_statements, f'    return {vectorized_result}\n'])
+    return _ConditionProgram(source=source)
+
 
-        return total_test_vec
+def _condition_expression(condition: InstructionDecoderCondition, instruction_decoder: InstructionDecoder,
+                          field_variables: Dict[str, str], vectorized: bool) -> str:
+    """Make a Python expression of a condition. Fields referenced by it are added to field_variables"""
+    if isinstance(condition, (AndIdCondition, OrIdCondition)):
+        if len(condition.conditions) == 0:
+            is_and = isinstance(condition, AndIdCondition)
+            return f'np.full(code.shape, {is_and})' if vectorized else str(is_and)
+
+        if vectorized:
+            operator = ' & ' if isinstance(condition, AndIdCondition) else ' | '
+        else:
+            operator = ' and ' if isinstance(condition, AndIdCondition) else ' or '
+        return operator.join(f'({_condition_expression(child_condition, instruction_decoder, field_variables, vectorized)})'
+                             for child_condition in condition.conditions)
 
     elif isinstance(condition, EqualityIdCondition):
-        subject_vec = _instruction_condition_object_vectorized(
-            code_vec, condition.subject, instruction_decoder)
-        object_vec = _instruction_condition_object_vectorized(
-            code_vec, condition.object, instruction_decoder)
-        if condition.operator == '==':
-            return subject_vec == object_vec
-        elif condition.operator == '!=':
-            return subject_vec != object_vec
-        elif condition.operator == '<':
-            return subject_vec < object_vec
-        elif condition.operator == '<=':
-            return subject_vec <= object_vec
-        elif condition.operator == '>':
-            return subject_vec > object_vec
-        elif condition.operator == '>=':  # pragma: no branch
-            return subject_vec >= object_vec
-        else:  # pragma: no cover
-            return np.full_like(code_vec, False)
+        subject = _condition_object_expression(condition.subject, instruction_decoder, field_variables, vectorized)
+        object = _condition_object_expression(condition.object, instruction_decoder, field_variables, vectorized)
+        return f'({subject}) {condition.operator} ({object})'
 
     elif isinstance(condition, InIdCondition):
-        subject_vec = _instruction_condition_object_vectorized(
-            code_vec, condition.subject, instruction_decoder)
-        return np.isin(subject_vec, condition.values)
+        subject = _condition_object_expression(condition.subject, instruction_decoder, field_variables, vectorized)
+        values = ', '.join(str(value) for value in condition.values)
+        if vectorized:
+            return f'np.isin({subject}, [{values}])'
+        else:
+            return f'({subject}) in {{{values}}}' if len(condition.values) > 0 else 'False'
 
     elif isinstance(condition, InRangeIdCondition):  # pragma: no branch
-        subject_vec = _instruction_condition_object_vectorized(
-            code_vec, condition.subject, instruction_decoder)
-        return np.logical_and(  # type: ignore # TODO pyright can't recognize numpy.logical_and
-            subject_vec >= condition.value_start, subject_vec <= condition.value_end)
+        subject = _condition_object_expression(condition.subject, instruction_decoder, field_variables, vectorized)
+        if vectorized:
+            return f'(({subject}) >= {condition.value_start}) & (({subject}) <= {condition.value_end})'
+        else:
+            return f'{condition.value_start} <= ({subject}) <= {condition.value_end}'
 
     else:  # pragma: no cover
-        return np.full_like(code_vec, False)
+        return 'np.full(code.shape, False)' if vectorized else 'False'
 
 
-def _instruction_condition_object_vectorized(code_vec: np.ndarray, object: InstructionDecoderConditionObject,
-                                             instruction_decoder: InstructionDecoder) -> np.ndarray:
+def _condition_object_expression(object: InstructionDecoderConditionObject, instruction_decoder: InstructionDecoder,
+                                 field_variables: Dict[str, str], vectorized: bool) -> str:
+    """Make a Python expression of a condition object. Fields referenced by it are added to field_variables"""
     if isinstance(object, FieldIdConditionObject):
-        field_decoder = next(
-            (field for field in instruction_decoder.fields if field.name == object.field), None)
-        if field_decoder is None:
-            return np.zeros_like(code_vec)
+        if not any(field.name == object.field for field in instruction_decoder.fields):
+            return 'np.zeros_like(code)' if vectorized else '0'
 
-        value_vec = _decode_field_vectorized(code_vec, field_decoder)
+        variable = field_variables.setdefault(object.field, f'field{len(field_variables)}')
         if object.element_index is not None:
-            value_vec = (value_vec & (1 << object.element_index)
-                         ) >> object.element_index
-
-        return value_vec
+            return f'(({variable} >> {object.element_index}) & 1)'
+        return variable
 
     elif isinstance(object, ImmediateIdConditionObject):
-        # Returns scalar
-        return np.array(object.value)
+        return str(object.value)
 
     elif isinstance(object, FunctionIdConditionObject):  # pragma: no branch
         if not (object.function in _FUNCTION_NAME_TO_FUNCTION):
-            return np.zeros_like(code_vec)
+            return 'np.zeros_like(code)' if vectorized else '0'
 
-        function = _FUNCTION_NAME_TO_FUNCTION[object.function]
-        value_vec = _instruction_condition_object_vectorized(
-            code_vec, object.argument, instruction_decoder)
-        return function(value_vec)
+        argument = _condition_object_expression(object.argument, instruction_decoder, field_variables, vectorized)
+        return f'_{"vectorized" if vectorized else "scalar"}_{object.function}({argument})'
 
     else:  # pragma: no cover
-        return np.zeros_like(code_vec)
+        return 'np.zeros_like(code)' if vectorized else '0'
 
 
-def _decode_field_vectorized(code_vec: np.ndarray, field_decoder: InstructionFieldDecoder) -> np.ndarray:
-    value_vec = np.zeros_like(code_vec)
+def _field_expression(field_decoder: InstructionFieldDecoder) -> str:
+    """Make a Python expression to decode a field from a code"""
+    subfield_expressions: List[str] = []
     for sf_decoder in field_decoder.subfields:
-        value_vec |= ((code_vec & sf_decoder.mask) >>
-                      sf_decoder.lsb_in_instruction) << sf_decoder.lsb_in_field
-    return value_vec
+        expression = f'(code & {sf_decoder.mask:#x})'
+        if sf_decoder.lsb_in_instruction > 0:
+            expression = f'({expression} >> {sf_decoder.lsb_in_instruction})'
+        if sf_decoder.lsb_in_field > 0:
+            expression = f'({expression} << {sf_decoder.lsb_in_field})'
+        subfield_expressions.append(expression)
+
+    return ' | '.join(subfield_expressions) if len(subfield_expressions) > 0 else '0'
 
 
 def _setbit_count(value_vec: np.ndarray) -> np.ndarray:
@@ -1629,11 +3694,22 @@ def _setbit_count(value_vec: np.ndarray) -> np.ndarray:
     :param value_vec: N-vector of values
     :return: N-vector of set bit counts of values
     """
-    value_vvec = value_vec.reshape(-1, 1)
-    bit_mat = np.unpackbits(value_vvec.view(dtype=np.uint8),  # type: ignore # TODO pyright can't recognize numpy.uint8
-                            axis=1)
-    count_vec = np.sum(bit_mat, axis=1)
-    return count_vec
+    # Count bits in parallel within each 32-bit word (SWAR popcount)
+    count_vec = np.asarray(value_vec).astype(np.uint32)
+    count_vec = count_vec - ((count_vec >> 1) & 0x55555555)
+    count_vec = (count_vec & 0x33333333) + ((count_vec >> 2) & 0x33333333)
+    count_vec = (count_vec + (count_vec >> 4)) & 0x0f0f0f0f
+    return (count_vec * 0x01010101) >> 24
+
+
+def _setbit_count_scalar(value: int) -> int:
+    """
+    Calculate the set bit count of a value. It is built-in function for an instruction condition.
+
+    :param value: Value
+    :return: Set bit count of a value
+    """
+    return bin(value).count('1')
 
 
 # endregion
@@ -1650,12 +3726,48 @@ Dictionary to define built-in functions for an instruction condition.
 Its entry is a pair of a function name and a function.
 """
 
+_SCALAR_FUNCTION_NAME_TO_FUNCTION: Dict[str, Callable[[int], int]] = {
+    'setbit_count': _setbit_count_scalar,
+}
+"""Dictionary to define built-in functions for an instruction condition. They are used for non-vectorized calculations"""
+
 _ARBITRARY_BIT_INT: int = 2
 """Integer representation of an arbitrary bit"""
 
+_DEFAULT_TABLE_MEMORY_BUDGET: int = 1 << 20
+"""Default max byte size of each two-level table"""
+
+_DECODE_BUFFER_CHUNK_SIZE: int = 1 << 16
+"""Count of codes to find matched instructions at once in decode_buffer and linear_sweep"""
+
+_CODE_FORMS: List[Tuple[int, int]] = [(16, 1), (16, 2), (32, 1)]
+"""
+Forms of codes instructions need.
+Its entry is a pair of a bit length of an encoding element and a length of encoding elements
+"""
+
+_LUT_CODE_FORM: int = 0
+"""Index number of the code form in _CODE_FORMS whose codes are looked up by the lut engine"""
+
+_MODEL_CACHE_VERSION: str = f'{__version__.__version__}-12'
+"""Version of a cache file format in the on-disk model cache. Cache files of other versions are ignored"""
+
+_MODEL_CACHE_FILE_EXTENSION: str = '.mcdcache'
+"""File extension of a cache file in the on-disk model cache"""
+
+_VALIDATED_MARK_FILE_EXTENSION: str = '.validated'
+"""File extension of a file to mark an MC description as validated against the schema"""
+
+_PARSER_TABLES_FILE_EXTENSION: str = '.tables'
+"""File extension of serialized parser tables"""
+
+_GRAMMAR_FILES_AND_STARTS: List[Tuple[str, str]] = [
+    ('instruction_encoding.lark', 'instruction_encoding'),
+    ('instruction_condition.lark', 'condition'),
+]
+"""Grammar files in mcdecoder.grammars and their start rules"""
+
 _yaml_include_context: _YamlIncludeContext = _YamlIncludeContext(base_dir='')
-_instruction_encoding_parser: lark.Lark = _create_instruction_encoding_parser()
-_instruction_condition_parser: lark.Lark = _create_instruction_condition_parser()
 
 # endregion
 
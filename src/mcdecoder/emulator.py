@@ -5,7 +5,9 @@ from . import common, core
 # region External functions
 
 
-def emulate(mcfile: str, bit_pattern: str, base: Literal[2, 16] = 16, byteorder: Literal['big', 'little'] = 'big') -> int:
+def emulate(mcfile: str, bit_pattern: str, base: Literal[2, 16] = 16, byteorder: Literal['big', 'little'] = 'big',
+            use_cache: bool = False, trusted: bool = False,
+            engine: Literal['linear', 'tree', 'lut', 'table'] = 'linear', first_match: bool = False) -> int:
     """
     Implementation of the sub-command 'emulate'.
 
@@ -18,10 +20,14 @@ def emulate(mcfile: str, bit_pattern: str, base: Literal[2, 16] = 16, byteorder:
     :param bit_pattern: Binary/hex string to be decoded
     :param base: Base of integer that specifies the expression of bit_pattern
     :param byteorder: Byte order of bit_pattern
+    :param use_cache: True to use the on-disk model cache
+    :param trusted: True to skip the schema validation of an MC description already validated
+    :param engine: Engine to find instructions. See core.find_matched_instructions for possible engines
+    :param first_match: True to output only the first matched instruction in the same way as a generated decoder
     :return: Exit code of mcdecoder
     """
     # Emulate
-    instruction_results = _emulate(mcfile, bit_pattern, base, byteorder)
+    instruction_results = _emulate(mcfile, bit_pattern, base, byteorder, use_cache, trusted, engine, first_match)
 
     # Output results
     if len(instruction_results) > 0:
@@ -48,9 +54,11 @@ def emulate(mcfile: str, bit_pattern: str, base: Literal[2, 16] = 16, byteorder:
 # region Internal functions
 
 def _emulate(mcfile: str, bit_pattern: str, base: Literal[2, 16],
-             byteorder: Literal['big', 'little', 'raw']) -> List[core.InstructionDecodeResult]:
+             byteorder: Literal['big', 'little', 'raw'], use_cache: bool = False,
+             trusted: bool = False, engine: Literal['linear', 'tree', 'lut', 'table'] = 'linear',
+             first_match: bool = False) -> List[core.InstructionDecodeResult]:
     # Create MC decoder model
-    mcdecoder = core.create_mcdecoder_model(mcfile)
+    mcdecoder = core.create_mcdecoder_model(mcfile, use_cache=use_cache, trusted=trusted)
 
     # Trim whitespaces
     trimmed_bit_pattern = common.trim_whitespace(bit_pattern)
@@ -77,11 +85,12 @@ def _emulate(mcfile: str, bit_pattern: str, base: Literal[2, 16],
         mcdecoder=mcdecoder, code16x1=code16x1, code16x2=code16x2, code32x1=code32x1)
 
     # Emulate decoder
-    return _emulate_decoder(decode_context)
+    return _emulate_decoder(decode_context, engine, first_match)
 
 
-def _emulate_decoder(context: core.DecodeContext) -> List[core.InstructionDecodeResult]:
-    matched_decoders = core.find_matched_instructions(context)
+def _emulate_decoder(context: core.DecodeContext, engine: Literal['linear', 'tree', 'lut', 'table'] = 'linear',
+                     first_match: bool = False) -> List[core.InstructionDecodeResult]:
+    matched_decoders = core.find_matched_instructions(context, engine, first_match)
     return [core.decode_instruction(context, instruction_decoder) for instruction_decoder in matched_decoders]
 
 
@@ -1,5 +1,4 @@
 import csv
-from dataclasses import dataclass
 import itertools
 from typing import List, cast
 
@@ -8,7 +7,7 @@ from . import common, core
 # region External functions
 
 
-def export(mcfile: str, output_file: str) -> int:
+def export(mcfile: str, output_file: str, trusted: bool = False) -> int:
     """
     Implementation of the sub-command 'export'.
 
@@ -18,9 +17,10 @@ def export(mcfile: str, output_file: str) -> int:
 
     :param mcfile: Path to an MC description file
     :param output_file: Path to an file to be exported
+    :param trusted: True to skip the schema validation of an MC description already validated
     :return: Exit code of mcdecoder
     """
-    result = _export(mcfile, output_file)
+    result = _export(mcfile, output_file, trusted)
     if result:
         print('Exported a machine code description.')
         return 0
@@ -29,27 +29,13 @@ def export(mcfile: str, output_file: str) -> int:
         return 1
 
 
-# endregion
-
-# region Internal classes
-
-@dataclass
-class _InstructionInfo:
-    instruction: core.InstructionDescription
-    encoding: core.InstructionEncodingDescription
-
-
 # endregion
 
 # region Internal functions
 
-def _export(mcfile: str, output_file: str) -> bool:
-    # Load MC description
-    mc_desc = core.load_mc_description(mcfile)
-
-    # Parse instruction formats
-    instruction_infos = [_InstructionInfo(instruction=instruction, encoding=core.parse_instruction_encoding(
-        instruction['format'])) for instruction in mc_desc['instructions']]
+def _export(mcfile: str, output_file: str, trusted: bool = False) -> bool:
+    # Load MC description and parse instruction formats
+    _, instruction_infos = core.load_and_parse_mc_description(mcfile, trusted)
     max_instruction_bit_size = max(core.calc_instruction_bit_size(
         info.encoding) for info in instruction_infos)
 
@@ -10,7 +10,7 @@ from . import common, core
 
 
 def generate(mcfile: str, type: Optional[str] = None, template_directory: Optional[str] = None,
-             output_directory: str = '.') -> int:
+             output_directory: str = '.', use_cache: bool = False, trusted: bool = False) -> int:
     """
     Implementation the sub-command 'generate'.
 
@@ -23,6 +23,8 @@ def generate(mcfile: str, type: Optional[str] = None, template_directory: Option
     :param type: Code type to generate
     :param template_directory: Path to a directory including template files
     :param output_directory: Path to an output directory of generated codes
+    :param use_cache: True to use the on-disk model cache
+    :param trusted: True to skip the schema validation of an MC description already validated
     :return: Exit code of mcdecoder
     """
     # Default output directory to the current
@@ -35,7 +37,7 @@ def generate(mcfile: str, type: Optional[str] = None, template_directory: Option
         return 1
 
     # Create decoder model
-    mcdecoder_model = core.create_mcdecoder_model(mcfile)
+    mcdecoder_model = core.create_mcdecoder_model(mcfile, use_cache=use_cache, trusted=trusted)
 
     # Create template loader
     if template_directory is None:
@@ -0,0 +1,105 @@
+"""
+Benchmark of the memory footprint of a chunk of the sub-command 'check'.
+
+It compares the dense int64 matching used by mcdecoder 0.1.1, which makes N x M matrices of codes and instructions,
+with the current matching of uint32 codes producing sparse results.
+Peak memory is measured with tracemalloc while matching one chunk of codes.
+
+Usage::
+
+  python tests/benchmark/bench_check_memory.py --instructions 3000 --chunks 4
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Tuple
+
+import numpy as np
+import yaml
+
+from mcdecoder import checker, core
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark of the memory footprint of a chunk of check')
+    parser.add_argument('--instructions', type=int, default=3000, help='Count of instructions (default: 3000)')
+    parser.add_argument('--chunks', type=int, default=4, help='Count of chunks to check (default: 4)')
+    parser.add_argument('--vec-size', type=int, default=checker._VEC_SIZE,
+                        help=f'Count of codes in a chunk (default: {checker._VEC_SIZE})')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        mcfile = _write_mc_description(temp_dir, args.instructions)
+        mcdecoder = core.create_mcdecoder_model(mcfile)
+
+    bit_pattern = checker._create_bit_pattern('xxxxxxxx', 16)
+    context = checker._CheckContext(bit_pattern=bit_pattern, decode_context=core.DecodeContextVectorized(
+        mcdecoder=mcdecoder, code16x1_vec=np.empty(()), code16x2_vec=np.empty(()), code32x1_vec=np.empty(())))
+
+    print(f'Instructions: {args.instructions:,}, codes per chunk: {args.vec_size:,}')
+    for label, match in [('int64 dense (0.1.1)', _match_dense_int64), ('uint32 sparse', _match_sparse_uint32)]:
+        elapsed_time, peak_size = _measure(lambda step_vec: match(context, step_vec), args.vec_size, args.chunks)
+        print(f'{label:<24}{elapsed_time * 1000:10.1f} ms/chunk{peak_size / (1 << 20):10.1f} MiB/chunk')
+
+
+def _write_mc_description(directory: str, instruction_count: int) -> str:
+    """Write an MC description having instructions with various fixed bits and conditions"""
+    instructions = [{
+        'name': f'instruction_{index}',
+        'format': f'xxxx:cond|{index & 0xfff:012b}|xxxx:Rn|xxxx:Rd|xxxx xxxx:imm8',
+        'unmatch_condition': 'cond == 15',
+    } for index in range(instruction_count)]
+
+    mcfile = os.path.join(directory, 'mc.yaml')
+    with open(mcfile, 'w') as file:
+        yaml.dump({'machine': {'byteorder': 'little'}, 'instructions': instructions}, file,
+                  Dumper=getattr(yaml, 'CSafeDumper', yaml.SafeDumper))
+
+    return mcfile
+
+
+def _match_dense_int64(context: checker._CheckContext, step_vec: np.ndarray) -> np.ndarray:
+    """Match a chunk of codes in the way mcdecoder 0.1.1 did"""
+    instruction_table = core._get_instruction_table(context.decode_context.mcdecoder)
+
+    bits_vec = checker._make_bits(context, step_vec).astype(np.int64)
+    code_form_mat = np.stack([bits_vec >> 16, bits_vec, bits_vec], axis=1)
+    code_mat = code_form_mat[:, instruction_table.code_form_vec]
+    test_mat = (code_mat & instruction_table.fixed_bit_mask_vec) == instruction_table.fixed_bits_vec
+    for i, _, _, _, condition_program in instruction_table.priority_instructions:
+        if condition_program is not None:
+            test_mat[:, i] &= condition_program.test_vectorized(code_mat[:, i])
+
+    return np.sum(test_mat, axis=1)
+
+
+def _match_sparse_uint32(context: checker._CheckContext, step_vec: np.ndarray) -> np.ndarray:
+    """Match a chunk of codes in the way the sub-command 'check' does"""
+    bits_vec = checker._make_bits(context, step_vec)
+    context.decode_context.code32x1_vec = bits_vec
+    context.decode_context.code16x1_vec = bits_vec >> 16
+    context.decode_context.code16x2_vec = bits_vec
+    return core.find_matched_instructions_sparse(context.decode_context).matched_count_vec
+
+
+def _measure(match: Callable[[np.ndarray], np.ndarray], vec_size: int, chunk_count: int) -> Tuple[float, int]:
+    """Measure the mean elapsed time and the max peak memory of matching chunks"""
+    elapsed_time = 0.0
+    peak_size = 0
+    for chunk in range(chunk_count):
+        step_vec = np.arange(chunk * vec_size, (chunk + 1) * vec_size)
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        match(step_vec)
+        elapsed_time += time.perf_counter() - start
+        peak_size = max(peak_size, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    return elapsed_time / chunk_count, peak_size
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark of decoding a code stream with and without DecodeCache.
+
+It emulates an execution trace where the codes of hot loops recur,
+and decodes it code by code and as a batch of vectorized codes.
+
+Usage::
+
+  python tests/benchmark/bench_decode_cache.py --codes 100000 --hot-codes 2000 tests/common/arm.yaml
+"""
+import argparse
+import time
+from typing import Any, Optional
+
+import numpy as np
+
+from mcdecoder import core
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark of decoding a code stream with and without DecodeCache')
+    parser.add_argument('--codes', type=int, default=100000, help='Count of codes in a stream (default: 100000)')
+    parser.add_argument('--hot-codes', type=int, default=2000, help='Count of distinct codes in a stream (default: 2000)')
+    parser.add_argument('--cache-size', type=int, default=4096, help='Max count of codes to cache (default: 4096)')
+    parser.add_argument('--engine', choices=['linear', 'tree', 'lut', 'table'], default='tree',
+                        help='Engine to find instructions (default: tree)')
+    parser.add_argument('mcfile', help='A path to a machine code description file')
+    args = parser.parse_args()
+
+    mcdecoder = core.create_mcdecoder_model(args.mcfile)
+    rng = np.random.default_rng(0)
+    hot_code_vec = rng.integers(0, 1 << 32, args.hot_codes, dtype=np.uint64).astype(np.uint32)
+    code_vec = hot_code_vec[rng.integers(0, args.hot_codes, args.codes)]
+
+    print(f'Codes: {args.codes:,}, distinct codes: {args.hot_codes:,}, engine: {args.engine}')
+    for label, cache in [('uncached', None), ('cached', core.DecodeCache(maxsize=args.cache_size))]:
+        elapsed_time = _decode_scalar(mcdecoder, code_vec, args.engine, cache)
+        print(f'{"scalar " + label:<24}{elapsed_time * 1000:10.1f} ms  {cache if cache is not None else ""}')
+
+    for label, cache in [('uncached', None), ('deduplicated', core.DecodeCache(maxsize=args.cache_size))]:
+        elapsed_time = _decode_vectorized(mcdecoder, code_vec, args.engine, cache)
+        print(f'{"vectorized " + label:<24}{elapsed_time * 1000:10.1f} ms  {cache if cache is not None else ""}')
+
+
+def _decode_scalar(mcdecoder: core.McDecoder, code_vec: np.ndarray, engine: Any,
+                   cache: Optional[core.DecodeCache]) -> float:
+    """Decode codes one by one and return the elapsed time"""
+    start = time.perf_counter()
+    for code in code_vec.tolist():
+        context = core.DecodeContext(mcdecoder=mcdecoder, code16x1=code >> 16, code16x2=code, code32x1=code, cache=cache)
+        for instruction in core.find_matched_instructions(context, engine):
+            core.decode_instruction(context, instruction)
+
+    return time.perf_counter() - start
+
+
+def _decode_vectorized(mcdecoder: core.McDecoder, code_vec: np.ndarray, engine: Any,
+                       cache: Optional[core.DecodeCache]) -> float:
+    """Decode codes as a batch and return the elapsed time"""
+    start = time.perf_counter()
+    context = core.DecodeContextVectorized(mcdecoder=mcdecoder, code16x1_vec=code_vec >> 16, code16x2_vec=code_vec,
+                                           code32x1_vec=code_vec, cache=cache)
+    match_result = core.find_matched_instructions_sparse(context, engine)
+    core.decode_instructions_vectorized(context, match_result.first_instruction_index_vec)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    main()
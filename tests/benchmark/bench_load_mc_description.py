@@ -0,0 +1,103 @@
+"""
+Benchmark of loading a large MC description split into multiple included files.
+
+It compares the pure-Python YAML loader used by mcdecoder 0.1.1 with the LibYAML-backed loader.
+
+Usage::
+
+  python tests/benchmark/bench_load_mc_description.py --instructions 4000 --files 20
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import Callable
+
+import yaml
+
+from mcdecoder import core
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark of loading a large MC description')
+    parser.add_argument('--instructions', type=int, default=4000, help='Count of instructions (default: 4000)')
+    parser.add_argument('--files', type=int, default=20, help='Count of included files (default: 20)')
+    parser.add_argument('--repeat', type=int, default=3, help='Count of repetitions (default: 3)')
+    args = parser.parse_args()
+
+    print(f'LibYAML available: {yaml.__with_libyaml__}')
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        mcfile = _write_mc_description(temp_dir, args.instructions, args.files)
+
+        pure_time = _measure(lambda: _load_with_pure_loader(mcfile), args.repeat)
+        fast_time = _measure(lambda: _load_with_mcdecoder_loader(mcfile), args.repeat)
+        total_time = _measure(lambda: core.load_mc_description(mcfile), args.repeat)
+
+    print(f'YAML loading with yaml.Loader:        {pure_time:8.3f} s')
+    print(f'YAML loading with mcdecoder loader:   {fast_time:8.3f} s ({pure_time / fast_time:.1f}x)')
+    print(f'load_mc_description (with validation): {total_time:8.3f} s')
+
+
+def _write_mc_description(directory: str, instruction_count: int, file_count: int) -> str:
+    """Write an MC description whose instructions are split into included files"""
+    os.makedirs(os.path.join(directory, 'instructions'))
+
+    per_file = (instruction_count + file_count - 1) // file_count
+    for file_index in range(file_count):
+        instructions = []
+        for index in range(file_index * per_file, min((file_index + 1) * per_file, instruction_count)):
+            instructions.append({
+                'name': f'instruction_{index}',
+                'format': f'xxxx:cond|{index & 0xfff:012b}|xxxx:Rn|xxxx:Rd|xxxx xxxx:imm8',
+                'unmatch_condition': 'cond == 15',
+                'extras': {'clocks': index % 8, 'group': f'group_{file_index}'},
+                'field_extras': {'Rn': {'type': 'register'}, 'Rd': {'type': 'register'}},
+            })
+
+        with open(os.path.join(directory, 'instructions', f'instructions_{file_index:03}.yaml'), 'w') as file:
+            yaml.dump(instructions, file, Dumper=getattr(yaml, 'CSafeDumper', yaml.SafeDumper))
+
+    mcfile = os.path.join(directory, 'mc.yaml')
+    with open(mcfile, 'w') as file:
+        file.write('machine:\n  byteorder: little\ninstructions: !include instructions/*.yaml\n')
+
+    return mcfile
+
+
+def _load_with_pure_loader(mcfile: str) -> None:
+    """Load YAML files with the pure-Python loader as mcdecoder 0.1.1 did"""
+    class PureLoader(yaml.Loader):
+        pass
+
+    def include_constructor(loader: yaml.Loader, node: yaml.Node) -> object:
+        results = []
+        for path in core._glob_included_files(os.path.join(os.path.dirname(mcfile), loader.construct_scalar(node))):
+            with open(path, 'r') as file:
+                results.extend(yaml.load(file, Loader=PureLoader))
+        return results
+
+    yaml.add_constructor('!include', include_constructor, Loader=PureLoader)
+    with open(mcfile, 'rb') as file:
+        yaml.load(file, Loader=PureLoader)
+
+
+def _load_with_mcdecoder_loader(mcfile: str) -> None:
+    """Load YAML files with the loader of mcdecoder"""
+    core._yaml_include_context.base_dir = os.path.dirname(mcfile)
+    with open(mcfile, 'rb') as file:
+        yaml.load(file, Loader=core._YamlLoader)
+
+
+def _measure(function: Callable[[], object], repeat: int) -> float:
+    """Measure the best elapsed time of a function"""
+    elapsed_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed_times.append(time.perf_counter() - start)
+    return min(elapsed_times)
+
+
+if __name__ == '__main__':
+    main()
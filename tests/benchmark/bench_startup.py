@@ -0,0 +1,63 @@
+"""
+Benchmark of the start-up time of mcdecoder command.
+
+It runs ``python -m mcdecoder`` for short-lived sub-commands in new processes and reports their wall-clock times.
+If --max-version-ms is specified, it fails when ``--version`` is slower than the limit,
+so that it can guard against start-up time regressions.
+
+Usage::
+
+  python tests/benchmark/bench_startup.py --repeat 20 --max-version-ms 150
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Benchmark of the start-up time of mcdecoder command')
+    parser.add_argument('--repeat', type=int, default=10, help='Count of repetitions (default: 10)')
+    parser.add_argument('--mcfile', default='tests/common/arm.yaml',
+                        help='MC description file (default: tests/common/arm.yaml)')
+    parser.add_argument('--max-version-ms', type=float, default=None,
+                        help='Fail if the median time of --version exceeds this limit in milliseconds')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        commands = {
+            'python (baseline)': [sys.executable, '-c', 'pass'],
+            'mcdecoder --version': [sys.executable, '-m', 'mcdecoder', '--version'],
+            'mcdecoder export': [sys.executable, '-m', 'mcdecoder', 'export', '--output', f'{temp_dir}/out.csv',
+                                 args.mcfile],
+            'mcdecoder emulate (cached model)': [sys.executable, '-m', 'mcdecoder', 'emulate', '--input', 'e92d4800',
+                                                 args.mcfile],
+        }
+
+        medians = {}
+        for label, command in commands.items():
+            medians[label] = statistics.median(_measure(command, args.repeat)) * 1000
+            print(f'{label:<36}{medians[label]:8.1f} ms')
+
+    if args.max_version_ms is not None and medians['mcdecoder --version'] > args.max_version_ms:
+        print(f'--version is slower than {args.max_version_ms} ms')
+        return 1
+
+    return 0
+
+
+def _measure(command: List[str], repeat: int) -> List[float]:
+    """Measure the elapsed times of a command"""
+    elapsed_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, stdout=subprocess.DEVNULL, check=True)
+        elapsed_times.append(time.perf_counter() - start)
+    return elapsed_times
+
+
+if __name__ == '__main__':
+    sys.exit(main())
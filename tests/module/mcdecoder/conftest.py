@@ -0,0 +1,9 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def model_cache_directory(tmp_path_factory, monkeypatch) -> str:
+    """Isolate the on-disk model cache from the one of a user"""
+    cache_directory = str(tmp_path_factory.mktemp('cache'))
+    monkeypatch.setenv('MCDECODER_CACHE_DIR', cache_directory)
+    return cache_directory
@@ -1,5 +1,9 @@
 import os
 import shutil
+import subprocess
+import sys
+import textwrap
+from typing import List
 
 from mcdecoder.app import run_app
 
@@ -25,6 +29,16 @@ def test_run_app_version() -> None:
     assert run_app(['mcdecoder', '--version']) == 0
 
 
+def test_run_app_lazy_imports(tmp_path) -> None:
+    # --version must not import any heavy third-party modules
+    assert _imported_heavy_modules(['mcdecoder', '--version']) == []
+
+    # export doesn't need numpy and jinja2
+    assert _imported_heavy_modules(['mcdecoder', 'export', '--output', str(tmp_path / 'arm.csv'),
+                                    'tests/common/arm.yaml']) == ['jsonschema', 'lark']
+    assert (tmp_path / 'arm.csv').exists()
+
+
 def test_run_app_generate_without_arguments() -> None:
     shutil.rmtree('out', ignore_errors=True)
 
@@ -87,6 +101,47 @@ def test_run_app_emulate() -> None:
                     '00 48 2d e9', '--byteorder', 'little', 'tests/common/arm.yaml']) == 0
 
 
+def test_run_app_model_cache(model_cache_directory: str) -> None:
+    # --no-cache does not store a model
+    assert run_app(['mcdecoder', 'emulate', '--no-cache', '--input',
+                    'e9 2d 48 00', 'tests/common/arm.yaml']) == 0
+    assert run_app(['mcdecoder', 'check', '--no-cache', '--input',
+                    'e9 2d 48 0x', 'tests/common/arm.yaml']) == 0
+    assert os.listdir(model_cache_directory) == []
+
+    # The model cache is used by default
+    assert run_app(['mcdecoder', 'emulate', '--input',
+                    'e9 2d 48 00', 'tests/common/arm.yaml']) == 0
+    assert len(os.listdir(model_cache_directory)) > 0
+
+    # --clear-cache removes the stored models
+    assert run_app(['mcdecoder', 'emulate', '--no-cache', '--clear-cache', '--input',
+                    'e9 2d 48 00', 'tests/common/arm.yaml']) == 0
+    assert os.listdir(model_cache_directory) == []
+
+
+def test_run_app_trusted(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv('MCDECODER_CACHE_DIR', str(tmp_path))
+    assert run_app(['mcdecoder', 'emulate', '--no-cache', '--trusted', '--input',
+                    'e9 2d 48 00', 'tests/common/arm.yaml']) == 0
+    assert [os.path.splitext(file)[1] for file in os.listdir(tmp_path)] == ['.validated']
+    assert run_app(['mcdecoder', 'check', '--trusted', '--input',
+                    'e9 2d 48 0x', 'tests/common/arm.yaml']) == 0
+
+
+def test_run_app_engine() -> None:
+    assert run_app(['mcdecoder', 'emulate', '--engine', 'tree', '--input',
+                    'e9 2d 48 00', 'tests/common/arm.yaml']) == 0
+    assert run_app(['mcdecoder', 'check', '--engine', 'tree', '--input',
+                    'ex xd 48 00', 'tests/common/arm.yaml']) == 0
+    assert run_app(['mcdecoder', 'emulate', '--engine', 'lut', '--input',
+                    '00 01', 'tests/common/riscv.yaml']) == 0
+    assert run_app(['mcdecoder', 'check', '--engine', 'table', '--input',
+                    'ex xd 48 00', 'tests/common/arm.yaml']) == 0
+    assert run_app(['mcdecoder', 'emulate', '--first-match', '--input',
+                    '00 00 00 01', 'tests/common/priority.yaml']) == 0
+
+
 def test_run_app_check() -> None:
     assert run_app(['mcdecoder', 'check', '--input',
                     'ex xd 48 00', 'tests/common/arm.yaml']) == 0
@@ -94,3 +149,33 @@ def test_run_app_check() -> None:
                     '111x x001 0010 1101 0100 1000 0000 000x', '--base', '2', 'tests/common/arm.yaml']) == 0
     assert run_app(['mcdecoder', 'check', '--input',
                     'ex xd 48 00', '--base', '16', 'tests/common/arm.yaml']) == 0
+    assert run_app(['mcdecoder', 'check', '--jobs', '2', '--input',
+                    'ex xd 48 00', 'tests/common/arm.yaml']) == 0
+    assert run_app(['mcdecoder', 'check', '--symbolic', '--input',
+                    'xxxxxxxx', 'tests/common/arm.yaml']) == 0
+    for jobs in ['0', '-1', 'x']:
+        assert run_app(['mcdecoder', 'check', '--jobs', jobs, '--input', 'ex xd 48 00', 'tests/common/arm.yaml']) == 2
+
+
+def test_run_app_check_progress() -> None:
+    assert run_app(['mcdecoder', 'check', '--progress', '--input', 'ex xd 48 00', 'tests/common/arm.yaml']) == 0
+
+
+def test_run_app_check_checkpoint(tmp_path) -> None:
+    assert run_app(['mcdecoder', 'check', '--checkpoint', str(tmp_path / 'check.ckpt'), '--resume', '--input',
+                    'ex xd 48 00', 'tests/common/arm.yaml']) == 0
+    assert run_app(['mcdecoder', 'check', '--resume', '--input', 'ex xd 48 00', 'tests/common/arm.yaml']) == 2
+
+
+def _imported_heavy_modules(argv: List[str]) -> List[str]:
+    """Run mcdecoder in a new process and return the heavy third-party modules imported by it"""
+    script = textwrap.dedent(f'''\
+        import sys
+        from mcdecoder.app import run_app
+        run_app({argv!r})
+        heavy_modules = ['jinja2', 'jsonschema', 'lark', 'numpy']
+        print(','.join(module for module in heavy_modules if module in sys.modules))
+        ''')
+    result = subprocess.run([sys.executable, '-c', script], stdout=subprocess.PIPE, check=True, text=True)
+    last_line = result.stdout.splitlines()[-1] if result.stdout else ''
+    return [module for module in last_line.split(',') if module != '']
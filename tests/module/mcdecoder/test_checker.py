@@ -1,4 +1,11 @@
-from mcdecoder.checker import _VEC_SIZE, _check, check
+import os
+import shutil
+from typing import Any
+
+import pytest
+
+from mcdecoder import checker, core
+from mcdecoder.checker import _VEC_SIZE, CheckpointError, CheckProgress, _check, check, output_progress
 
 
 def test_check() -> None:
@@ -263,6 +270,217 @@ def test__check_duplicate() -> None:
             'duplicate_instruction_2'] in result2.duplicate_instruction_pairs
 
 
+@pytest.mark.parametrize('engine', ['tree', 'lut', 'table'])
+def test__check_engine(engine: Any) -> None:
+    for mcfile, bit_pattern, vec_size in [('tests/common/duplicate_instructions.yaml', 'ex xd 48 00', _VEC_SIZE),
+                                          ('tests/common/duplicate_instructions_2pair.yaml', '00xx', 16),
+                                          ('tests/common/complex_condition.yaml', 'xx 00 00 0x', _VEC_SIZE),
+                                          ('tests/common/riscv.yaml', 'xxxx 0000', _VEC_SIZE)]:
+        linear_errors = []
+        linear_result = _check(mcfile, bit_pattern, 16, vec_size, lambda error: linear_errors.extend(error))
+        engine_errors = []
+        engine_result = _check(mcfile, bit_pattern, 16, vec_size, lambda error: engine_errors.extend(error), engine=engine)
+        assert engine_result == linear_result
+        assert engine_errors == linear_errors
+
+
+@pytest.mark.parametrize('jobs', [2, 3])
+def test__check_jobs(jobs: int) -> None:
+    # Error ranges and duplicate instructions across shards are the same as checking in one process
+    for mcfile, bit_pattern, vec_size in [('tests/common/duplicate_instructions.yaml', 'ex xd 48 00', _VEC_SIZE),
+                                          ('tests/common/duplicate_instructions_2pair.yaml', '00xx', 16),
+                                          ('tests/common/arm.yaml', 'ex xd 48 00', 4),
+                                          ('tests/common/complex_condition.yaml', 'xx 00 00 0x', 64)]:
+        serial_errors = []
+        serial_result = _check(mcfile, bit_pattern, 16, vec_size, lambda error: serial_errors.append(error))
+        parallel_errors = []
+        parallel_result = _check(mcfile, bit_pattern, 16, vec_size, lambda error: parallel_errors.append(error), jobs=jobs)
+        assert parallel_result == serial_result
+        assert parallel_errors == serial_errors
+
+
+def test__check_symbolic() -> None:
+    # Error ranges and duplicate instructions are the same as testing all the bit patterns
+    for mcfile, bit_pattern in [('tests/common/arm.yaml', 'xx xx 48 0x'),
+                                ('tests/common/duplicate_instructions.yaml', 'ex xd 48 00'),
+                                ('tests/common/duplicate_instructions_2pair.yaml', '00xx'),
+                                ('tests/common/complex_condition.yaml', 'xx 00 00 0x'),
+                                ('tests/common/primitive_condition.yaml', 'xxxxx000'),
+                                ('tests/common/riscv.yaml', 'xxxx 0000'),
+                                ('tests/common/mixed_instruction_lengths.yaml', 'xxxxx000'),
+                                ('tests/common/shared_conditions.yaml', 'xxxx0x00')]:
+        errors = []
+        result = _check(mcfile, bit_pattern, 16, _VEC_SIZE, lambda error: errors.extend(error))
+        symbolic_errors = []
+        symbolic_result = _check(mcfile, bit_pattern, 16, _VEC_SIZE, lambda error: symbolic_errors.extend(error),
+                                 symbolic=True)
+        assert symbolic_result == result
+        assert sorted(symbolic_errors, key=lambda error: (error.bits_start, error.type)) == \
+            sorted(errors, key=lambda error: (error.bits_start, error.type))
+
+    # The full 32-bit space is checked without testing all the bit patterns
+    result = _check('tests/common/arm.yaml', 'xxxxxxxx', 16, _VEC_SIZE, lambda error: None, symbolic=True)
+    assert result.no_error_count + result.undefined_error_count + result.duplicate_error_count == 1 << 32
+
+
+def test__check_unreachable_chunks(monkeypatch) -> None:
+    with monkeypatch.context() as m:
+        m.setattr(checker, '_has_reachable_instructions', lambda context, step_start, step_end: True)
+        expected_errors = []
+        expected_result = _check('tests/common/arm.yaml', 'xx xd 48 0x', 16, 64, lambda error: expected_errors.append(error))
+
+    # Record the chunks matched
+    matched_chunk_count = 0
+    find_matched_instructions_sparse = core.find_matched_instructions_sparse
+
+    def record_find_matched_instructions_sparse(*args: Any) -> core.InstructionMatchResult:
+        nonlocal matched_chunk_count
+        matched_chunk_count += 1
+        return find_matched_instructions_sparse(*args)
+    monkeypatch.setattr(core, 'find_matched_instructions_sparse', record_find_matched_instructions_sparse)
+
+    # Chunks no instructions can reach are not matched and the result is the same as matching them
+    errors = []
+    result = _check('tests/common/arm.yaml', 'xx xd 48 0x', 16, 64, lambda error: errors.append(error))
+    assert result == expected_result
+    assert errors == expected_errors
+    assert 0 < matched_chunk_count < (1 << 16) // 64
+
+
+class _Preempted(Exception):
+    pass
+
+
+def test__check_invalid_jobs() -> None:
+    for jobs in [0, -1]:
+        with pytest.raises(ValueError):
+            _check('tests/common/arm.yaml', 'ex xd 48 00', 16, 64, lambda error: None, jobs=jobs)
+
+
+def test__check_resume_without_checkpoint() -> None:
+    with pytest.raises(ValueError):
+        _check('tests/common/arm.yaml', 'ex xd 48 00', 16, 64, lambda error: None, resume=True)
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test__check_checkpoint(tmp_path, monkeypatch, jobs: int) -> None:
+    monkeypatch.setattr(checker, '_CHECKPOINT_INTERVAL', 0.0)
+    checkpoint_file = str(tmp_path / 'check.ckpt')
+    expected_errors = []
+    expected_result = _check('tests/common/arm.yaml', 'xx xd 48 0x', 16, 64, lambda error: expected_errors.append(error))
+
+    # Preempt checking while reporting errors
+    errors = []
+
+    def preempt_callback(error: Any) -> None:
+        if len(errors) == 3:
+            raise _Preempted()
+        errors.append(error)
+    with pytest.raises(_Preempted):
+        _check('tests/common/arm.yaml', 'xx xd 48 0x', 16, 64, preempt_callback, jobs=jobs,
+               checkpoint_file=checkpoint_file)
+    assert os.path.exists(checkpoint_file)
+
+    # Resumed checking reports the errors left and the same result as checking at once
+    result = _check('tests/common/arm.yaml', 'xx xd 48 0x', 16, 64, lambda error: errors.append(error), jobs=jobs,
+                    checkpoint_file=checkpoint_file, resume=True)
+    assert result == expected_result
+    assert errors == expected_errors
+    assert not os.path.exists(checkpoint_file)
+
+    # Checking without a checkpoint file starts from the beginning
+    result = _check('tests/common/arm.yaml', 'xx xd 48 0x', 16, 64, lambda error: None, checkpoint_file=checkpoint_file,
+                    resume=True)
+    assert result == expected_result
+
+
+def test__check_checkpoint_changed(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(checker, '_CHECKPOINT_INTERVAL', 0.0)
+    checkpoint_file = str(tmp_path / 'check.ckpt')
+    mcfile = str(tmp_path / 'mc.yaml')
+    shutil.copyfile('tests/common/duplicate_instructions_2pair.yaml', mcfile)
+
+    def preempt_callback(error: Any) -> None:
+        raise _Preempted()
+    with pytest.raises(_Preempted):
+        _check(mcfile, '00xx', 16, 16, preempt_callback, checkpoint_file=checkpoint_file)
+
+    # Checking refuses to resume for another bit pattern
+    with pytest.raises(CheckpointError):
+        _check(mcfile, '0xx0', 16, 16, lambda error: None, checkpoint_file=checkpoint_file, resume=True)
+
+    # Checking refuses to resume for a changed MC description
+    with open(mcfile) as file:
+        mc_desc = file.read()
+    with open(mcfile, 'w') as file:
+        file.write(mc_desc.replace('xxxx', '0xxx', 1))
+    with pytest.raises(CheckpointError):
+        _check(mcfile, '00xx', 16, 16, lambda error: None, checkpoint_file=checkpoint_file, resume=True)
+    assert check(mcfile, '00xx', checkpoint_file=checkpoint_file, resume=True) == 1
+
+    # Changes not affecting the result of checking are allowed
+    with open(mcfile, 'w') as file:
+        file.write('# Comment\n' + mc_desc)
+    _check(mcfile, '00xx', 16, 16, lambda error: None, checkpoint_file=checkpoint_file, resume=True)
+    assert not os.path.exists(checkpoint_file)
+
+
+def test_check_progress(capsys) -> None:
+    progresses = []
+    assert check('tests/common/arm.yaml', 'ex xd 48 00', progress_callback=lambda progress: progresses.append(progress),
+                 progress_interval=0.0) == 0
+    assert [progress.checked_count for progress in progresses] == [256]
+    assert progresses[0].total_count == 256
+    assert progresses[0].remaining_time == 0
+
+    output_progress(CheckProgress(checked_count=1 << 30, total_count=1 << 32, elapsed_time=60.0, speed=1 << 20,
+                                  remaining_time=3 * 1024.0, memory_usage=100 << 20))
+    output_progress(CheckProgress(checked_count=0, total_count=1 << 32, elapsed_time=0.0, speed=0.0,
+                                  remaining_time=None, memory_usage=None))
+    assert capsys.readouterr().out.splitlines()[-2:] == [
+        'Progress: 25.0% (1,073,741,824 / 4,294,967,296), 1,048,576 bit patterns/s, ETA 0:51:12, memory 100.0 MiB',
+        'Progress: 0.0% (0 / 4,294,967,296), 0 bit patterns/s, ETA --:--:--, memory unknown',
+    ]
+
+
+def test__check_progress(tmp_path, monkeypatch) -> None:
+    # Progress is reported for each chunk with no interval
+    progresses = []
+    _check('tests/common/arm.yaml', 'xx xd 48 0x', 16, 64, lambda error: None,
+           progress_callback=lambda progress: progresses.append(progress), progress_interval=0.0)
+    assert [progress.checked_count for progress in progresses] == list(range(64, 65536 + 1, 64))
+    assert all(progress.total_count == 65536 for progress in progresses)
+    assert all(progress.memory_usage is None or progress.memory_usage > 0 for progress in progresses)
+
+    # The default interval is _PROGRESS_INTERVAL
+    monkeypatch.setattr(checker, '_PROGRESS_INTERVAL', 0.0)
+    progresses = []
+    _check('tests/common/arm.yaml', 'xx xd 48 0x', 16, 64, lambda error: None,
+           progress_callback=lambda progress: progresses.append(progress))
+    assert len(progresses) == 65536 // 64
+
+    # Progress is reported only after checking done with a long interval
+    progresses = []
+    _check('tests/common/arm.yaml', 'xx xd 48 0x', 16, 64, lambda error: None,
+           progress_callback=lambda progress: progresses.append(progress), progress_interval=3600.0)
+    assert [progress.checked_count for progress in progresses] == [65536]
+
+    # Progress after resuming includes the checked bit patterns in a checkpoint
+    monkeypatch.setattr(checker, '_CHECKPOINT_INTERVAL', 0.0)
+    checkpoint_file = str(tmp_path / 'check.ckpt')
+
+    def preempt_callback(error: Any) -> None:
+        raise _Preempted()
+    with pytest.raises(_Preempted):
+        _check('tests/common/arm.yaml', 'xx xd 48 0x', 16, 64, preempt_callback, checkpoint_file=checkpoint_file)
+    progresses = []
+    _check('tests/common/arm.yaml', 'xx xd 48 0x', 16, 64, lambda error: None, checkpoint_file=checkpoint_file,
+           resume=True, progress_callback=lambda progress: progresses.append(progress), progress_interval=0.0)
+    step_start = progresses[0].checked_count - 64
+    assert step_start > 0
+    assert [progress.checked_count for progress in progresses] == list(range(step_start + 64, 65536 + 1, 64))
+
+
 def test__check_with_small_vec_size() -> None:
     # A duplicate error range is not split into two checking batches
     # and the next duplicate error range is in the next checking batch
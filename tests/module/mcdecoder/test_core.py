@@ -1,8 +1,21 @@
+import importlib.resources
+import os
+import pickle
+import shutil
+from dataclasses import replace
+from typing import Any, cast
+
+import jsonschema
+import numpy as np
 import pytest
+import yaml
 
+from mcdecoder import core
 from mcdecoder.core import (
     AndIdCondition,
+    DecodeCache,
     DecodeContext,
+    DecodeContextVectorized,
     EqualityIdCondition,
     FieldIdConditionObject,
     FunctionIdConditionObject,
@@ -11,9 +24,24 @@ from mcdecoder.core import (
     InRangeIdCondition,
     LoadError,
     OrIdCondition,
+    _GRAMMAR_FILES_AND_STARTS,
+    _PARSER_TABLES_FILE_EXTENSION,
+    _create_parser,
+    _find_common_bits,
+    _get_mc_desc_validator,
+    _make_parser_tables_header,
+    _setbit_count,
+    _YamlLoader,
+    clear_model_cache,
     create_mcdecoder_model,
+    decode_buffer,
+    decode_instructions_vectorized,
     decode_instruction,
     find_matched_instructions,
+    find_matched_instructions_sparse,
+    find_matched_instructions_vectorized,
+    linear_sweep,
+    load_and_parse_mc_description,
     load_mc_description,
 )
 
@@ -682,6 +710,69 @@ def test_create_mcdecoder_model_decision_tree_code16x2() -> None:
     assert node0101_ab.instructions[0].name == 'instruction0101_ab'
 
 
+def test_create_mcdecoder_model_cache(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv('MCDECODER_CACHE_DIR', str(tmp_path / 'cache'))
+    shutil.copyfile('tests/common/arm.yaml', tmp_path / 'arm.yaml')
+    mcfile = str(tmp_path / 'arm.yaml')
+
+    # Cold load stores the model
+    mcdecoder1 = create_mcdecoder_model(mcfile, use_cache=True)
+    assert len(os.listdir(tmp_path / 'cache')) == 1
+
+    # Warm load restores the same model
+    mcdecoder2 = create_mcdecoder_model(mcfile, use_cache=True)
+    assert mcdecoder2 == mcdecoder1
+    assert mcdecoder2 is not mcdecoder1
+
+    # Changing the MC description invalidates the cached model
+    with open(mcfile, 'r') as file:
+        mc_desc_text = file.read()
+    with open(mcfile, 'w') as file:
+        file.write(mc_desc_text.replace('push_1', 'push_2'))
+    mcdecoder3 = create_mcdecoder_model(mcfile, use_cache=True)
+    assert mcdecoder3.instructions[1].name == 'push_2'
+
+    # Clearing the cache removes the cached model
+    clear_model_cache()
+    assert len(os.listdir(tmp_path / 'cache')) == 0
+
+
+def test_create_mcdecoder_model_cache_include(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv('MCDECODER_CACHE_DIR', str(tmp_path / 'cache'))
+    shutil.copytree('tests/common/include', tmp_path / 'include')
+    mcfile = str(tmp_path / 'include' / 'include.yaml')
+
+    mcdecoder1 = create_mcdecoder_model(mcfile, use_cache=True)
+    assert mcdecoder1.extras['included_sequence'] == [1, 2, 3, 4]
+
+    # Adding a file matched with !include invalidates the cached model
+    with open(tmp_path / 'include' / 'children' / 'child_sequence3.yaml', 'w') as file:
+        file.write('- 5\n')
+    mcdecoder2 = create_mcdecoder_model(mcfile, use_cache=True)
+    assert mcdecoder2.extras['included_sequence'] == [1, 2, 3, 4, 5]
+
+    # Changing an included file invalidates the cached model
+    with open(tmp_path / 'include' / 'children' / 'child_mapping1.yaml', 'w') as file:
+        file.write('a: 10\nb: 2\n')
+    mcdecoder3 = create_mcdecoder_model(mcfile, use_cache=True)
+    assert mcdecoder3.extras['included_mapping']['a'] == 10
+
+
+def test_create_mcdecoder_model_cache_config(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv('MCDECODER_CACHE_DIR', str(tmp_path / 'cache'))
+    shutil.copytree('tests/common/process_instruction_hook_with_config', tmp_path / 'hook')
+    mcfile = str(tmp_path / 'hook' / 'process_instruction_hook.yaml')
+
+    mcdecoder1 = create_mcdecoder_model(mcfile, use_cache=True)
+    assert mcdecoder1.instructions[0].extras['extra_attribute'] == 'extra_content'
+
+    # Changing config.py invalidates the cached model
+    with open(tmp_path / 'hook' / 'config.py', 'a') as file:
+        file.write("    instruction.extras['extra_attribute'] = 'changed_content'\n")
+    mcdecoder2 = create_mcdecoder_model(mcfile, use_cache=True)
+    assert mcdecoder2.instructions[0].extras['extra_attribute'] == 'changed_content'
+
+
 def test_load_mc_description_include() -> None:
     mc_desc = load_mc_description('tests/common/include/include.yaml')
 
@@ -705,6 +796,75 @@ def test_load_mc_description_include() -> None:
     assert included_scalar[1] == 2
 
 
+def test_load_mc_description_yaml_loader() -> None:
+    # LibYAML-backed loader is used if available
+    if yaml.__with_libyaml__:
+        assert issubclass(_YamlLoader, yaml.CSafeLoader)
+    else:
+        assert issubclass(_YamlLoader, yaml.SafeLoader)
+
+
+def test_load_and_parse_mc_description() -> None:
+    mc_desc, parsed_instructions = load_and_parse_mc_description('tests/common/arm.yaml')
+    assert len(parsed_instructions) == len(mc_desc['instructions']) == 2
+
+    parsed_add, parsed_push = parsed_instructions
+    assert parsed_add.instruction is mc_desc['instructions'][0]
+    assert len(parsed_add.encoding.elements) == 1
+    assert parsed_add.match_condition is None
+    assert parsed_add.unmatch_condition is not None
+
+    assert parsed_push.match_condition is not None
+    assert parsed_push.unmatch_condition is None
+
+    # Identical formats and conditions are parsed only once
+    _, parsed_instructions2 = load_and_parse_mc_description('tests/common/arm.yaml')
+    assert parsed_instructions2[0].encoding is parsed_add.encoding
+    assert parsed_instructions2[1].match_condition is parsed_push.match_condition
+
+
+def test_load_mc_description_schema_error(tmp_path) -> None:
+    mcfile = tmp_path / 'no_instructions.yaml'
+    mcfile.write_text("machine:\n  byteorder: little\n")
+
+    with pytest.raises(jsonschema.ValidationError):
+        load_mc_description(str(mcfile))
+
+    # The validator is created only once
+    assert _get_mc_desc_validator() is _get_mc_desc_validator()
+
+
+def test_load_mc_description_trusted(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv('MCDECODER_CACHE_DIR', str(tmp_path / 'cache'))
+    shutil.copytree('tests/common/include', tmp_path / 'include')
+    mcfile = str(tmp_path / 'include' / 'include.yaml')
+
+    # First trusted load validates the MC description and records its content hash
+    mc_desc = load_mc_description(mcfile, trusted=True)
+    assert len(os.listdir(tmp_path / 'cache')) == 1
+
+    def fail_validation(mc_desc) -> None:
+        raise jsonschema.ValidationError('validated')
+    monkeypatch.setattr(core, '_validate_mc_desc_for_schema', fail_validation)
+
+    # Next trusted load skips validation
+    assert load_mc_description(mcfile, trusted=True) == mc_desc
+
+    # Untrusted load always validates
+    with pytest.raises(jsonschema.ValidationError):
+        load_mc_description(mcfile)
+
+    # Changing an included file requires validation again
+    included_file = tmp_path / 'include' / 'children' / 'child_sequence1.yaml'
+    included_file.write_text('- 3\n')
+    with pytest.raises(jsonschema.ValidationError):
+        load_mc_description(mcfile, trusted=True)
+
+    # Clearing the cache removes the records
+    clear_model_cache()
+    assert len(os.listdir(tmp_path / 'cache')) == 0
+
+
 def test_load_mc_description_include_arg_not_scalar() -> None:
     with pytest.raises(LoadError):
         load_mc_description('tests/common/include_arg_not_scalar.yaml')
@@ -781,6 +941,560 @@ def test_decode_instruction() -> None:
     assert result.fields[3].value == 0x1
 
 
+def test_create_mcdecoder_model_instruction_table(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv('MCDECODER_CACHE_DIR', str(tmp_path))
+    mcdecoder_model = create_mcdecoder_model('tests/common/arm_thumb.yaml')
+
+    # The table holds the attributes of instructions
+    instruction_table = mcdecoder_model._instruction_table
+    assert instruction_table is not None
+    assert list(instruction_table.instruction_vec) == mcdecoder_model.instructions
+    assert list(instruction_table.fixed_bit_mask_vec) == [
+        instruction.fixed_bit_mask for instruction in mcdecoder_model.instructions]
+    assert list(instruction_table.fixed_bits_vec) == [
+        instruction.fixed_bits for instruction in mcdecoder_model.instructions]
+    assert len(instruction_table.field_instruction_index_vec) == sum(
+        len(instruction.fields) for instruction in mcdecoder_model.instructions)
+
+    # The table is immutable
+    with pytest.raises(ValueError):
+        instruction_table.fixed_bits_vec[0] = 0
+
+    # The table is still immutable after restored from the model cache
+    create_mcdecoder_model('tests/common/arm_thumb.yaml', use_cache=True)
+    cached_model = create_mcdecoder_model('tests/common/arm_thumb.yaml', use_cache=True)
+    assert cached_model._instruction_table is not None
+    assert not cached_model._instruction_table.fixed_bits_vec.flags.writeable
+
+    # The table is created on first use if a model doesn't have it
+    mcdecoder_model._instruction_table = None
+    context = DecodeContext(mcdecoder=mcdecoder_model, code16x1=0xe92d, code16x2=0xe92d4000, code32x1=0xe92d4000)
+    assert [instruction.name for instruction in find_matched_instructions(context)] == ['push_1']
+    assert mcdecoder_model._instruction_table is not None
+
+
+@pytest.mark.parametrize('mcfile', [
+    'tests/common/arm_thumb.yaml',
+    'tests/common/complex_condition.yaml',
+    'tests/common/decision_tree_code16x2.yaml',
+    'tests/common/decision_tree_code32x1.yaml',
+    'tests/common/duplicate_instructions.yaml',
+    'tests/common/riscv.yaml',
+])
+@pytest.mark.parametrize('engine', ['tree', 'table'])
+def test_find_matched_instructions_engine(mcfile: str, engine: Any) -> None:
+    mcdecoder_model = create_mcdecoder_model(mcfile)
+
+    # Random codes and codes satisfying the fixed bits of instructions
+    rng = np.random.default_rng(0)
+    code_vec = rng.integers(0, 1 << 32, 4096, dtype=np.int64)
+    instruction_vec = rng.integers(0, len(mcdecoder_model.instructions), 4096)
+    fixed_bit_mask_vec = np.array([instruction.fixed_bit_mask for instruction in mcdecoder_model.instructions])
+    fixed_bits_vec = np.array([instruction.fixed_bits for instruction in mcdecoder_model.instructions])
+    code_vec = np.concatenate(
+        [code_vec, (code_vec & ~fixed_bit_mask_vec[instruction_vec]) | fixed_bits_vec[instruction_vec]])
+
+    # The engine finds the same instructions as the linear engine
+    context_vectorized = DecodeContextVectorized(
+        mcdecoder=mcdecoder_model, code16x1_vec=code_vec >> 16, code16x2_vec=code_vec, code32x1_vec=code_vec)
+    test_mat = find_matched_instructions_vectorized(context_vectorized, engine)
+    assert np.array_equal(test_mat, find_matched_instructions_vectorized(context_vectorized, 'linear'))
+    assert test_mat.any()
+
+    for code in code_vec[-256:].tolist():
+        context = DecodeContext(mcdecoder=mcdecoder_model, code16x1=code >> 16, code16x2=code, code32x1=code)
+        assert find_matched_instructions(context, engine) == find_matched_instructions(context, 'linear')
+
+
+@pytest.mark.parametrize('mcfile', [
+    'tests/common/complex_condition.yaml',
+    'tests/common/primitive_condition.yaml',
+])
+def test_create_mcdecoder_model_condition_programs(mcfile: str) -> None:
+    mcdecoder_model = create_mcdecoder_model(mcfile)
+    instruction_table = mcdecoder_model._instruction_table
+    assert instruction_table is not None
+
+    # Programs of the conditions of instructions and their atoms
+    instruction_programs = [condition_program for _, _, _, _, condition_program in instruction_table.priority_instructions
+                            if condition_program is not None]
+    atom_programs = [atom_program for _, atom_program in instruction_table.condition_atoms]
+    assert len(instruction_programs) == len(mcdecoder_model.instructions)
+    assert len(atom_programs) > 0
+
+    code_vec = np.arange(0, 1 << 32, 1 << 20, dtype=np.int64)
+    for condition_program in instruction_programs + atom_programs:
+        # Each field is decoded only once in each of the functions test and test_vectorized
+        assigned_variables = [line.split(' = ')[0] for line in condition_program.source.splitlines() if ' = ' in line]
+        assert len(assigned_variables) == 2 * len(set(assigned_variables))
+
+        # Scalar and vectorized results are the same
+        test_vec = condition_program.test_vectorized(code_vec)
+        assert [condition_program.test(code) for code in code_vec.tolist()] == list(test_vec)
+
+        # Compiled functions are not pickled but compiled again
+        unpickled_program = pickle.loads(pickle.dumps(condition_program))
+        assert unpickled_program._test_vectorized is None
+        assert np.array_equal(unpickled_program.test_vectorized(code_vec), test_vec)
+
+
+@pytest.mark.parametrize('engine', ['linear', 'tree'])
+@pytest.mark.parametrize('mcfile', [
+    'tests/common/arm.yaml',
+    'tests/common/complex_condition.yaml',
+    'tests/common/duplicate_instructions.yaml',
+    'tests/common/mixed_instruction_lengths.yaml',
+])
+def test_find_matched_instructions_sparse(mcfile: str, engine: Any) -> None:
+    mcdecoder_model = create_mcdecoder_model(mcfile)
+    code_vec = np.arange(0, 1 << 32, 1 << 18, dtype=np.int64)
+    context = DecodeContextVectorized(mcdecoder=mcdecoder_model, code16x1_vec=code_vec >> 16,
+                                      code16x2_vec=code_vec, code32x1_vec=code_vec)
+    test_mat = find_matched_instructions_vectorized(context, engine)
+
+    # Sparse results hold the same matches as a dense matrix
+    match_result = find_matched_instructions_sparse(context, engine)
+    assert match_result.row_offset_vec.shape == (code_vec.shape[0] + 1,)
+    assert match_result.instruction_index_vec.shape == (np.count_nonzero(test_mat),)
+    for row, test_vec in enumerate(test_mat):
+        start, end = match_result.row_offset_vec[row:row + 2]
+        assert list(match_result.instruction_index_vec[start:end]) == list(np.flatnonzero(test_vec))
+
+    assert np.array_equal(match_result.matched_count_vec, np.sum(test_mat, axis=1))
+    assert np.array_equal(match_result.first_instruction_index_vec,
+                          np.where(test_mat.any(axis=1), np.argmax(test_mat, axis=1), -1))
+
+
+def test_create_mcdecoder_model_priority() -> None:
+    mcdecoder_model = create_mcdecoder_model('tests/common/priority.yaml')
+    assert [instruction.priority for instruction in mcdecoder_model.instructions] == [0, 1, 0, 1, 2, -1]
+
+    # Decision trees are made for each priority in descending order and numbered uniquely for each encoding form
+    assert [(tree.priority, tree.encoding_element_bit_length, tree.length_of_encoding_elements)
+            for tree in mcdecoder_model.decision_trees] == [(2, 32, 1), (1, 16, 1), (0, 16, 1), (-1, 32, 1)]
+    node_indexes = [(tree.encoding_element_bit_length, node.index)
+                    for tree in mcdecoder_model.decision_trees for node in tree.root_node.all_nodes]
+    assert len(set(node_indexes)) == len(node_indexes)
+
+
+@pytest.mark.parametrize('engine', ['linear', 'tree', 'lut', 'table'])
+def test_find_matched_instructions_first_match(engine: Any) -> None:
+    mcdecoder_model = create_mcdecoder_model('tests/common/priority.yaml')
+    for code, expected_names in [
+        (0x0000_0001, ['wide_32bit']),
+        (0x0000_0000, ['zero_16bit']),
+        (0x0105_0000, ['small_imm_16bit']),
+        (0x0120_0000, ['general_16bit']),
+    ]:
+        context = DecodeContext(mcdecoder=mcdecoder_model, code16x1=code >> 16, code16x2=code, code32x1=code)
+        assert [instruction.name for instruction in find_matched_instructions(context, engine, first_match=True)] == \
+            expected_names
+        assert len(find_matched_instructions(context, engine)) > 1
+
+    # Vectorized codes find the same instructions
+    code_vec = np.concatenate([np.arange(0, 1 << 20, 1 << 4), np.arange(0, 1 << 32, 1 << 20)]).astype(np.int64)
+    context_vectorized = DecodeContextVectorized(
+        mcdecoder=mcdecoder_model, code16x1_vec=code_vec >> 16, code16x2_vec=code_vec, code32x1_vec=code_vec)
+    match_result = find_matched_instructions_sparse(context_vectorized, engine, first_match=True)
+    test_mat = find_matched_instructions_vectorized(context_vectorized, engine, first_match=True)
+    assert np.array_equal(match_result.matched_count_vec, np.ones(code_vec.shape[0]))
+    assert np.array_equal(np.argmax(test_mat, axis=1), match_result.first_instruction_index_vec)
+    for code, instruction_index in zip(code_vec[::61].tolist(), match_result.first_instruction_index_vec[::61]):
+        context = DecodeContext(mcdecoder=mcdecoder_model, code16x1=code >> 16, code16x2=code, code32x1=code)
+        assert find_matched_instructions(context, engine, first_match=True) == \
+            [mcdecoder_model.instructions[instruction_index]]
+
+
+def test_decode_cache() -> None:
+    mcdecoder_model = create_mcdecoder_model('tests/common/arm.yaml')
+    cache = DecodeCache(maxsize=2)
+
+    def decode(code: int) -> Any:
+        context = DecodeContext(mcdecoder=mcdecoder_model, code16x1=code >> 16, code16x2=code, code32x1=code, cache=cache)
+        return [decode_instruction(context, instruction) for instruction in find_matched_instructions(context, 'tree')]
+
+    # Results are the same as uncached ones
+    push_results = decode(0xe92d4800)
+    assert [result.decoder.name for result in push_results] == ['push_1']
+    assert (cache.hits, cache.misses, cache.evictions, cache.currsize) == (0, 2, 0, 1)
+    assert decode(0xe92d4800) == push_results
+    assert (cache.hits, cache.misses, cache.evictions, cache.currsize) == (2, 2, 0, 1)
+
+    # Least recently used codes are evicted
+    decode(0xe92d4000)
+    decode(0xe92d4800)
+    decode(0xe92d0001)
+    assert (cache.evictions, cache.currsize) == (1, 2)
+    misses = cache.misses
+    decode(0xe92d4800)
+    assert cache.misses == misses
+
+    cache.clear()
+    assert (cache.hits, cache.misses, cache.evictions, cache.currsize) == (0, 0, 0, 0)
+
+    # A cache is bound to one McDecoder
+    decode(0xe92d4800)
+    with pytest.raises(ValueError):
+        find_matched_instructions(DecodeContext(mcdecoder=create_mcdecoder_model('tests/common/arm.yaml'), code16x1=0,
+                                                code16x2=0, code32x1=0, cache=cache))
+
+    with pytest.raises(ValueError):
+        DecodeCache(maxsize=0)
+
+
+@pytest.mark.parametrize('first_match', [False, True])
+def test_decode_cache_vectorized(first_match: bool) -> None:
+    mcdecoder_model = create_mcdecoder_model('tests/common/priority.yaml')
+    rng = np.random.default_rng(0)
+    code_vec = rng.integers(0, 1 << 18, 4096, dtype=np.int64)
+    code16x1_vec = code_vec >> 16
+    code16x1_vec[::2] = rng.integers(0, 4, 2048)
+    context = DecodeContextVectorized(
+        mcdecoder=mcdecoder_model, code16x1_vec=code16x1_vec, code16x2_vec=code_vec, code32x1_vec=code_vec)
+    expected_result = find_matched_instructions_sparse(context, 'tree', first_match)
+
+    # Duplicate codes are matched once and the same instructions are found
+    cache = DecodeCache()
+    context.cache = cache
+    match_result = find_matched_instructions_sparse(context, 'tree', first_match)
+    assert np.array_equal(match_result.row_offset_vec, expected_result.row_offset_vec)
+    assert np.array_equal(match_result.instruction_index_vec, expected_result.instruction_index_vec)
+    assert np.array_equal(find_matched_instructions_vectorized(context, 'tree', first_match),
+                          find_matched_instructions_vectorized(replace(context, cache=None), 'tree', first_match))
+
+    unique_count = np.unique(np.stack([code16x1_vec, code_vec], axis=1), axis=0).shape[0]
+    assert (cache.hits, cache.misses) == (2 * (4096 - unique_count), 2 * unique_count)
+
+
+def test_find_matched_instructions_vectorized_conditions_on_fixed_bits_passed(monkeypatch) -> None:
+    mcdecoder_model = create_mcdecoder_model('tests/common/primitive_condition.yaml')
+    instruction_table = core._get_instruction_table(mcdecoder_model)
+    code_vec = np.arange(0, 1 << 32, 1 << 20, dtype=np.int64)
+    context = DecodeContextVectorized(mcdecoder=mcdecoder_model, code16x1_vec=code_vec >> 16,
+                                      code16x2_vec=code_vec, code32x1_vec=code_vec)
+    expected_test_mat = find_matched_instructions_vectorized(context)
+
+    # Record the codes given to each condition atom with the program of the atom
+    tested_code_vecs = []
+    test_vectorized = core._ConditionProgram.test_vectorized
+
+    def record_test_vectorized(self, code_vec):
+        tested_code_vecs.append((self, code_vec))
+        return test_vectorized(self, code_vec)
+    monkeypatch.setattr(core._ConditionProgram, 'test_vectorized', record_test_vectorized)
+
+    # Conditions are tested only on codes passing the fixed bits test of the instructions having them
+    assert np.array_equal(find_matched_instructions_vectorized(context), expected_test_mat)
+    assert len(tested_code_vecs) > 0
+    code_form_mat = np.stack([code_vec >> 16, code_vec, code_vec], axis=1)
+    for atom_program, tested_code_vec in tested_code_vecs:
+        (a,) = [a for a, (_, program) in enumerate(instruction_table.condition_atoms) if program is atom_program]
+        code_form = instruction_table.condition_atoms[a][0]
+        fb_test_vec = np.zeros(code_vec.shape[0], dtype=bool)
+        for i, f in enumerate(instruction_table.instruction_formula_vec.tolist()):
+            if f >= 0 and a in instruction_table.condition_formula_atom_indexes[f]:
+                fb_test_vec |= (code_form_mat[:, code_form] & instruction_table.fixed_bit_mask_vec[i]) \
+                    == instruction_table.fixed_bits_vec[i]
+        assert np.array_equal(tested_code_vec, code_form_mat[fb_test_vec, code_form])
+
+    # Conditions are not tested at all if no codes pass the fixed bits test
+    tested_code_vecs.clear()
+    unmatched_code_vec = np.full(4, 0xffffffff, dtype=np.int64)
+    context = DecodeContextVectorized(mcdecoder=mcdecoder_model, code16x1_vec=unmatched_code_vec >> 16,
+                                      code16x2_vec=unmatched_code_vec, code32x1_vec=unmatched_code_vec)
+    assert not find_matched_instructions_vectorized(context).any()
+    assert tested_code_vecs == []
+
+
+def test_find_matched_instructions_sparse_shared_conditions() -> None:
+    mcdecoder_model = create_mcdecoder_model('tests/common/shared_conditions.yaml')
+    instruction_table = core._get_instruction_table(mcdecoder_model)
+
+    # Atoms and formulas are shared among instructions
+    assert len(instruction_table.condition_atoms) == 4
+    assert instruction_table.condition_formulas == [
+        ('not', ('atom', 0)), ('and', (('atom', 1), ('atom', 2))), ('or', (('atom', 0), ('atom', 3)))]
+    assert instruction_table.instruction_formula_vec.tolist() == [0, 0, 1, 2]
+    condition_program_dict = {i: condition_program for i, _, _, _, condition_program
+                              in instruction_table.priority_instructions}
+    assert condition_program_dict[0] is condition_program_dict[1]
+
+    # Each atom is evaluated once for a code and the results are the same as testing conditions one by one
+    code_vec = np.arange(0, 1 << 32, 1 << 16, dtype=np.uint32)
+    context = DecodeContextVectorized(mcdecoder=mcdecoder_model, code16x1_vec=code_vec >> 16,
+                                      code16x2_vec=code_vec, code32x1_vec=code_vec)
+    match_result = find_matched_instructions_sparse(context)
+    for row in range(0, code_vec.shape[0], 97):
+        code = int(code_vec[row])
+        expected_decoders = find_matched_instructions(
+            DecodeContext(mcdecoder=mcdecoder_model, code16x1=code >> 16, code16x2=code, code32x1=code))
+        assert [mcdecoder_model.instructions[i] for i in match_result.instruction_index_vec[
+            match_result.row_offset_vec[row]:match_result.row_offset_vec[row + 1]]] == expected_decoders
+
+    # cond == 15 is shared by add_register, sub_register and any_unconditional
+    code_count = code_vec.shape[0]
+    assert match_result.condition_evaluation_count == code_count * 2 + code_count // 4 * 2
+    assert match_result.saved_condition_evaluation_count == code_count // 16 * 2
+
+
+@pytest.mark.parametrize('engine', ['linear', 'tree', 'lut', 'table'])
+def test_find_matched_instructions_sparse_common_bits(engine: Any) -> None:
+    for mcfile, common_bits in [('tests/common/arm.yaml', 0xe92d0000), ('tests/common/arm_thumb.yaml', 0xb5000000),
+                                ('tests/common/complex_condition.yaml', 0x00000000)]:
+        mcdecoder_model = create_mcdecoder_model(mcfile)
+        code_vec = np.uint32(common_bits) | np.arange(1 << 16, dtype=np.uint32)
+        random_code_vec = np.random.default_rng(0).integers(0, 1 << 32, 1 << 10, dtype=np.uint64).astype(np.uint32)
+
+        # Instructions skipped by the bits common to codes are the same as ones unmatched with codes without them
+        def find_sparse(code_vec: np.ndarray) -> core.InstructionMatchResult:
+            return find_matched_instructions_sparse(DecodeContextVectorized(
+                mcdecoder=mcdecoder_model, code16x1_vec=code_vec >> 16, code16x2_vec=code_vec, code32x1_vec=code_vec),
+                engine)
+        match_result = find_sparse(code_vec)
+        mixed_match_result = find_sparse(np.concatenate([code_vec, random_code_vec]))
+        assert np.array_equal(match_result.row_offset_vec, mixed_match_result.row_offset_vec[:code_vec.shape[0] + 1])
+        assert np.array_equal(match_result.instruction_index_vec,
+                              mixed_match_result.instruction_index_vec[:match_result.row_offset_vec[-1]])
+
+
+def test_find_common_bits() -> None:
+    assert _find_common_bits(np.array([], dtype=np.uint32)) == (0, 0)
+    assert _find_common_bits(np.array([0xe92d4800], dtype=np.uint32)) == (0xffffffff, 0xe92d4800)
+    assert _find_common_bits(np.array([0xe92d4800, 0xe92d48ff, 0xe92d4810], dtype=np.uint32)) == (0xffffff00, 0xe92d4800)
+
+
+def test_setbit_count() -> None:
+    value_vec = np.concatenate([np.array([0, 1, 0xffffffff, 0x80000000, 0x55555555]),
+                                np.random.default_rng(0).integers(0, 1 << 32, 1024)])
+    count_vec = _setbit_count(value_vec)
+    assert count_vec.dtype == np.uint32
+    assert count_vec.tolist() == [bin(value).count('1') for value in value_vec.tolist()]
+
+
+@pytest.mark.parametrize('mcfile', [
+    'tests/common/duplicate_instructions_2pair.yaml',
+    'tests/common/mixed_instruction_lengths.yaml',
+    'tests/common/riscv.yaml',
+])
+def test_find_matched_instructions_lut_engine(tmp_path, monkeypatch, mcfile: str) -> None:
+    monkeypatch.setenv('MCDECODER_CACHE_DIR', str(tmp_path))
+    create_mcdecoder_model(mcfile, use_cache=True)
+
+    # A lookup table is precomputed and cached with a model
+    mcdecoder_model = create_mcdecoder_model(mcfile, use_cache=True)
+    assert mcdecoder_model._instruction_table is not None
+    assert mcdecoder_model._instruction_table.lut is not None
+    assert mcdecoder_model._instruction_table.lut.entry_vec.shape == (1 << 16,)
+    assert not mcdecoder_model._instruction_table.lut.entry_vec.flags.writeable
+
+    # The lut engine finds the same instructions as the linear engine for all the 16-bit codes
+    code16x1_vec = np.arange(1 << 16, dtype=np.int64)
+    code_vec = code16x1_vec << 16 | code16x1_vec
+    context_vectorized = DecodeContextVectorized(
+        mcdecoder=mcdecoder_model, code16x1_vec=code16x1_vec, code16x2_vec=code_vec, code32x1_vec=code_vec)
+    test_mat = find_matched_instructions_vectorized(context_vectorized, 'lut')
+    assert np.array_equal(test_mat, find_matched_instructions_vectorized(context_vectorized, 'linear'))
+    assert test_mat.any()
+
+    for code in code_vec[::97].tolist():
+        context = DecodeContext(mcdecoder=mcdecoder_model, code16x1=code >> 16, code16x2=code, code32x1=code)
+        assert find_matched_instructions(context, 'lut') == find_matched_instructions(context, 'linear')
+
+
+def test_create_mcdecoder_model_without_lut() -> None:
+    mcdecoder_model = create_mcdecoder_model('tests/common/arm.yaml')
+    assert mcdecoder_model._instruction_table is not None
+    assert mcdecoder_model._instruction_table.lut is None
+
+
+def test_create_mcdecoder_model_two_level_tables() -> None:
+    mcdecoder_model = create_mcdecoder_model('tests/common/decision_tree_code32x1.yaml')
+
+    # Two-level tables are created on first use
+    assert mcdecoder_model._instruction_table is not None
+    assert mcdecoder_model._instruction_table.two_level_tables is None
+
+    # The first level is indexed by the threshold bits of the root node lowering the max count of candidates
+    two_level_table, = mcdecoder_model.two_level_tables
+    assert two_level_table.index_mask & ~mcdecoder_model.decision_trees[0].root_node.mask == 0
+    assert two_level_table.index_bit_positions == [31, 30, 28]
+    assert len(two_level_table.candidates) == 1 << 3
+    assert [instruction.name for instruction in two_level_table.candidates[0b011]] == \
+        ['instruction0101_0001', 'instruction0101_0010', 'instruction0101_ab']
+    assert two_level_table.max_candidate_count == 3
+    assert mcdecoder_model._instruction_table.two_level_tables is not None
+
+
+def test_create_mcdecoder_model_table_memory_budget() -> None:
+    # Bits no longer lowering the max count of candidates are not added to the index
+    mcdecoder_model = create_mcdecoder_model('tests/common/complex_condition.yaml')
+    two_level_table, = mcdecoder_model.two_level_tables
+    assert len(two_level_table.index_bit_positions) == 2
+    assert two_level_table.max_candidate_count == 1
+
+    # Index bits scoring lower are dropped within the budget
+    budget_model = create_mcdecoder_model('tests/common/table_memory_budget.yaml')
+    budget_table, = budget_model.two_level_tables
+    assert len(budget_table.index_bit_positions) == 1
+    assert set(budget_table.index_bit_positions) <= set(two_level_table.index_bit_positions)
+    assert (len(budget_table.candidates) + 1 + sum(map(len, budget_table.candidates))) * 4 <= 32
+    assert budget_table.max_candidate_count == 2
+
+    code_vec = np.arange(1 << 16, dtype=np.int64) << 16 | 0x0003
+    context_vectorized = DecodeContextVectorized(
+        mcdecoder=budget_model, code16x1_vec=code_vec >> 16, code16x2_vec=code_vec, code32x1_vec=code_vec)
+    assert np.array_equal(find_matched_instructions_vectorized(context_vectorized, 'table'),
+                          find_matched_instructions_vectorized(context_vectorized, 'linear'))
+
+
+def test_find_matched_instructions_unknown_engine() -> None:
+    mcdecoder_model = create_mcdecoder_model('tests/common/arm.yaml')
+    context = DecodeContext(mcdecoder=mcdecoder_model, code16x1=0, code16x2=0, code32x1=0)
+    with pytest.raises(ValueError):
+        find_matched_instructions(context, cast(Any, 'unknown'))
+
+
+@pytest.mark.parametrize('mcfile', [
+    'tests/common/arm.yaml',
+    'tests/common/arm_thumb.yaml',
+    'tests/common/riscv.yaml',
+])
+def test_decode_instructions_vectorized(mcfile: str) -> None:
+    mcdecoder_model = create_mcdecoder_model(mcfile)
+    rng = np.random.default_rng(0)
+    code_vec = rng.integers(0, 1 << 32, 256, dtype=np.int64)
+    instruction_index_vec = rng.integers(-1, len(mcdecoder_model.instructions), 256)
+
+    context_vectorized = DecodeContextVectorized(
+        mcdecoder=mcdecoder_model, code16x1_vec=code_vec >> 16, code16x2_vec=code_vec, code32x1_vec=code_vec)
+    field_value_vecs = decode_instructions_vectorized(context_vectorized, instruction_index_vec)
+
+    # Values are the same as decode_instruction. -1 for fields instructions don't have
+    for n, (code, instruction_index) in enumerate(zip(code_vec.tolist(), instruction_index_vec.tolist())):
+        expected_values = {name: -1 for name in field_value_vecs}
+        if instruction_index >= 0:
+            context = DecodeContext(mcdecoder=mcdecoder_model, code16x1=code >> 16, code16x2=code, code32x1=code)
+            decode_result = decode_instruction(context, mcdecoder_model.instructions[instruction_index])
+            expected_values.update((field_result.decoder.name, field_result.value) for field_result in decode_result.fields)
+
+        assert {name: int(value_vec[n]) for name, value_vec in field_value_vecs.items()} == expected_values
+
+
+def test_decode_buffer() -> None:
+    mcdecoder_model = create_mcdecoder_model('tests/common/arm.yaml')
+
+    # push_1, unknown code and add_1 in little endian
+    buffer = bytes.fromhex('00482de9 ffffffff 012081e2')
+    result = decode_buffer(mcdecoder_model, buffer)
+    assert list(result.offset_vec) == [0, 4, 8]
+    assert list(result.instruction_index_vec) == [1, -1, 0]
+    assert list(result.matched_count_vec) == [1, 0, 1]
+    assert result.field_value_mat.tolist() == [[14, 18432, 0, 0, 0], [0, 0, 0, 0, 0], [14, 0, 1, 2, 1]]
+
+    # Same results for other buffer types and engines
+    for other_buffer in [bytearray(buffer), memoryview(buffer), np.frombuffer(buffer, dtype=np.uint32)]:
+        other_result = decode_buffer(mcdecoder_model, other_buffer, engine='tree')
+        assert np.array_equal(other_result.instruction_index_vec, result.instruction_index_vec)
+        assert np.array_equal(other_result.field_value_mat, result.field_value_mat)
+
+    # Decode at every 16-bit offset. Bytes beyond the end of a buffer are regarded as 0
+    result = decode_buffer(mcdecoder_model, buffer[2:], offset_step=2)
+    assert list(result.offset_vec) == [0, 2, 4, 6, 8]
+    assert list(result.instruction_index_vec) == [-1, -1, -1, 0, -1]
+
+    with pytest.raises(ValueError):
+        decode_buffer(mcdecoder_model, buffer, offset_step=3)
+
+
+def test_decode_buffer_priority() -> None:
+    mcdecoder_model = create_mcdecoder_model('tests/common/priority.yaml')
+    buffer = np.random.default_rng(0).integers(0, 4, 1 << 12, dtype=np.uint8).tobytes()
+
+    # The first matched instructions are the same as the ones a generated decoder finds in priority order
+    for engine in ['linear', 'tree']:
+        result = decode_buffer(mcdecoder_model, buffer, engine=engine)
+        code32x1_vec = np.frombuffer(buffer + b'\0\0', dtype='>u2').astype(np.uint32)
+        code32x1_vec = (code32x1_vec[:-1] << 16) | code32x1_vec[1:]
+        context = DecodeContextVectorized(mcdecoder=mcdecoder_model, code16x1_vec=code32x1_vec >> 16,
+                                          code16x2_vec=code32x1_vec, code32x1_vec=code32x1_vec)
+        match_result = find_matched_instructions_sparse(context, engine, first_match=True)
+        assert np.array_equal(result.instruction_index_vec, match_result.first_instruction_index_vec)
+        assert np.array_equal(result.matched_count_vec, find_matched_instructions_sparse(context, engine).matched_count_vec)
+
+    # wide_32bit with priority 2 is preferred to general_16bit and zero_16bit
+    result = decode_buffer(mcdecoder_model, bytes.fromhex('0001 0002'))
+    assert [mcdecoder_model.instructions[i].name for i in result.instruction_index_vec] == ['wide_32bit', 'zero_16bit']
+    assert result.matched_count_vec.tolist() == [4, 3]
+
+
+def test_decode_buffer_code16() -> None:
+    for mcfile, buffer in [('tests/common/arm_thumb.yaml', bytes.fromhex('2de9 0040 ffff')),
+                           ('tests/common/arm_thumb_big.yaml', bytes.fromhex('e92d 4000 ffff'))]:
+        mcdecoder_model = create_mcdecoder_model(mcfile)
+        result = decode_buffer(mcdecoder_model, buffer)
+        assert list(result.offset_vec) == [0, 2, 4]
+        assert result.instruction_index_vec[0] == 1
+        assert mcdecoder_model.instructions[1].fields[0].name == 'M'
+        assert result.field_value_mat[0, 0] == 1
+
+
+def test_linear_sweep(tmp_path) -> None:
+    mcdecoder_model = create_mcdecoder_model('tests/common/mixed_instruction_lengths.yaml')
+
+    # push_16, push_32, unknown code, push_16 and push_32 in little endian
+    buffer = bytes.fromhex('01b5 2de9 0340 ffff 10b4 2de9 ff5f')
+
+    # Instructions are decoded one after another across chunks
+    for chunk_size in [4, 8, 1 << 20]:
+        results = list(linear_sweep(mcdecoder_model, buffer, chunk_size=chunk_size))
+        assert np.concatenate([result.offset_vec for result in results]).tolist() == [0, 2, 6, 8, 10]
+        assert np.concatenate([result.instruction_index_vec for result in results]).tolist() == [0, 1, -1, 0, 1]
+        assert np.concatenate([result.field_value_mat for result in results]).tolist() == [
+            [1, 1], [1, 3], [0, 0], [0, 16], [1, 8191]]
+
+    # A binary file is decoded as well
+    binary_file = tmp_path / 'code.bin'
+    binary_file.write_bytes(buffer)
+    (result,) = linear_sweep(mcdecoder_model, str(binary_file))
+    assert result.offset_vec.tolist() == [0, 2, 6, 8, 10]
+
+    binary_file.write_bytes(b'')
+    assert list(linear_sweep(mcdecoder_model, str(binary_file))) == []
+
+    with pytest.raises(ValueError):
+        list(linear_sweep(mcdecoder_model, buffer, chunk_size=6))
+
+
+def test_linear_sweep_priority() -> None:
+    mcdecoder_model = create_mcdecoder_model('tests/common/priority.yaml')
+
+    # wide_32bit with priority 2 advances 4 bytes though general_16bit comes first in the MC description
+    buffer = bytes.fromhex('0001 0002 1234 0000')
+    (result,) = linear_sweep(mcdecoder_model, buffer)
+    assert result.offset_vec.tolist() == [0, 4, 6]
+    assert [mcdecoder_model.instructions[i].name for i in result.instruction_index_vec] == [
+        'wide_32bit', 'general_16bit', 'zero_16bit']
+
+
+def test_linear_sweep_random_buffer() -> None:
+    mcdecoder_model = create_mcdecoder_model('tests/common/mixed_instruction_lengths.yaml')
+    buffer = np.random.default_rng(0).integers(0, 256, 1 << 12, dtype=np.uint8).tobytes()
+
+    # Walk through the offsets of instructions one by one
+    all_offset_result = decode_buffer(mcdecoder_model, buffer)
+    expected_offsets = []
+    row = 0
+    while row < all_offset_result.offset_vec.shape[0]:
+        expected_offsets.append(row * 2)
+        instruction_index = all_offset_result.instruction_index_vec[row]
+        is_code16x2 = instruction_index >= 0 \
+            and mcdecoder_model.instructions[instruction_index].length_of_encoding_elements == 2
+        row += 2 if is_code16x2 else 1
+
+    offset_vec = np.concatenate([result.offset_vec for result in linear_sweep(mcdecoder_model, buffer, chunk_size=64)])
+    assert offset_vec.tolist() == expected_offsets
+
+
 def test_find_matched_instructions() -> None:
     # Prapare decoder model
     mcdecoder_model = create_mcdecoder_model(
@@ -918,3 +1632,27 @@ def test_find_matched_instructions() -> None:
     context.code16x1 = context.code16x2 = context.code32x1 = 0x00000005
     instructions = find_matched_instructions(context)
     assert len(instructions) == 0
+
+
+def test_shipped_parser_tables_up_to_date() -> None:
+    # Run core._write_shipped_parser_tables() if this test fails after changing a grammar
+    for grammar_file, start in _GRAMMAR_FILES_AND_STARTS:
+        grammar = importlib.resources.read_text('mcdecoder.grammars', grammar_file)
+        with importlib.resources.open_binary('mcdecoder.grammars', grammar_file + _PARSER_TABLES_FILE_EXTENSION) as file:
+            header = pickle.load(file)
+
+        assert header.grammar_digest == _make_parser_tables_header(grammar, start).grammar_digest
+        assert header.start == start
+
+
+def test_create_parser_cached_tables(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv('MCDECODER_CACHE_DIR', str(tmp_path))
+
+    # Parsers are built from grammars if the shipped tables are for another start rule
+    parser = _create_parser('instruction_condition.lark', 'or_condition')
+    assert parser.parse('cond == 15').data == 'or_condition'
+    assert len(os.listdir(tmp_path)) == 1
+
+    # The tables stored in the cache directory are used next time
+    parser = _create_parser('instruction_condition.lark', 'or_condition')
+    assert parser.parse('cond == 15').data == 'or_condition'
@@ -413,6 +413,23 @@ def test__emulate_match_andor_condition() -> None:
     assert instruction4.decoder.name == 'and_or_condition2'
 
 
+def test__emulate_tree_engine() -> None:
+    for bit_pattern in ['12 00 00 02', '22 00 00 03', '11 00 00 02']:
+        instructions1 = _emulate('tests/common/complex_condition.yaml', bit_pattern, 16, 'big')
+        instructions2 = _emulate('tests/common/complex_condition.yaml', bit_pattern, 16, 'big', engine='tree')
+        assert instructions2 == instructions1
+
+
+def test__emulate_first_match() -> None:
+    instructions = _emulate('tests/common/priority.yaml', '00 00 00 00', 16, 'big')
+    assert [instruction.decoder.name for instruction in instructions] == \
+        ['general_16bit', 'zero_16bit', 'nop_16bit', 'negative_priority_32bit']
+
+    instructions = _emulate('tests/common/priority.yaml', '00 00 00 00', 16, 'big', first_match=True)
+    assert [instruction.decoder.name for instruction in instructions] == ['zero_16bit']
+    assert instructions[0].fields[0].value == 0
+
+
 def test__emulate_unmatch_andor_condition() -> None:
     instructions1 = _emulate(
         'tests/common/complex_condition.yaml', '11 00 00 02', 16, 'big')